@@ -1,7 +1,10 @@
 import asyncio
+import threading
 import httpx
 import cv2
 import io
+from concurrent.futures import Future
+from typing import Optional
 
 
 from .core.client import AriaClient
@@ -11,20 +14,49 @@ from .utils.config import config
 from .bus import AsyncEventBus
 from .workers.local_yolo import yolo_worker
 from .server.server import WebSocketServer
+from .core.replay import PreviewWindow
 
-async def main():
+async def main(preview: Optional[PreviewWindow] = None):
     """Main function to run the desktop app."""
 
     logger.info("Starting Project Aria Desktop App")
-    evnet_bus = AsyncEventBus()
+    evnet_bus = AsyncEventBus.from_config(config)
 
-    server = WebSocketServer(evnet_bus)
+    server = WebSocketServer(evnet_bus, preview)
     await server.start()
 
-    
 
-if __name__ == "__main__":
+def run_with_preview(preview: PreviewWindow) -> None:
+    """The app loop on its own thread, the main thread draws the debug preview."""
+    started: Future = Future() # loop and main task, to cancel them on Ctrl+C
+
+    async def app():
+        started.set_result((asyncio.get_running_loop(), asyncio.current_task()))
+        await main(preview)
+
+    def run_loop():
+        try:
+            asyncio.run(app())
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run_loop, name="app-loop")
+    thread.start()
     try:
-        asyncio.run(main())
+        preview.run(thread.is_alive)
     except KeyboardInterrupt:
-        logger.info("Caught Ctrl+C at the very top. Exiting.")
\ No newline at end of file
+        logger.info("Caught Ctrl+C at the very top. Exiting.")
+        loop, task = started.result()
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+
+
+if __name__ == "__main__":
+    preview = PreviewWindow.from_config()
+    if preview is not None:
+        run_with_preview(preview)
+    else:
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            logger.info("Caught Ctrl+C at the very top. Exiting.")
\ No newline at end of file
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+
+from .pipeline import run_pipeline
+from .stages import run_stages
+from .stats import compare, write_result
+
+STAGES = ["bus", "encode", "send"]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m aria_desktop.bench", description="Streaming pipeline benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pipeline = commands.add_parser("pipeline", help="end to end: observer -> bus -> websocket worker -> server -> clients")
+    pipeline.add_argument("--source", choices=["simulator", "video", "vrs"], default="simulator")
+    pipeline.add_argument("--path", help="video or vrs file to replay, defaults to the [debug] config")
+    pipeline.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    pipeline.add_argument("--warmup", type=float, default=3.0, help="seconds ignored at the start")
+    pipeline.add_argument("--clients", type=int, default=1)
+    pipeline.add_argument("--tiers", help="comma separated tiers, assigned to the clients round robin")
+    pipeline.add_argument("--read-delay-ms", type=float, default=0.0, help="per frame delay of the clients, to simulate slow consumers")
+    pipeline.add_argument("--port", type=int, default=8765)
+    pipeline.add_argument("--set", dest="overrides", action="append", default=[], metavar="SECTION.KEY=VALUE",
+                          help="config override, e.g. --set simulator.cameras=rgb:60:1408:1408")
+    pipeline.add_argument("--output", "-o", help="write the JSON result here instead of stdout")
+
+    stages = commands.add_parser("stages", help="single stages: bus publish, _process_image, send")
+    stages.add_argument("--stage", dest="stages", action="append", choices=STAGES, help="stage to run, repeatable, all by default")
+    stages.add_argument("--count", type=int, default=50, help="encoded frames, bus and send run multiples of it")
+    stages.add_argument("--clients", type=int, default=4, help="fake clients of the send benchmark")
+    stages.add_argument("--output", "-o", help="write the JSON result here instead of stdout")
+
+    diff = commands.add_parser("compare", help="compare two result files")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+
+    args = parser.parse_args()
+    if args.command == "pipeline":
+        result = asyncio.run(run_pipeline(
+            source=args.source,
+            duration=args.duration,
+            warmup=args.warmup,
+            clients=args.clients,
+            tiers=[tier.strip() for tier in args.tiers.split(",")] if args.tiers else None,
+            read_delay=args.read_delay_ms / 1000,
+            port=args.port,
+            path=args.path,
+            overrides=args.overrides,
+        ))
+        write_result(result, args.output)
+    elif args.command == "stages":
+        write_result(asyncio.run(run_stages(args.stages or STAGES, args.count, args.clients)), args.output)
+    else:
+        compare(args.baseline, args.candidate)
+
+
+if __name__ == "__main__":
+    main()
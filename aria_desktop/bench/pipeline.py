@@ -0,0 +1,243 @@
+import asyncio
+import time
+import websockets
+from typing import Any, Dict, List, Optional
+
+from ..bus import AsyncEventBus
+from ..server import protocol
+from ..server.protocol import FRAME_HEADER, FrameHeader, FrameKind, VideoStream
+from ..utils.config import config
+from ..utils.logger import logger
+from .stats import ResourceSampler, run_metadata, summarize
+
+
+def apply_overrides(source: str, port: int, path: Optional[str], overrides: List[str]) -> None:
+    """
+    Point the app config at the benchmark source before the server module is imported
+    (it reads the debug flag at import time). overrides are section.key=value strings.
+    """
+    def set_option(section: str, key: str, value: str) -> None:
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, key, value)
+
+    set_option('websocket', 'port', str(port))
+    set_option('simulator', 'enabled', str(source == 'simulator').lower())
+    set_option('debug', 'enabled', str(source != 'simulator').lower())
+    set_option('debug', 'show_window', 'false')
+    if source != 'simulator':
+        set_option('debug', 'source', source)
+        if path:
+            set_option('debug', 'vrs_path' if source == 'vrs' else 'video_path', path)
+
+    for override in overrides:
+        option, _, value = override.partition("=")
+        section, _, key = option.rpartition(".")
+        set_option(section, key, value)
+
+
+class BenchClient:
+    """In-process websocket client that measures the frames it receives."""
+
+    def __init__(self, index: int, url: str, tier: Optional[str], read_delay: float, warmup_until: float):
+        self.index = index
+        self.url = url
+        self.tier = tier
+        self.read_delay = read_delay # simulated slow consumer, seconds per frame
+        self.warmup_until = warmup_until
+
+        self.frames = 0
+        self.bytes = 0
+        self.seq_gaps = 0
+        self.seqs: List[int] = []
+        self.end_to_end_ms: List[float] = []
+        self.encode_ms: List[float] = []
+        self.capture_to_host_ms: List[float] = []
+        self._capture_offset_ns: Optional[int] = None
+        self.first_frame: Optional[float] = None
+        self.last_frame: Optional[float] = None
+        self._last_seq: Optional[int] = None
+
+    async def run(self, stop: asyncio.Event, start_stream: bool) -> None:
+        async with websockets.connect(self.url, max_size=2 * 1024 * 1024) as websocket:
+            if self.tier:
+                await websocket.send(protocol.ControlMessage(protocol.MessageType.SET_TIER, {"tier": self.tier}).to_json())
+            if start_stream:
+                await websocket.send("start")
+
+            reporter = asyncio.create_task(self._report_fps(websocket))
+            try:
+                while not stop.is_set():
+                    try:
+                        message = await asyncio.wait_for(websocket.recv(), timeout=0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    if isinstance(message, bytes):
+                        self._on_frame(message)
+                        if self.read_delay:
+                            await asyncio.sleep(self.read_delay)
+                if start_stream:
+                    await websocket.send("stop")
+            finally:
+                reporter.cancel()
+
+    async def _report_fps(self, websocket) -> None:
+        """Report the receive rate like the real clients do, it feeds the adaptive controller."""
+        last_frames, last_time = 0, time.perf_counter()
+        while True:
+            await asyncio.sleep(1.0)
+            now = time.perf_counter()
+            fps = (self.frames - last_frames) / (now - last_time)
+            last_frames, last_time = self.frames, now
+            await websocket.send(protocol.ControlMessage(protocol.MessageType.CLIENT_STATS, {"fps": fps}).to_json())
+
+    def _on_frame(self, message: bytes) -> None:
+        received_ns = time.time_ns()
+        header, _ = FrameHeader.unpack(message)
+        # Only the RGB video is measured, other cameras, sensors and audio have their own seq
+        if header.kind != FrameKind.VIDEO or header.stream_id != VideoStream.RGB:
+            return
+        if time.perf_counter() < self.warmup_until:
+            self._last_seq = header.seq
+            return
+
+        if self._last_seq is not None and header.seq > self._last_seq + 1:
+            self.seq_gaps += header.seq - self._last_seq - 1
+        self._last_seq = header.seq
+
+        now = time.perf_counter()
+        self.first_frame = self.first_frame or now
+        self.last_frame = now
+        self.frames += 1
+        self.bytes += len(message) - FRAME_HEADER.size
+
+        end_to_end = (received_ns - header.host_receive_ns) / 1e6
+        encode = header.encode_us / 1e3
+        self.seqs.append(header.seq)
+        self.end_to_end_ms.append(end_to_end)
+        self.encode_ms.append(encode)
+        if header.capture_timestamp_ns:
+            # Capture timestamps are on the device or media clock, only their drift against
+            # the host clock since the first measured frame means something
+            offset_ns = header.host_receive_ns - header.capture_timestamp_ns
+            if self._capture_offset_ns is None:
+                self._capture_offset_ns = offset_ns
+            self.capture_to_host_ms.append((offset_ns - self._capture_offset_ns) / 1e6)
+
+    @property
+    def fps(self) -> float:
+        if not self.first_frame or self.last_frame == self.first_frame:
+            return 0.0
+        return (self.frames - 1) / (self.last_frame - self.first_frame)
+
+
+async def _probe_bus(bus: AsyncEventBus, samples: Dict[int, float], warmup_until: float) -> None:
+    """Time from the observer publishing a frame to a latest-only subscriber getting it, by seq."""
+    async for event in bus.subscribe("rgb_frame", latest_only=True, name="bench"):
+        if time.perf_counter() >= warmup_until:
+            samples[event.seq] = (time.time_ns() - event.payload["host_time_ns"]) / 1e6
+
+
+async def _wait_for_server(url: str, timeout: float = 10.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            async with websockets.connect(url):
+                return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run_pipeline(
+    source: str = "simulator",
+    duration: float = 20.0,
+    warmup: float = 3.0,
+    clients: int = 1,
+    tiers: Optional[List[str]] = None,
+    read_delay: float = 0.0,
+    port: int = 8765,
+    path: Optional[str] = None,
+    overrides: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Run the whole app (observer -> bus -> websocket worker -> server) against in-process clients.
+    The first client sends start/stop like the real frontend, the others only watch.
+    """
+    params = dict(source=source, duration=duration, warmup=warmup, clients=clients, tiers=tiers,
+                  read_delay=read_delay, path=path, overrides=overrides or [])
+    apply_overrides(source, port, path, overrides or [])
+    from ..server.server import WebSocketServer
+
+    url = f"ws://127.0.0.1:{port}"
+    bus = AsyncEventBus.from_config(config)
+    server = WebSocketServer(bus)
+    server_task = asyncio.create_task(server.start())
+    await _wait_for_server(url)
+
+    warmup_until = time.perf_counter() + warmup
+    stop = asyncio.Event()
+    bus_dispatch_ms: Dict[int, float] = {}
+    probe_task = asyncio.create_task(_probe_bus(bus, bus_dispatch_ms, warmup_until))
+
+    bench_clients = [
+        BenchClient(i, url, tiers[i % len(tiers)] if tiers else None, read_delay, warmup_until)
+        for i in range(clients)
+    ]
+    client_tasks = [asyncio.create_task(client.run(stop, start_stream=(client.index == 0))) for client in bench_clients]
+
+    resources = ResourceSampler()
+    resources.start()
+    logger.info(f"Benchmarking {source} for {duration:.0f}s ({warmup:.0f}s warmup) with {clients} client(s)")
+    await asyncio.sleep(warmup)
+    published_at_warmup = bus.stats().get("rgb_frame", {}).get("published", 0)
+    await asyncio.sleep(duration)
+
+    # Snapshot the server side before the clients disconnect
+    server_clients = [client.stats() for client in server.clients.values()]
+    bus_stats = bus.stats().get("rgb_frame", {})
+    stop.set()
+    await asyncio.gather(*client_tasks, return_exceptions=True)
+    resource_stats = resources.stop()
+
+    probe_task.cancel()
+    server_task.cancel()
+    await asyncio.gather(probe_task, server_task, return_exceptions=True)
+
+    end_to_end = [sample for client in bench_clients for sample in client.end_to_end_ms]
+    encode = [sample for client in bench_clients for sample in client.encode_ms]
+    seqs = [seq for client in bench_clients for seq in client.seqs]
+    # What is left of a frame's latency once it was dispatched by the bus and encoded
+    wait_and_send = [
+        e2e - enc - bus_dispatch_ms[seq]
+        for seq, e2e, enc in zip(seqs, end_to_end, encode) if seq in bus_dispatch_ms
+    ]
+    frames = sum(client.frames for client in bench_clients)
+    seq_gaps = sum(client.seq_gaps for client in bench_clients)
+    measured = duration or 1.0
+
+    return {
+        "meta": run_metadata("pipeline", params),
+        "throughput": {
+            "published_fps": round((bus_stats.get("published", 0) - published_at_warmup) / measured, 2),
+            "received_fps_mean": round(sum(client.fps for client in bench_clients) / max(1, clients), 2),
+            "received_fps": [round(client.fps, 2) for client in bench_clients],
+            "mbit_per_s": round(sum(client.bytes for client in bench_clients) * 8 / measured / 1e6, 3),
+        },
+        "latency_ms": {
+            "capture_to_host": summarize(s for client in bench_clients for s in client.capture_to_host_ms),
+            "bus_dispatch": summarize(bus_dispatch_ms.values()),
+            "encode": summarize(encode),
+            "wait_and_send": summarize(wait_and_send),
+            "end_to_end": summarize(end_to_end),
+        },
+        "drops": {
+            "seq_gaps": seq_gaps,
+            "seq_gap_rate": round(seq_gaps / max(1, seq_gaps + frames), 4),
+            "client_queue_dropped": sum(client["dropped"] for client in server_clients),
+            "bus": {key: bus_stats.get(key) for key in ("published", "dropped", "coalesced", "cursors")},
+        },
+        "frame_cache": server.frame_cache.stats(),
+        "resources": resource_stats,
+    }
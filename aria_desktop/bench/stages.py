@@ -0,0 +1,164 @@
+import asyncio
+import struct
+import threading
+import time
+import numpy as np
+from typing import Any, Dict, List
+
+from ..bus import AsyncEventBus, Event, OverflowPolicy, TopicOptions
+from .stats import run_metadata, summarize
+
+_QUEUED_AT = struct.Struct("<q")
+
+
+def synthetic_frame(size: int = 1408) -> np.ndarray:
+    """RGB frame with some structure, so JPEG sizes are in the range of real ones."""
+    y, x = np.mgrid[0:size, 0:size]
+    frame = np.stack([(x * 255 // size), (y * 255 // size), ((x ^ y) & 0xFF)], axis=-1).astype(np.uint8)
+    noise = np.random.default_rng(0).integers(0, 6, frame.shape, dtype=np.uint8)
+    return frame + noise
+
+
+async def bench_bus_publish(count: int = 20000) -> Dict[str, Any]:
+    """
+    Cost of publishing on the loop for a coalescing and a queue topic, and the latency of
+    publish_threadsafe from a producer thread to a latest-only subscriber.
+    """
+    bus = AsyncEventBus(topic_options={
+        "latest": TopicOptions(policy=OverflowPolicy.COALESCE),
+        "queued": TopicOptions(maxsize=256, policy=OverflowPolicy.DROP_OLDEST),
+        "threadsafe": TopicOptions(policy=OverflowPolicy.COALESCE),
+    })
+    result: Dict[str, Any] = {}
+
+    for topic in ("latest", "queued"):
+        received = 0
+
+        async def consume():
+            nonlocal received
+            async for _ in bus.subscribe(topic, latest_only=(topic == "latest")):
+                received += 1
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        samples = []
+        for i in range(count):
+            start = time.perf_counter_ns()
+            await bus.publish(Event(topic, i))
+            samples.append((time.perf_counter_ns() - start) / 1e3)
+            if i % 64 == 0:
+                await asyncio.sleep(0) # let the consumer run
+        await asyncio.sleep(0.05)
+        consumer.cancel()
+        result[f"publish_{topic}_us"] = summarize(samples)
+        result[f"publish_{topic}_received"] = received
+
+    loop = asyncio.get_running_loop()
+    latencies: List[float] = []
+    done = threading.Event()
+
+    def produce():
+        for _ in range(count // 10):
+            bus.publish_threadsafe(Event("threadsafe", time.perf_counter_ns()), loop)
+            time.sleep(0.0005)
+        done.set()
+
+    async def consume_threadsafe():
+        async for event in bus.subscribe("threadsafe", latest_only=True):
+            latencies.append((time.perf_counter_ns() - event.payload) / 1e3)
+
+    consumer = asyncio.create_task(consume_threadsafe())
+    wakeups_before = bus.wakeups
+    threading.Thread(target=produce, daemon=True).start()
+    await asyncio.to_thread(done.wait)
+    await asyncio.sleep(0.05)
+    consumer.cancel()
+    result["threadsafe_delivery_us"] = summarize(latencies)
+    result["threadsafe_wakeups"] = bus.wakeups - wakeups_before
+    return result
+
+
+def bench_process_image(count: int = 50, size: int = 1408) -> Dict[str, Any]:
+    """_process_image per frame, for every configured tier and for the full tier alone."""
+    from ..workers.video_tiers import load_tiers
+    from ..workers.websocket_worker import websocket_worker
+
+    worker = websocket_worker(AsyncEventBus(), server=None)
+    tiers = load_tiers()
+    frame = synthetic_frame(size)
+    result: Dict[str, Any] = {"frame_size": size}
+
+    for label, selected in (("full_tier_ms", tiers[:1]), ("all_tiers_ms", tiers)):
+        worker._process_image(frame, selected) # warm up
+        samples = []
+        for _ in range(count):
+            start = time.perf_counter()
+            buffers = worker._process_image(frame, selected)
+            samples.append((time.perf_counter() - start) * 1000)
+        result[label] = summarize(samples)
+        result[label.replace("_ms", "_kb")] = {name: round(len(buffer) / 1024, 1) for name, buffer in buffers.items()}
+
+    worker.encoder.shutdown()
+    return result
+
+
+class _FakeWebsocket:
+    """Socket stand-in that takes send_delay seconds per frame and times the frames from when they were queued."""
+
+    def __init__(self, index: int, send_delay: float):
+        self.remote_address = ("bench", index)
+        self.send_delay = send_delay
+        self.latencies: List[float] = []
+
+    async def send(self, data) -> None:
+        await asyncio.sleep(self.send_delay)
+        queued_ns, = _QUEUED_AT.unpack_from(data)
+        self.latencies.append((time.perf_counter_ns() - queued_ns) / 1e6)
+
+
+async def bench_send(count: int = 2000, clients: int = 4, frame_kb: int = 100, send_delay: float = 0.0) -> Dict[str, Any]:
+    """WebSocketServer.send fan-out cost and queue wait + send latency as seen by the client senders."""
+    from ..server.client_connection import ClientConnection
+    from ..server.server import WebSocketServer
+
+    server = WebSocketServer(AsyncEventBus())
+    tier = next(iter(server.tiers))
+    connections = []
+    for i in range(clients):
+        connection = ClientConnection(_FakeWebsocket(i, send_delay), server.client_queue_size, tier)
+        connection.start()
+        server.clients[connection.websocket] = connection
+        connections.append(connection)
+
+    padding = bytes(frame_kb * 1024)
+    samples = []
+    for _ in range(count):
+        frame = _QUEUED_AT.pack(time.perf_counter_ns()) + padding
+        start = time.perf_counter_ns()
+        server.send({tier: frame})
+        samples.append((time.perf_counter_ns() - start) / 1e3)
+        await asyncio.sleep(0.001)
+
+    await asyncio.sleep(0.05)
+    result = {
+        "clients": clients,
+        "send_call_us": summarize(samples),
+        "queue_and_send_ms": summarize(sample for c in connections for sample in c.websocket.latencies),
+        "sent": sum(c.sent for c in connections),
+        "dropped": sum(c.dropped for c in connections),
+    }
+    for connection in connections:
+        await connection.close()
+    return result
+
+
+async def run_stages(stages: List[str], count: int, clients: int = 4) -> Dict[str, Any]:
+    params = {"stages": stages, "count": count, "clients": clients}
+    result: Dict[str, Any] = {"meta": run_metadata("stages", params)}
+    if "bus" in stages:
+        result["bus"] = await bench_bus_publish(count * 100)
+    if "encode" in stages:
+        result["encode"] = await asyncio.to_thread(bench_process_image, count)
+    if "send" in stages:
+        result["send"] = await bench_send(count * 10, clients=clients)
+    return result
@@ -0,0 +1,111 @@
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import numpy as np
+import psutil
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def summarize(samples: Iterable[float]) -> Dict[str, Any]:
+    """count, mean and p50/p95/p99/max of a list of samples."""
+    values = np.asarray(list(samples), dtype=np.float64)
+    if values.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+class ResourceSampler:
+    """Samples CPU and RSS of this process on a background thread."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.cpu: List[float] = []
+        self.rss_mb: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-resources", daemon=True)
+
+    def start(self) -> None:
+        self.process.cpu_percent() # first call only sets the baseline
+        self._thread.start()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        return {
+            "cpu_percent": summarize(self.cpu),
+            "rss_mb": summarize(self.rss_mb),
+            "threads": self.process.num_threads(),
+            "cpu_count": psutil.cpu_count(),
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.cpu.append(self.process.cpu_percent())
+            self.rss_mb.append(self.process.memory_info().rss / 2**20)
+
+
+def run_metadata(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """What a result was measured on, so results of different runs can be compared."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+    }
+
+
+def write_result(result: Dict[str, Any], path: Optional[str]) -> None:
+    text = json.dumps(result, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def _flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a result as dotted keys."""
+    flat = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(_flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix.rstrip(".")] = float(data)
+    return flat
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    """Print every metric of two result files side by side with the relative change."""
+    with open(baseline_path) as f:
+        baseline = _flatten(json.load(f))
+    with open(candidate_path) as f:
+        candidate = _flatten(json.load(f))
+
+    keys = [key for key in baseline if key in candidate and not key.startswith("meta.")]
+    width = max((len(key) for key in keys), default=10)
+    print(f"{'metric':<{width}}  {'baseline':>12}  {'candidate':>12}  {'change':>8}")
+    for key in keys:
+        old, new = baseline[key], candidate[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+        print(f"{key:<{width}}  {old:>12.3f}  {new:>12.3f}  {change:>8}")
@@ -1,66 +1,361 @@
 import asyncio
-from dataclasses import dataclass
-from typing import Any, Dict, AsyncIterator, Optional
+import configparser
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, AsyncIterator, List, Optional, Set
+
+
+class OverflowPolicy(str, Enum):
+    """What a topic does with a new event when its queue is full."""
+    BLOCK = "block" # publisher waits for room
+    DROP_OLDEST = "drop_oldest" # oldest queued event is discarded
+    DROP_NEWEST = "drop_newest" # incoming event is discarded
+    COALESCE = "coalesce" # only the latest event is kept, every subscriber has its own cursor
+
+
+@dataclass
+class TopicOptions:
+    maxsize: int = 0 # 0 means unbounded
+    policy: OverflowPolicy = OverflowPolicy.BLOCK
+    max_rate: float = 0.0 # events accepted per second, 0 means unlimited
+
+
+# Used for topics that have no entry in config.ini and no options at topic() time
+DEFAULT_TOPIC_OPTIONS: Dict[str, TopicOptions] = {
+    "rgb_frame": TopicOptions(policy=OverflowPolicy.COALESCE),
+    "slam1_frame": TopicOptions(policy=OverflowPolicy.COALESCE),
+    "slam2_frame": TopicOptions(policy=OverflowPolicy.COALESCE),
+    "et_frame": TopicOptions(policy=OverflowPolicy.COALESCE),
+    "sensor_block": TopicOptions(maxsize=64, policy=OverflowPolicy.DROP_OLDEST),
+    "audio_chunk": TopicOptions(maxsize=64, policy=OverflowPolicy.DROP_OLDEST),
+}
 
 
 @dataclass
 class Event:
     event_type: str
     payload: Any=None # optional data associated with event
+    seq: int = 0 # topic sequence number, set by the bus on coalescing topics
+
+
+@dataclass
+class LatestCursor:
+    """Read position of a single subscriber on a latest-only topic."""
+    name: str
+    seq: int = 0 # sequence number of the last event delivered
+    delivered: int = 0
+    skipped: int = 0 # events overwritten before this subscriber could read them
+    notifier: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+
+class Topic:
+    """State of a single topic: its queue or latest slot, plus counters."""
+
+    def __init__(self, name: str, options: TopicOptions):
+        self.name = name
+        self.options = options
+        self.queue: Optional[asyncio.Queue] = None
+        if options.policy != OverflowPolicy.COALESCE:
+            self.queue = asyncio.Queue(maxsize=options.maxsize)
+
+        self.latest: Optional[Event] = None
+        self.seq = 0
+        self.cursors: List[LatestCursor] = []
+
+        self.published = 0
+        self.dropped = 0 # coalescing topics: events skipped by any cursor, closed ones included
+        self.high_water = 0
+        self.coalesced = 0 # events replaced in the thread-safe pending slot before the loop ran
+        self.rate_limited = 0 # events dropped by max_rate
+        self._interval = 1.0 / options.max_rate if options.max_rate > 0 else 0.0
+        self._next_allowed = 0.0
+
+    @property
+    def policy(self) -> OverflowPolicy:
+        return self.options.policy
+
+    def throttle(self) -> bool:
+        """True if an event comes too early for max_rate and has to be dropped."""
+        if not self._interval:
+            return False
+        now = time.monotonic()
+        if now < self._next_allowed:
+            self.rate_limited += 1
+            return True
+        # Half an interval of slack, so frames jittering around the interval don't halve the rate
+        self._next_allowed = max(self._next_allowed + self._interval, now + self._interval / 2)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of this topic, cursors included for coalescing topics."""
+        stats = {
+            "policy": self.policy.value,
+            "maxsize": self.options.maxsize,
+            "published": self.published,
+            "dropped": self.dropped,
+            "high_water": self.high_water,
+            "coalesced": self.coalesced,
+            "rate_limited": self.rate_limited,
+        }
+        if self.queue is not None:
+            stats["size"] = self.queue.qsize()
+        else:
+            stats["cursors"] = {
+                cursor.name: {"seq": cursor.seq, "delivered": cursor.delivered, "skipped": cursor.skipped}
+                for cursor in self.cursors
+            }
+        return stats
+
+
+def load_topic_options(parser: configparser.ConfigParser) -> tuple[TopicOptions, Dict[str, TopicOptions]]:
+    """
+    Read bus settings from config.ini.
+    [bus] holds the defaults, [bus.<topic>] sections override a single topic.
+    """
+    default = TopicOptions(
+        maxsize=parser.getint('bus', 'default_maxsize', fallback=0),
+        policy=OverflowPolicy(parser.get('bus', 'default_policy', fallback='block')),
+    )
+
+    per_topic: Dict[str, TopicOptions] = dict(DEFAULT_TOPIC_OPTIONS)
+    for section in parser.sections():
+        if not section.startswith('bus.'):
+            continue
+        name = section[len('bus.'):]
+        base = per_topic.get(name, default)
+        per_topic[name] = TopicOptions(
+            maxsize=parser.getint(section, 'maxsize', fallback=base.maxsize),
+            policy=OverflowPolicy(parser.get(section, 'policy', fallback=base.policy.value)),
+            max_rate=parser.getfloat(section, 'max_rate', fallback=base.max_rate),
+        )
+    return default, per_topic
+
 
 class AsyncEventBus:
-    def __init__(self):
-        # Mapping of event topics to queues
-        self._topics: Dict[str, asyncio.Queue] = {}
-        self._latest: Dict[str, Event] = {}  # Store latest event
-        self._notifiers: Dict[str, asyncio.Event] = {}  # Signal new data
-
-    def topic(self, event_type: str, maxsize: int = 0) -> asyncio.Queue:
-        """Get or create a topic queue for a certain event type."""
+    def __init__(self, default_options: Optional[TopicOptions] = None,
+                 topic_options: Optional[Dict[str, TopicOptions]] = None):
+        # Mapping of event topics to their state
+        self._topics: Dict[str, Topic] = {}
+        self._default_options = default_options or TopicOptions()
+        self._topic_options = dict(DEFAULT_TOPIC_OPTIONS) if topic_options is None else dict(topic_options)
+
+        # Events handed over by other threads, drained once per loop iteration
+        self._pending_lock = threading.Lock()
+        self._pending_latest: Dict[str, Event] = {}
+        self._pending_coalesced: Dict[str, int] = {}
+        self._pending_events: List[Event] = []
+        self._wakeup_scheduled = False
+        # Blocking topics that were full when their pending events were drained,
+        # the events stay pending until a subscriber of the topic makes room
+        self._stalled: Set[str] = set()
+        self.wakeups = 0
+
+    @classmethod
+    def from_config(cls, parser: configparser.ConfigParser) -> "AsyncEventBus":
+        """Create a bus with topic sizes and policies taken from config.ini."""
+        default, per_topic = load_topic_options(parser)
+        return cls(default_options=default, topic_options=per_topic)
+
+    def topic(self, event_type: str, maxsize: Optional[int] = None,
+              policy: Optional[OverflowPolicy] = None) -> Topic:
+        """
+        Get or create the topic for a certain event type.
+        maxsize/policy override the configured options, they only apply when the topic is created.
+        """
         if event_type not in self._topics:
-            self._topics[event_type] = asyncio.Queue(maxsize=maxsize)
+            options = self._topic_options.get(event_type, self._default_options)
+            options = TopicOptions(
+                maxsize=options.maxsize if maxsize is None else maxsize,
+                policy=options.policy if policy is None else OverflowPolicy(policy),
+                max_rate=options.max_rate,
+            )
+            self._topics[event_type] = Topic(event_type, options)
         return self._topics[event_type]
-    
-    async def publish(self, event: Event) -> None:
-        """Publish an event - for video frames, just store the latest."""
-        if event.event_type == "rgb_frame":
-            # For video frames, use latest-only pattern
-            self._latest[event.event_type] = event
-            
-            # Create notifier if doesn't exist
-            if event.event_type not in self._notifiers:
-                self._notifiers[event.event_type] = asyncio.Event()
-            
-            # Signal that new data is available
-            self._notifiers[event.event_type].set()
+
+    def cursors(self, event_type: str) -> List[LatestCursor]:
+        """Return the cursors of the current latest-only subscribers of a topic."""
+        topic = self._topics.get(event_type)
+        return list(topic.cursors) if topic else []
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-topic drop and high-water-mark counters."""
+        return {name: topic.stats() for name, topic in self._topics.items()}
+
+    def _policy_of(self, event_type: str) -> OverflowPolicy:
+        topic = self._topics.get(event_type)
+        if topic is not None:
+            return topic.policy
+        return self._topic_options.get(event_type, self._default_options).policy
+
+    def _publish_nowait(self, event: Event) -> bool:
+        """
+        Apply the overflow policy of the event's topic without waiting.
+        Returns False if the topic blocks and its queue is full.
+        """
+        topic = self.topic(event.event_type)
+        if topic.policy == OverflowPolicy.BLOCK and topic.queue.full():
+            return False
+        if topic.throttle():
+            return True
+
+        if topic.policy == OverflowPolicy.COALESCE:
+            # Keep only the latest event
+            topic.published += 1
+            topic.seq += 1
+            event.seq = topic.seq
+            topic.latest = event
+
+            # Wake up every subscriber, each one reads at its own pace
+            for cursor in topic.cursors:
+                cursor.notifier.set()
+            return True
+
+        queue = topic.queue
+        if queue.full():
+            topic.published += 1
+            topic.dropped += 1
+            if topic.policy == OverflowPolicy.DROP_NEWEST:
+                return True
+            queue.get_nowait()
+            queue.task_done()
         else:
-            # For other events, use queue
-            queue = self.topic(event.event_type)
-            await queue.put(event)
+            topic.published += 1
+
+        queue.put_nowait(event)
+        topic.high_water = max(topic.high_water, queue.qsize())
+        return True
+
+    async def publish(self, event: Event) -> None:
+        """Publish an event, applying the overflow policy of its topic."""
+        if self._publish_nowait(event):
+            return
 
-    async def subscribe(self, event_type: str, latest_only: bool = False) -> AsyncIterator[Event]:
+        # Blocking topic with a full queue, wait for room
+        topic = self._topics[event.event_type]
+        if topic.throttle():
+            return
+        await topic.queue.put(event)
+        topic.published += 1
+        topic.high_water = max(topic.high_water, topic.queue.qsize())
+
+    def publish_threadsafe(self, event: Event, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Publish an event from a thread that is not running the loop (SDK callbacks).
+        No coroutine or future is created: events wait in a pending slot and a burst
+        of them costs a single call_soon_threadsafe wakeup. On coalescing topics a
+        newer event replaces the pending one, the replaced ones are counted.
+        A full blocking topic keeps at most maxsize events pending, later ones are dropped.
+        """
+        event_type = event.event_type
+        coalesce = self._policy_of(event_type) == OverflowPolicy.COALESCE
+
+        with self._pending_lock:
+            if not coalesce:
+                self._pending_events.append(event)
+            elif event_type in self._pending_latest:
+                self._pending_coalesced[event_type] = self._pending_coalesced.get(event_type, 0) + 1
+                self._pending_latest[event_type] = event
+            else:
+                self._pending_latest[event_type] = event
+
+            if self._wakeup_scheduled:
+                return
+            self._wakeup_scheduled = True
+
+        loop.call_soon_threadsafe(self._drain_pending)
+
+    def _drain_pending(self) -> None:
+        """Publish what other threads handed over since the last wakeup (runs on the loop)."""
+        with self._pending_lock:
+            events, self._pending_events = self._pending_events, []
+            latest, self._pending_latest = self._pending_latest, {}
+            coalesced, self._pending_coalesced = self._pending_coalesced, {}
+            self._wakeup_scheduled = False
+        self.wakeups += 1
+
+        # A full blocking topic can't be waited for on the loop: its events are kept pending
+        # in order, later ones of the same topic must not overtake them.
+        # At most maxsize of them are kept, the newer ones are dropped.
+        held: List[Event] = []
+        held_counts: Dict[str, int] = {}
+        stalled: Set[str] = set()
+        for event in events:
+            event_type = event.event_type
+            if event_type in stalled or not self._publish_nowait(event):
+                stalled.add(event_type)
+                topic = self._topics[event_type]
+                if held_counts.get(event_type, 0) >= topic.options.maxsize:
+                    topic.published += 1
+                    topic.dropped += 1
+                    continue
+                held_counts[event_type] = held_counts.get(event_type, 0) + 1
+                held.append(event)
+        if held:
+            with self._pending_lock:
+                self._pending_events[:0] = held
+            self._stalled |= stalled
+
+        for event_type, event in latest.items():
+            topic = self.topic(event_type)
+            topic.coalesced += coalesced.get(event_type, 0)
+            self._publish_nowait(event)
+
+    def _wake_stalled(self, event_type: str) -> None:
+        """A stalled topic got room, drain its pending events on the next loop iteration."""
+        self._stalled.discard(event_type)
+        with self._pending_lock:
+            if self._wakeup_scheduled:
+                return
+            self._wakeup_scheduled = True
+        asyncio.get_running_loop().call_soon(self._drain_pending)
+
+    async def subscribe(self, event_type: str, latest_only: bool = False,
+                        name: Optional[str] = None) -> AsyncIterator[Event]:
         """
         Subscribe to events of a given type.
-        If latest_only=True, always get the most recent frame (no queue).
+        If latest_only=True, always get the most recent event (no queue).
+        Every latest-only subscriber gets its own cursor, so slow consumers only
+        skip events themselves and never starve the others.
+        The topic keeps its configured policy, latest_only needs a coalescing one.
         """
-        if latest_only or event_type == "rgb_frame":
-            # Latest-only pattern for video frames
-            if event_type not in self._notifiers:
-                self._notifiers[event_type] = asyncio.Event()
-            
-            notifier = self._notifiers[event_type]
-            
-            while True:
-                await notifier.wait()  # Wait for new data
-                notifier.clear()  # Reset the notifier
-                
-                if event_type in self._latest:
-                    event = self._latest[event_type]
+        topic = self.topic(event_type)
+        if latest_only and topic.policy != OverflowPolicy.COALESCE:
+            raise ValueError(f"Topic '{event_type}' uses policy '{topic.policy.value}', it can't be read latest-only")
+
+        if topic.policy == OverflowPolicy.COALESCE:
+            cursor = LatestCursor(name=name or f"{event_type}#{len(topic.cursors)}")
+            topic.cursors.append(cursor)
+
+            # Deliver the current event right away if there is one
+            if topic.latest is not None:
+                cursor.notifier.set()
+
+            try:
+                while True:
+                    await cursor.notifier.wait()  # Wait for new data
+                    cursor.notifier.clear()  # Reset only our own notifier
+
+                    event = topic.latest
+                    if event is None or event.seq <= cursor.seq:
+                        continue
+
+                    if cursor.seq:
+                        skipped = event.seq - cursor.seq - 1
+                        cursor.skipped += skipped
+                        topic.dropped += skipped
+                    cursor.seq = event.seq
+                    cursor.delivered += 1
                     yield event
+            finally:
+                topic.cursors.remove(cursor)
         else:
             # Queue pattern for other events
-            queue = self.topic(event_type)
+            queue = topic.queue
             while True:
                 event = await queue.get()
+                if event_type in self._stalled:
+                    self._wake_stalled(event_type)
                 yield event
-                queue.task_done()
\ No newline at end of file
+                queue.task_done()
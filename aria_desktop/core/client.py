@@ -4,6 +4,7 @@ import sys
 import asyncio
 
 from . import auth
+from .simulator import SimulatedDeviceClient
 from ..utils import handler
 from ..utils.config import config
 from ..utils.logger import logger
@@ -13,20 +14,37 @@ class AriaClient:
         self.connection = config.get('aria', 'connection_type', fallback='wifi')
         self.ip_address = config.get('aria', 'ip_address', fallback=None)
         self.update_iptables = config.getboolean('aria', 'update_iptables', fallback=True)
+        # Synthetic device instead of the glasses, for load testing
+        self.simulate = config.getboolean('simulator', 'enabled', fallback=False)
+
+        # Connection attempts run on worker threads, the event loop keeps serving clients
+        self.connect_timeout = config.getfloat('aria', 'connect_timeout', fallback=15.0)
+        self.connect_retries = max(1, config.getint('aria', 'connect_retries', fallback=3))
+        self.connect_backoff = config.getfloat('aria', 'connect_backoff', fallback=2.0)
+        self.connect_backoff_max = config.getfloat('aria', 'connect_backoff_max', fallback=30.0)
         
          #  Optional: Set SDK's log level to Trace or Debug for more verbose logs. Defaults to Info
         aria.set_log_level(aria.Level.Info)
         
         # Create DeviceClient instance, setting the IP address if specified
-        self.device_client = aria.DeviceClient()
+        self.device_client = SimulatedDeviceClient() if self.simulate else aria.DeviceClient()
         self.device_client_config = aria.DeviceClientConfig()
 
         
     async def connect(self) -> Optional[aria.Device]:
-        """Connect to the Aria device using the specified connection method."""
+        """
+        Connect to the Aria device using the specified connection method.
+        The blocking SDK and iptables calls run off the event loop, each attempt is bounded
+        by connect_timeout and failed attempts are retried with exponential backoff.
+        """
         try:
-            if self.update_iptables and sys.platform.startswith("linux"):
-                handler.update_iptables()
+            if self.simulate:
+                logger.info("Connecting to simulated device")
+            elif self.update_iptables and sys.platform.startswith("linux"):
+                await asyncio.wait_for(
+                    asyncio.to_thread(handler.update_iptables, self.connect_timeout),
+                    timeout=self.connect_timeout
+                )
         
             if config.get('aria', 'connection_type', fallback='usb') == 'wifi':
                 logger.info(f"Cnnecting to device at IP address: {self.ip_address}")
@@ -44,8 +62,11 @@ class AriaClient:
 
             self.device_client.set_client_config(self.device_client_config)
 
-            device = self.device_client.connect()
+            device = await self._connect_with_retry()
 
+        except asyncio.CancelledError:
+            logger.info("Device connection cancelled")
+            raise
         except Exception as e:
             logger.error(f"Failed to connect to device: {e}")
             raise
@@ -53,6 +74,31 @@ class AriaClient:
         logger.info(f"Connected to device: {device}")
 
         return device
+
+    async def _connect_with_retry(self) -> aria.Device:
+        """Run DeviceClient.connect on a thread, retrying with backoff."""
+        delay = self.connect_backoff
+        # The SDK call can't be interrupted: if an attempt times out its thread keeps
+        # running, the next attempt waits on it instead of starting a second connect
+        pending: Optional[asyncio.Future] = None
+
+        for attempt in range(1, self.connect_retries + 1):
+            if pending is None:
+                pending = asyncio.ensure_future(asyncio.to_thread(self.device_client.connect))
+            try:
+                return await asyncio.wait_for(asyncio.shield(pending), timeout=self.connect_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Connection attempt {attempt}/{self.connect_retries} timed out after {self.connect_timeout:.1f}s")
+            except Exception as e:
+                logger.warning(f"Connection attempt {attempt}/{self.connect_retries} failed: {e}")
+                pending = None
+
+            if attempt < self.connect_retries:
+                logger.info(f"Retrying device connection in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.connect_backoff_max)
+
+        raise ConnectionError(f"Could not connect to device after {self.connect_retries} attempts")
     
 
 
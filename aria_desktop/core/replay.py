@@ -0,0 +1,266 @@
+import os
+import queue
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from ..utils.config import config
+from ..utils.logger import logger
+
+
+@dataclass
+class ReplayFrame:
+    image: np.ndarray # RGB
+    timestamp_ns: int # position in the source, monotonic across loops
+    index: int # frame number in the source
+
+
+def display_available() -> bool:
+    """False on headless boxes (CI) where cv2.imshow can't open a window."""
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+
+class PreviewWindow:
+    """
+    Debug preview window, drawn by the main thread: HighGUI is not thread safe and fails or hangs
+    off the main thread on macOS and some Qt builds. The event loop runs on another thread and only
+    hands over the latest frame, imshow and waitKey never run on the loop.
+    """
+
+    def __init__(self, name: str = "Debug Feed", interval_ms: int = 15):
+        self.name = name
+        self.interval_ms = interval_ms
+        self.shown = 0
+        self._image: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> Optional["PreviewWindow"]:
+        """The preview of a debug run, None if it is off or there is no display."""
+        if not config.getboolean('debug', 'enabled', fallback=False):
+            return None
+        if not config.getboolean('debug', 'show_window', fallback=True) or not display_available():
+            return None
+        return cls()
+
+    def show(self, image: np.ndarray) -> None:
+        """Any thread: the RGB frame to draw next, replaces one not drawn yet."""
+        with self._lock:
+            self._image = image
+
+    def run(self, running: Callable[[], bool]) -> None:
+        """Main thread: draws the latest frame until running() is False."""
+        try:
+            while running():
+                with self._lock:
+                    image, self._image = self._image, None
+                if image is not None:
+                    cv2.imshow(self.name, cv2.cvtColor(image, cv2.COLOR_RGB2BGR) if image.ndim == 3 else image)
+                    self.shown += 1
+                if self.shown:
+                    # Pumps the GUI events, waits for up to interval_ms
+                    cv2.waitKey(self.interval_ms)
+                else:
+                    time.sleep(self.interval_ms / 1000)
+        finally:
+            if self.shown:
+                cv2.destroyAllWindows()
+
+
+class ReplayPacer:
+    """
+    Paces replayed data by its source timestamps.
+    Every item is scheduled against an absolute deadline computed from the first one,
+    so the time spent decoding and delivering doesn't accumulate as drift.
+    speed 0 (or less) delivers as fast as possible.
+    """
+
+    def __init__(self, speed: float = 1.0, max_lag: float = 0.5):
+        self.speed = speed
+        self.max_lag = max_lag # re-anchor instead of bursting when we fall this far behind (seconds)
+        self.reset()
+
+    def reset(self) -> None:
+        self._anchor_wall: Optional[float] = None
+        self._anchor_ts = 0
+        self.late = 0 # items delivered after their deadline
+
+    def wait(self, timestamp_ns: int, stop: threading.Event) -> None:
+        """Block until the item with this source timestamp is due, or until stop is set."""
+        if self.speed <= 0:
+            return
+
+        now = time.perf_counter()
+        if self._anchor_wall is None:
+            self._anchor_wall, self._anchor_ts = now, timestamp_ns
+            return
+
+        deadline = self._anchor_wall + (timestamp_ns - self._anchor_ts) * 1e-9 / self.speed
+        delay = deadline - now
+        if delay > 0:
+            stop.wait(delay)
+        elif -delay > self.max_lag:
+            # Far behind (slow consumer, seek, pause): restart the schedule from here
+            self.late += 1
+            self._anchor_wall, self._anchor_ts = now, timestamp_ns
+        elif delay < 0:
+            self.late += 1
+
+
+class VideoReplaySource:
+    """
+    Replays a video file as a live frame source.
+    A decoder thread reads and converts frames into a bounded prefetch buffer,
+    a delivery thread paces them by the source timestamps and hands them to a callback.
+    Nothing runs on the event loop, the callback is expected to hand frames over
+    with AsyncEventBus.publish_threadsafe.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        speed: float = 1.0,
+        loop: bool = False,
+        frame_step: int = 1,
+        prefetch: int = 8,
+    ):
+        self.path = path
+        self.loop = loop
+        self.frame_step = max(1, frame_step)
+        self.pacer = ReplayPacer(speed)
+        self.fps = 0.0
+
+        self._capture: Optional[cv2.VideoCapture] = None
+        self._buffer: queue.Queue = queue.Queue(maxsize=max(1, prefetch))
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+        self.frames_decoded = 0
+        self.frames_delivered = 0
+
+    @classmethod
+    def from_config(cls, path: str) -> "VideoReplaySource":
+        return cls(
+            path,
+            speed=config.getfloat('debug', 'replay_speed', fallback=1.0),
+            loop=config.getboolean('debug', 'replay_loop', fallback=False),
+            frame_step=config.getint('debug', 'frame_step', fallback=1),
+            prefetch=config.getint('debug', 'prefetch_frames', fallback=8),
+        )
+
+    def open(self) -> bool:
+        """Open the video file, returns False if it can't be read."""
+        self._capture = cv2.VideoCapture(self.path)
+        if not self._capture.isOpened():
+            return False
+        self.fps = self._capture.get(cv2.CAP_PROP_FPS)
+        if self.fps <= 0: self.fps = 1 # fallback default
+        return True
+
+    def start(self, on_frame: Callable[[ReplayFrame], None]) -> None:
+        if self._capture is None and not self.open():
+            raise RuntimeError(f"Could not open video file at {self.path}")
+        logger.info(
+            f"Replaying {self.path} at {self.fps:.1f} fps, speed {self.pacer.speed or 'unthrottled'}, "
+            f"every {self.frame_step} frame(s){', looping' if self.loop else ''}"
+        )
+        self._threads = [
+            threading.Thread(target=self._decode, name="replay-decoder", daemon=True),
+            threading.Thread(target=self._deliver, args=(on_frame,), name="replay-pacer", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @property
+    def finished(self) -> bool:
+        return all(not thread.is_alive() for thread in self._threads)
+
+    def _put(self, item: Optional[ReplayFrame]) -> bool:
+        """Blocking put that gives up when the source is stopped."""
+        while not self._stop.is_set():
+            try:
+                self._buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode(self) -> None:
+        capture = self._capture
+        frame_period_ns = int(1e9 / self.fps)
+        loop_offset_ns = 0
+        last_ts_ns = 0
+        index = 0
+
+        try:
+            while not self._stop.is_set():
+                # Sampled out frames are only grabbed, not decoded
+                if index % self.frame_step:
+                    if not capture.grab():
+                        if self._rewind():
+                            loop_offset_ns = last_ts_ns + frame_period_ns
+                            index = 0
+                            continue
+                        break
+                    index += 1
+                    continue
+
+                success, image = capture.read()
+                if not success:
+                    if self._rewind():
+                        loop_offset_ns = last_ts_ns + frame_period_ns
+                        index = 0
+                        continue
+                    break
+
+                position_ms = capture.get(cv2.CAP_PROP_POS_MSEC)
+                ts_ns = int(position_ms * 1e6) if position_ms > 0 else index * frame_period_ns
+                last_ts_ns = loop_offset_ns + ts_ns
+
+                frame = ReplayFrame(image=cv2.cvtColor(image, cv2.COLOR_BGR2RGB), timestamp_ns=last_ts_ns, index=index)
+                self.frames_decoded += 1
+                index += 1
+                if not self._put(frame):
+                    break
+        except Exception as e:
+            logger.error(f"Replay decoder failed: {e}", exc_info=True)
+        finally:
+            capture.release()
+            self._put(None) # end of stream
+
+    def _rewind(self) -> bool:
+        if not self.loop or self._stop.is_set():
+            return False
+        logger.debug("End of video, looping")
+        return self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _deliver(self, on_frame: Callable[[ReplayFrame], None]) -> None:
+        while not self._stop.is_set():
+            try:
+                frame = self._buffer.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if frame is None:
+                break
+
+            self.pacer.wait(frame.timestamp_ns, self._stop)
+            if self._stop.is_set():
+                break
+            try:
+                on_frame(frame)
+            except Exception as e:
+                logger.error(f"Replay frame callback failed: {e}", exc_info=True)
+            self.frames_delivered += 1
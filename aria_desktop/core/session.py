@@ -0,0 +1,104 @@
+import asyncio
+import aria.sdk as aria
+from typing import Optional
+
+from .client import AriaClient
+from .streaming_handler import StreamingHandler
+from ..utils.config import config
+from ..utils.logger import logger
+from ..bus import AsyncEventBus
+
+
+class DeviceSession:
+    """A connected device together with its configured streaming handler."""
+
+    def __init__(self, client: AriaClient, device: aria.Device, handler: StreamingHandler, battery_level: int):
+        self.client = client
+        self.device = device
+        self.handler = handler
+        self.battery_level = battery_level
+
+
+class SessionManager:
+    """
+    Keeps the device connection and the streaming session warm across start/stop cycles.
+    stop() only unsubscribes, a later start() resubscribes to the running session.
+    A session that stays idle longer than idle_timeout is released (stream stopped, device disconnected).
+    """
+
+    def __init__(self, bus: AsyncEventBus):
+        self.bus = bus
+        self.idle_timeout = config.getfloat('streaming', 'session_idle_timeout', fallback=300.0)
+        self.session: Optional[DeviceSession] = None
+        self._lock = asyncio.Lock()
+        self._idle_task: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> DeviceSession:
+        """Return the warm session, connecting and configuring the device if there is none."""
+        async with self._lock:
+            self._cancel_idle_release()
+            if self.session is not None:
+                logger.info("Reusing warm device session")
+                return self.session
+
+            loop = asyncio.get_running_loop()
+
+            # Initialize the client (it will load settings from config.ini)
+            client = AriaClient()
+            device = await client.connect()
+            logger.info("Successfully connected to the Aria device.")
+
+            # Reading the status is a round trip to the glasses, keep it off the loop
+            battery_level = await asyncio.to_thread(client.get_battery_level, device)
+            logger.info(f"Battery level : {battery_level}%")
+
+            handler = await asyncio.to_thread(StreamingHandler, device, self.bus, loop)
+            self.session = DeviceSession(client, device, handler, battery_level)
+            return self.session
+
+    async def start(self, session: DeviceSession) -> None:
+        """Start the streaming session if needed and subscribe to it."""
+        await asyncio.to_thread(session.handler.start_session)
+        await asyncio.to_thread(session.handler.subscribe)
+
+    async def stop(self) -> None:
+        """Unsubscribe only, the connection stays warm until the idle timeout."""
+        session = self.session
+        if session is None:
+            return
+        try:
+            await asyncio.to_thread(session.handler.unsubscribe)
+        except Exception as e:
+            logger.error(f"Failed to unsubscribe, releasing session: {e}")
+            await self.release()
+            return
+        self._schedule_idle_release()
+
+    async def release(self) -> None:
+        """Stop the streaming session and disconnect the device."""
+        self._cancel_idle_release()
+        async with self._lock:
+            session, self.session = self.session, None
+            if session is None:
+                return
+            logger.info("Releasing device session")
+            await asyncio.to_thread(session.handler.stop_streaming)
+            try:
+                await asyncio.to_thread(session.client.device_client.disconnect, session.device)
+            except Exception as e:
+                logger.error(f"Failed to disconnect device: {e}")
+
+    def _schedule_idle_release(self) -> None:
+        self._cancel_idle_release()
+        if self.idle_timeout > 0:
+            self._idle_task = asyncio.create_task(self._release_when_idle())
+
+    def _cancel_idle_release(self) -> None:
+        if self._idle_task and not self._idle_task.done() and self._idle_task is not asyncio.current_task():
+            self._idle_task.cancel()
+        self._idle_task = None
+
+    async def _release_when_idle(self) -> None:
+        await asyncio.sleep(self.idle_timeout)
+        logger.info(f"Device session idle for {self.idle_timeout:.0f}s")
+        await self.release()
@@ -0,0 +1,309 @@
+import random
+import threading
+import time
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..utils.config import config
+from ..utils.logger import logger
+
+# The SDK is only imported once the simulator streams (through .streams),
+# so the emitters can be used without it
+
+
+@dataclass
+class SimulatedCamera:
+    name: str
+    fps: float
+    width: int
+    height: int
+
+    @property
+    def channels(self) -> int:
+        return 3 if self.name == "rgb" else 1
+
+
+@dataclass
+class SimulatorConfig:
+    cameras: List[SimulatedCamera] = field(default_factory=lambda: [SimulatedCamera("rgb", 30, 1408, 1408)])
+    imu_rate: float = 1000.0 # samples per second per IMU
+    imu_batch: int = 10 # samples per on_imu_received call
+    magneto_rate: float = 10.0
+    baro_rate: float = 50.0
+    jitter_ms: float = 2.0 # standard deviation of the delivery time
+    burst_probability: float = 0.0 # chance per callback to hold data back and deliver it in a burst
+    burst_length: int = 5
+    failure_after_sec: float = 0.0 # inject on_streaming_client_failure after this long, 0 never
+    battery_level: int = 100
+
+    @classmethod
+    def from_config(cls) -> "SimulatorConfig":
+        cameras = []
+        spec = config.get('simulator', 'cameras', fallback='rgb:30:1408:1408')
+        for entry in spec.split(","):
+            if entry.strip():
+                name, fps, width, height = entry.strip().split(":")
+                cameras.append(SimulatedCamera(name, float(fps), int(width), int(height)))
+        return cls(
+            cameras=cameras,
+            imu_rate=config.getfloat('simulator', 'imu_rate', fallback=1000.0),
+            imu_batch=config.getint('simulator', 'imu_batch', fallback=10),
+            magneto_rate=config.getfloat('simulator', 'magneto_rate', fallback=10.0),
+            baro_rate=config.getfloat('simulator', 'baro_rate', fallback=50.0),
+            jitter_ms=config.getfloat('simulator', 'jitter_ms', fallback=2.0),
+            burst_probability=config.getfloat('simulator', 'burst_probability', fallback=0.0),
+            burst_length=config.getint('simulator', 'burst_length', fallback=5),
+            failure_after_sec=config.getfloat('simulator', 'failure_after_sec', fallback=0.0),
+            battery_level=config.getint('simulator', 'battery_level', fallback=100),
+        )
+
+
+# Stand-ins for the records and samples the SDK delivers, same attribute names
+
+@dataclass
+class SimulatedImageRecord:
+    camera_id: Any
+    capture_timestamp_ns: int
+    frame_number: int
+    arrival_timestamp_ns: int = 0
+
+
+@dataclass
+class SimulatedMotionData:
+    capture_timestamp_ns: int
+    accel_msec2: List[float] = field(default_factory=lambda: [0.0, 0.0, 0.0])
+    gyro_radsec: List[float] = field(default_factory=lambda: [0.0, 0.0, 0.0])
+    mag_tesla: List[float] = field(default_factory=lambda: [0.0, 0.0, 0.0])
+
+
+@dataclass
+class SimulatedBarometerData:
+    capture_timestamp_ns: int
+    pressure: float
+    temperature: float
+
+
+class _Emitter:
+    """
+    Calls emit() at a fixed rate from its own thread, against absolute deadlines,
+    with gaussian jitter and optional bursts (data held back, then delivered back to back).
+    """
+
+    def __init__(self, name: str, rate: float, emit: Callable[[int, int], None], sim: SimulatorConfig,
+                 stop: threading.Event, rng: Optional[random.Random] = None):
+        self.name = name
+        self.period = 1.0 / rate
+        self.emit = emit
+        self.sim = sim
+        self.stop = stop
+        self.rng = rng or random.Random()
+        self.held: List[Tuple[int, int]] = [] # (tick, capture time ns) of the current burst, not delivered yet
+        self._burst_left = 0
+        self.thread = threading.Thread(target=self._run, name=f"sim-{name}", daemon=True)
+
+    def _tick(self, count: int, capture_ns: int) -> List[Tuple[int, int]]:
+        """Ticks to deliver at tick count: just this one, none during a burst, all the held ones when it ends."""
+        self.held.append((count, capture_ns))
+        if self._burst_left == 0 and self.rng.random() < self.sim.burst_probability:
+            self._burst_left = self.sim.burst_length
+        if self._burst_left > 1:
+            self._burst_left -= 1
+            return []
+        self._burst_left = 0
+        ticks, self.held = self.held, []
+        return ticks
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        count = 0
+        while not self.stop.is_set():
+            deadline = start + count * self.period + self.rng.gauss(0, self.sim.jitter_ms / 1000)
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                self.stop.wait(delay)
+            count += 1
+
+            try:
+                # Held data keeps the time it was captured at, it is only delivered late
+                for tick, capture_ns in self._tick(count, time.time_ns()):
+                    self.emit(tick, capture_ns)
+            except Exception as e:
+                logger.error(f"Simulated {self.name} callback failed: {e}", exc_info=True)
+
+
+class SimulatedStreamingClient:
+    """Stands in for aria.StreamingClient, drives the observer with synthetic data."""
+
+    def __init__(self, sim: SimulatorConfig):
+        self.sim = sim
+        self.subscription_config = None
+        self.observer = None
+        self._stop = threading.Event()
+        self._emitters: List[_Emitter] = []
+        self._frames: Dict[str, List[np.ndarray]] = {}
+        self.delivered: Dict[str, int] = {}
+
+    def set_streaming_client_observer(self, observer) -> None:
+        self.observer = observer
+
+    def _synthetic_frames(self, camera: SimulatedCamera, count: int = 8) -> List[np.ndarray]:
+        """A few precomputed frames with a moving bar over a gradient, reused in rotation."""
+        y, x = np.mgrid[0:camera.height, 0:camera.width]
+        base = ((x + y) * 255 // (camera.width + camera.height)).astype(np.uint8)
+        frames = []
+        for i in range(count):
+            frame = base.copy()
+            bar = (i * camera.width // count)
+            frame[:, bar:bar + camera.width // 16] = 255
+            if camera.channels == 3:
+                frame = np.stack([frame, np.roll(frame, 7, axis=1), np.roll(frame, 13, axis=0)], axis=-1)
+            frames.append(frame)
+        return frames
+
+    def _subscribed(self, stream: str) -> bool:
+        """Whether the subscription config enables a stream of STREAM_TYPES, every stream without a config."""
+        if self.subscription_config is None:
+            return True
+        from .streams import STREAM_TYPES
+        return int(self.subscription_config.subscriber_data_type & STREAM_TYPES[stream]) != 0
+
+    def subscribe(self) -> None:
+        if self.observer is None:
+            raise RuntimeError("No streaming client observer set")
+        self._stop.clear()
+        self._emitters = []
+
+        # Like the SDK, only the subscribed data types are delivered, both SLAM cameras come with slam
+        for camera in self.sim.cameras:
+            if not self._subscribed("slam" if camera.name.startswith("slam") else camera.name):
+                continue
+            self._frames[camera.name] = self._synthetic_frames(camera)
+            self._emitters.append(_Emitter(camera.name, camera.fps, self._camera_emitter(camera), self.sim, self._stop))
+
+        if self.sim.imu_rate > 0 and self._subscribed("imu"):
+            batch_rate = self.sim.imu_rate / self.sim.imu_batch
+            for imu_idx in (0, 1):
+                self._emitters.append(_Emitter(f"imu{imu_idx}", batch_rate, self._imu_emitter(imu_idx), self.sim, self._stop))
+        if self.sim.magneto_rate > 0 and self._subscribed("magneto"):
+            self._emitters.append(_Emitter("magneto", self.sim.magneto_rate, self._emit_magneto, self.sim, self._stop))
+        if self.sim.baro_rate > 0 and self._subscribed("baro"):
+            self._emitters.append(_Emitter("baro", self.sim.baro_rate, self._emit_baro, self.sim, self._stop))
+
+        if self.sim.failure_after_sec > 0:
+            threading.Thread(target=self._inject_failure, name="sim-failure", daemon=True).start()
+
+        for emitter in self._emitters:
+            emitter.thread.start()
+        logger.info(f"Simulator streaming: {', '.join(emitter.name for emitter in self._emitters)}")
+
+    def unsubscribe(self) -> None:
+        self._stop.set()
+        for emitter in self._emitters:
+            emitter.thread.join(timeout=1.0)
+        self._emitters = []
+
+    def _count(self, name: str) -> None:
+        self.delivered[name] = self.delivered.get(name, 0) + 1
+
+    def _camera_emitter(self, camera: SimulatedCamera) -> Callable[[int, int], None]:
+        from .streams import CAMERAS
+        camera_id = CAMERAS[camera.name].camera_id
+        frames = self._frames[camera.name]
+
+        def emit(count: int, capture_ns: int) -> None:
+            record = SimulatedImageRecord(camera_id=camera_id, capture_timestamp_ns=capture_ns, frame_number=count,
+                                          arrival_timestamp_ns=time.time_ns())
+            self.observer.on_image_received(frames[count % len(frames)], record)
+            self._count(camera.name)
+        return emit
+
+    def _imu_emitter(self, imu_idx: int) -> Callable[[int, int], None]:
+        sample_period_ns = int(1e9 / self.sim.imu_rate)
+
+        def emit(count: int, capture_ns: int) -> None:
+            first = capture_ns - (self.sim.imu_batch - 1) * sample_period_ns
+            samples = []
+            for i in range(self.sim.imu_batch):
+                t = first + i * sample_period_ns
+                phase = t * 1e-9
+                samples.append(SimulatedMotionData(
+                    capture_timestamp_ns=t,
+                    accel_msec2=[0.3 * np.sin(phase * 6.0), 9.81 + 0.1 * np.sin(phase * 40.0), 0.2 * np.cos(phase * 3.0)],
+                    gyro_radsec=[0.05 * np.sin(phase * 2.0), 0.02 * np.cos(phase * 5.0), 0.01 * np.sin(phase * 9.0)],
+                ))
+            self.observer.on_imu_received(samples, imu_idx)
+            self._count(f"imu{imu_idx}")
+        return emit
+
+    def _emit_magneto(self, count: int, capture_ns: int) -> None:
+        phase = capture_ns * 1e-9 * 0.5
+        sample = SimulatedMotionData(capture_timestamp_ns=capture_ns, mag_tesla=[2e-5 * np.cos(phase), 2e-5 * np.sin(phase), -4e-5])
+        self.observer.on_magneto_received(sample)
+        self._count("magneto")
+
+    def _emit_baro(self, count: int, capture_ns: int) -> None:
+        sample = SimulatedBarometerData(capture_timestamp_ns=capture_ns, pressure=101325.0 + 5.0 * np.sin(capture_ns * 1e-9), temperature=25.0)
+        self.observer.on_baro_received(sample)
+        self._count("baro")
+
+    def _inject_failure(self) -> None:
+        if self._stop.wait(self.sim.failure_after_sec):
+            return
+        logger.warning("Simulator injecting streaming client failure")
+        self.observer.on_streaming_client_failure(None, "simulated streaming failure")
+        self.unsubscribe()
+
+
+class SimulatedStreamingManager:
+    """Stands in for aria.StreamingManager."""
+
+    def __init__(self, sim: SimulatorConfig):
+        self.streaming_client = SimulatedStreamingClient(sim)
+        self.streaming_config = None
+        self.streaming_state = "Stopped"
+
+    def start_streaming(self) -> None:
+        self.streaming_state = "Streaming"
+
+    def stop_streaming(self) -> None:
+        self.streaming_client.unsubscribe()
+        self.streaming_state = "Stopped"
+
+
+@dataclass
+class SimulatedDeviceStatus:
+    battery_level: int
+    default_recording_profile: str = "simulated"
+
+
+class SimulatedDevice:
+    """Stands in for aria.Device."""
+
+    def __init__(self, sim: SimulatorConfig):
+        self.sim = sim
+        self.streaming_manager = SimulatedStreamingManager(sim)
+
+    @property
+    def status(self) -> SimulatedDeviceStatus:
+        return SimulatedDeviceStatus(battery_level=self.sim.battery_level)
+
+    def __repr__(self) -> str:
+        cameras = ", ".join(f"{c.name} {c.width}x{c.height}@{c.fps:g}" for c in self.sim.cameras)
+        return f"SimulatedDevice({cameras})"
+
+
+class SimulatedDeviceClient:
+    """Stands in for aria.DeviceClient, connect() returns a simulated device."""
+
+    def __init__(self, sim: Optional[SimulatorConfig] = None):
+        self.sim = sim or SimulatorConfig.from_config()
+
+    def set_client_config(self, client_config) -> None:
+        pass
+
+    def connect(self) -> SimulatedDevice:
+        return SimulatedDevice(self.sim)
+
+    def disconnect(self, device: SimulatedDevice) -> None:
+        device.streaming_manager.stop_streaming()
@@ -1,11 +1,15 @@
 import aria.sdk as aria
 from aria.sdk import DeviceStatus
 import asyncio
+import functools
+import operator
+from typing import Optional
 
 from ..utils import handler
 from ..utils.config import config
 from ..utils.logger import logger
 from ..utils.observer import StreamingObserver
+from .streams import STREAM_TYPES, queue_size, subscribed_streams
 from ..bus import AsyncEventBus
 
 
@@ -16,6 +20,9 @@ class StreamingHandler:
         self.streaming_client = self.streaming_manager.streaming_client
         self.event_bus = event_bus
         self.loop = loop # pass the event loop of the main thread to observer
+        self.observer: Optional[StreamingObserver] = None
+        self.session_started = False
+        self.subscribed = False
 
         # Configure streaming settings
         streaming_config = aria.StreamingConfig()
@@ -44,14 +51,17 @@ class StreamingHandler:
         streaming_config.security_options.use_ephemeral_certs = True
         sub_config = aria.StreamingSubscriptionConfig()
         
-        # 2. Specifically enable RGB and disable others if necessary
-        # Usually, they are False by default, but it's good practice to be explicit
-        sub_config.subscriber_data_type = aria.StreamingDataType.Rgb
-        sub_config.message_queue_size[aria.StreamingDataType.Imu] = 400
-        sub_config.message_queue_size[aria.StreamingDataType.Magneto] = 400
-        sub_config.message_queue_size[aria.StreamingDataType.Baro] = 400
-        # sub_config.message_queue_size[aria.StreamingDataType.Rgb] = 20
-        sub_config.message_queue_size[aria.StreamingDataType.EyeTrack] = 400
+        # 2. Enable the configured streams only, every other one is off
+        streams = subscribed_streams()
+        if not streams:
+            logger.warning("No stream configured in [streaming] streams, subscribing to rgb")
+            streams = ["rgb"]
+        logger.info(f"Subscribing to streams: {', '.join(streams)}")
+        sub_config.subscriber_data_type = functools.reduce(operator.or_, (STREAM_TYPES[stream] for stream in streams))
+        for stream in streams:
+            size = queue_size(stream)
+            if size is not None:
+                sub_config.message_queue_size[STREAM_TYPES[stream]] = size
         # 3. Assign the config object to the client
         self.streaming_client.subscription_config = sub_config
 
@@ -70,54 +80,55 @@ class StreamingHandler:
         return self.streaming_client
     
     
+    def start_session(self):
+        """Start the streaming session on the device, it stays up across subscribe/unsubscribe."""
+        if self.session_started:
+            return
+        logger.info("Starting streaming session...")
+        self.streaming_manager.start_streaming()
+        self.session_started = True
+        logger.info("Streaming session started successfully.")
+
+    def subscribe(self):
+        """Subscribe to the streamed data, the observer is created once and reused."""
+        if self.subscribed:
+            return
+        if self.observer is None:
+            self.observer = StreamingObserver(bus=self.event_bus, loop=self.loop)
+            self.streaming_client.set_streaming_client_observer(self.observer)
+
+        self.streaming_client.subscribe()
+        self.subscribed = True
+        logger.info("Subscribed to streaming data successfully.")
+
+    def unsubscribe(self):
+        """Stop receiving data, the streaming session on the device keeps running."""
+        if not self.subscribed:
+            return
+        logger.info("Unsubscribing from stream")
+        self.streaming_client.unsubscribe()
+        self.subscribed = False
+        logger.info("Successfully unsubscribed from streaming")
+
     def stop_streaming(self):
         """Stop the streaming session."""
         try:
-            logger.info("Unsubscribing from stream")
-            self.streaming_client.unsubscribe()
-            logger.info("Successfully unsubscribed from streaming")
+            self.unsubscribe()
+
+            if self.session_started:
+                logger.info("Stopping streaming session...")
+                self.streaming_manager.stop_streaming()
+                self.session_started = False
+                logger.info("Streaming session stopped successfully.")
 
-            logger.info("Stopping streaming session...")
-            self.streaming_manager.stop_streaming()
-            logger.info("Streaming session stopped successfully.")
+            if self.observer is not None:
+                self.observer.close()
 
 
         except Exception as e:
             logger.error(f"Failed to stop streaming: {e}")
             
 
-    async def start_streaming(self, connected_client):
-        """Start the streaming session.Wait untill exit command to stop stream"""
-        try:
-            logger.info("Starting streaming session...")
-            self.streaming_manager.start_streaming()
-            logger.info("Streaming session started successfully.")
-
-          
-            # set observer
-          
-            observer = StreamingObserver(bus=self.event_bus, loop=self.loop)
-            self.streaming_client.set_streaming_client_observer(observer)
-
-            self.streaming_client.subscribe()
-            logger.info("Subscribed to streaming data successfully.")
-         
-            logger.info("Streaming data... Press Ctrl+C to stop.")
-           
-            if connected_client:
-                await connected_client.send('{"type": "STREAM_STARTED", "payload": {"status": "started", "reason": "starting streaming from sdk"}}')
-            # This will wait forever until the task is cancelled (by Ctrl+C)
-            await asyncio.Event().wait()
-
-        except (asyncio.CancelledError, KeyboardInterrupt):
-            logger.info("Stop signal received.")
-        except Exception as e:
-            logger.error(f"Failed to start streaming: {e}")
-        finally:
-            # Ensure we always stop the stream on exit
-            logger.info("Cleaning up and stopping stream...")
-            self.stop_streaming()
-
     def get_streaming_state(self) -> aria.StreamingState:
         """Return the current streaming state."""
         logger.debug("Retrieving current streaming state")
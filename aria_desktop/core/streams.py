@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import aria.sdk as aria
+
+from ..utils.config import config
+from ..utils.logger import logger
+from ..server.protocol import VideoStream
+
+# Streams that can be subscribed, by their name in [streaming] streams.
+# Both SLAM cameras come with the slam subscription.
+STREAM_TYPES: Dict[str, aria.StreamingDataType] = {
+    "rgb": aria.StreamingDataType.Rgb,
+    "slam": aria.StreamingDataType.Slam,
+    "et": aria.StreamingDataType.EyeTrack,
+    "imu": aria.StreamingDataType.Imu,
+    "magneto": aria.StreamingDataType.Magneto,
+    "baro": aria.StreamingDataType.Baro,
+    "audio": aria.StreamingDataType.Audio,
+}
+SENSOR_STREAMS = ("imu", "magneto", "baro")
+
+
+@dataclass(frozen=True)
+class CameraStream:
+    """A camera routed to its own bus topic, <name>_frame."""
+    name: str
+    camera_id: aria.CameraId
+    stream_id: VideoStream # stream id of its video frames
+    upright: bool # rotated 90° clockwise before publishing, like the RGB feed
+
+    @property
+    def topic(self) -> str:
+        return f"{self.name}_frame"
+
+
+CAMERAS: Dict[str, CameraStream] = {
+    "rgb": CameraStream("rgb", aria.CameraId.Rgb, VideoStream.RGB, upright=True),
+    "slam1": CameraStream("slam1", aria.CameraId.Slam1, VideoStream.SLAM1, upright=True),
+    "slam2": CameraStream("slam2", aria.CameraId.Slam2, VideoStream.SLAM2, upright=True),
+    "et": CameraStream("et", aria.CameraId.EyeTrack, VideoStream.ET, upright=False),
+}
+CAMERAS_BY_ID: Dict[aria.CameraId, CameraStream] = {camera.camera_id: camera for camera in CAMERAS.values()}
+
+
+def _names(section: str, key: str, fallback: str, known) -> List[str]:
+    names = []
+    for name in config.get(section, key, fallback=fallback).split(","):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in known:
+            logger.warning(f"Unknown stream '{name}' in [{section}] {key}, known: {', '.join(known)}")
+            continue
+        names.append(name)
+    return names
+
+
+def subscribed_streams() -> List[str]:
+    """Streams of [streaming] streams, plus the sensors of [sensors] and the microphones of [audio]."""
+    streams = _names('streaming', 'streams', 'rgb', STREAM_TYPES)
+    if config.getboolean('sensors', 'enabled', fallback=False):
+        streams += [name for name in SENSOR_STREAMS if name not in streams]
+    if config.getboolean('audio', 'enabled', fallback=False) and "audio" not in streams:
+        streams.append("audio")
+    return streams
+
+
+def queue_size(stream: str) -> Optional[int]:
+    """SDK message queue size of a stream from [streaming] <stream>_queue_size, None keeps the SDK default."""
+    fallback = None
+    if stream in SENSOR_STREAMS:
+        fallback = config.getint('sensors', 'message_queue_size', fallback=32)
+    elif stream == "audio":
+        fallback = config.getint('audio', 'message_queue_size', fallback=32)
+    return config.getint('streaming', f'{stream}_queue_size', fallback=fallback)
+
+
+def forwarded_cameras() -> List[CameraStream]:
+    """Cameras besides RGB sent to the websocket clients, from [websocket] forward_cameras."""
+    names = _names('websocket', 'forward_cameras', '', [name for name in CAMERAS if name != "rgb"])
+    return [CAMERAS[name] for name in names]
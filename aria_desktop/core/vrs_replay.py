@@ -0,0 +1,200 @@
+import threading
+import aria.sdk as aria
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from projectaria_tools.core import data_provider
+from projectaria_tools.core.sensor_data import (
+    AudioData,
+    AudioDataRecord,
+    SensorDataType,
+    TimeDomain,
+)
+
+from .replay import ReplayPacer
+from ..utils.config import config
+from ..utils.logger import logger
+
+
+# VRS stream labels of the Aria glasses and what the streaming SDK calls them
+CAMERA_LABELS = {
+    "camera-rgb": aria.CameraId.Rgb,
+    "camera-slam-left": aria.CameraId.Slam1,
+    "camera-slam-right": aria.CameraId.Slam2,
+    "camera-et": aria.CameraId.EyeTrack,
+}
+IMU_LABELS = {
+    "imu-right": 0,
+    "imu-left": 1,
+}
+STREAM_GROUPS = {
+    "rgb": {"camera-rgb"},
+    "slam": {"camera-slam-left", "camera-slam-right"},
+    "et": {"camera-et"},
+    "imu": set(IMU_LABELS),
+    "magneto": {"mag0"},
+    "baro": {"baro0"},
+    "audio": {"mic"},
+}
+
+
+@dataclass
+class AudioDataAndRecord:
+    """Audio block delivered to on_audio_received, samples plus their record."""
+    audio: AudioData
+    record: AudioDataRecord
+
+    @property
+    def data(self):
+        return self.audio.data
+
+
+class VrsReplaySource:
+    """
+    Replays a VRS recording through the StreamingObserver callback interface.
+    Sensor data is delivered in device timestamp order, paced by the original timestamps
+    (speed 0 delivers as fast as possible), optionally restricted to a time range.
+    seek() jumps to another position while replaying.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        streams: Optional[Set[str]] = None,
+        speed: float = 1.0,
+        start_sec: float = 0.0,
+        end_sec: Optional[float] = None,
+    ):
+        self.path = path
+        self.pacer = ReplayPacer(speed)
+        self.start_ns = int(start_sec * 1e9)
+        self.end_ns = int(end_sec * 1e9) if end_sec else None
+
+        self.provider = data_provider.create_vrs_data_provider(path)
+        if self.provider is None:
+            raise RuntimeError(f"Could not open VRS file at {path}")
+
+        labels = set().union(*(STREAM_GROUPS[group] for group in (streams or STREAM_GROUPS)))
+        self.stream_ids = {}
+        for stream_id in self.provider.get_all_streams():
+            label = self.provider.get_label_from_stream_id(stream_id)
+            if label in labels:
+                self.stream_ids[label] = stream_id
+
+        self.first_ns = self.provider.get_first_time_ns_all_streams(TimeDomain.DEVICE_TIME)
+        self.last_ns = self.provider.get_last_time_ns_all_streams(TimeDomain.DEVICE_TIME)
+
+        self._stop = threading.Event()
+        self._seek_lock = threading.Lock()
+        self._seek_to: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self.position_ns = self.start_ns # relative to the start of the recording
+        self.frames_delivered = 0
+        self.delivered: Dict[str, int] = {label: 0 for label in self.stream_ids}
+
+    @classmethod
+    def from_config(cls, path: str) -> "VrsReplaySource":
+        streams = config.get('debug', 'vrs_streams', fallback=",".join(STREAM_GROUPS))
+        end_sec = config.getfloat('debug', 'vrs_end_sec', fallback=0.0)
+        return cls(
+            path,
+            streams={stream.strip() for stream in streams.split(",") if stream.strip()},
+            speed=config.getfloat('debug', 'replay_speed', fallback=1.0),
+            start_sec=config.getfloat('debug', 'vrs_start_sec', fallback=0.0),
+            end_sec=end_sec or None,
+        )
+
+    @property
+    def duration_ns(self) -> int:
+        return self.last_ns - self.first_ns
+
+    def start(self, observer: Any) -> None:
+        logger.info(
+            f"Replaying {self.path} ({self.duration_ns / 1e9:.1f}s), streams: {', '.join(sorted(self.stream_ids))}, "
+            f"speed {self.pacer.speed or 'unthrottled'}"
+        )
+        self._thread = threading.Thread(target=self._run, args=(observer,), name="vrs-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread:
+            self._thread.join(timeout)
+
+    def seek(self, position_sec: float) -> None:
+        """Continue the replay from this position, in seconds from the start of the recording."""
+        with self._seek_lock:
+            self._seek_to = int(position_sec * 1e9)
+
+    def _options(self, start_ns: int):
+        options = self.provider.get_default_deliver_queued_options()
+        options.deactivate_stream_all()
+        for stream_id in self.stream_ids.values():
+            options.activate_stream(stream_id)
+        options.set_truncate_first_device_time_ns(max(0, start_ns))
+        if self.end_ns:
+            options.set_truncate_last_device_time_ns(max(0, self.duration_ns - self.end_ns))
+        return options
+
+    def _run(self, observer: Any) -> None:
+        start_ns = self.start_ns
+        try:
+            while not self._stop.is_set():
+                self.pacer.reset()
+                seek_to = self._deliver_from(start_ns, observer)
+                if seek_to is None:
+                    break
+                logger.info(f"Seeking replay to {seek_to / 1e9:.1f}s")
+                start_ns = seek_to
+        except Exception as e:
+            logger.error(f"VRS replay failed: {e}", exc_info=True)
+            observer.on_streaming_client_failure(None, str(e))
+        logger.info(f"VRS replay finished, delivered: {self.delivered}")
+
+    def _deliver_from(self, start_ns: int, observer: Any) -> Optional[int]:
+        """Deliver data from start_ns on. Returns the seek position if a seek interrupted it."""
+        for sensor_data in self.provider.deliver_queued_sensor_data(self._options(start_ns)):
+            if self._stop.is_set():
+                return None
+            with self._seek_lock:
+                seek_to, self._seek_to = self._seek_to, None
+            if seek_to is not None:
+                return seek_to
+
+            timestamp_ns = sensor_data.get_time_ns(TimeDomain.DEVICE_TIME)
+            self.position_ns = timestamp_ns - self.first_ns
+            label = self.provider.get_label_from_stream_id(sensor_data.stream_id())
+            data_type = sensor_data.sensor_data_type()
+
+            # Decode before waiting, so the callback fires on time
+            if data_type == SensorDataType.IMAGE:
+                image_data, record = sensor_data.image_data_and_record()
+                image = image_data.to_numpy_array()
+                # Records read from VRS don't carry the streaming camera id
+                record.camera_id = int(CAMERA_LABELS[label])
+                self.pacer.wait(timestamp_ns, self._stop)
+                observer.on_image_received(image, record)
+                self.frames_delivered += 1
+            elif data_type == SensorDataType.IMU:
+                sample = sensor_data.imu_data()
+                self.pacer.wait(timestamp_ns, self._stop)
+                observer.on_imu_received([sample], IMU_LABELS[label])
+            elif data_type == SensorDataType.MAGNETOMETER:
+                sample = sensor_data.magnetometer_data()
+                self.pacer.wait(timestamp_ns, self._stop)
+                observer.on_magneto_received(sample)
+            elif data_type == SensorDataType.BAROMETER:
+                sample = sensor_data.barometer_data()
+                self.pacer.wait(timestamp_ns, self._stop)
+                observer.on_baro_received(sample)
+            elif data_type == SensorDataType.AUDIO:
+                audio, record = sensor_data.audio_data_and_record()
+                self.pacer.wait(timestamp_ns, self._stop)
+                observer.on_audio_received(AudioDataAndRecord(audio, record))
+            else:
+                continue
+            self.delivered[label] += 1
+        return None
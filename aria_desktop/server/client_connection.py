@@ -0,0 +1,161 @@
+import asyncio
+import time
+import websockets.exceptions
+
+from ..utils.logger import logger
+
+
+class ClientConnection:
+    """
+    A connected websocket client with its own bounded send queue.
+    Frames are queued without waiting, a dedicated sender task writes them to the socket.
+    When the client can't keep up its oldest queued frame is dropped, so a slow client
+    only loses frames itself and never blocks the others.
+    Sensor blocks and the frames of the other cameras have a queue and sender of their own,
+    they never push out RGB frames.
+    """
+
+    def __init__(self, websocket, queue_size: int = 2, tier: str = "full", sensor_queue_size: int = 64,
+                 camera_queue_size: int = 4):
+        self.websocket = websocket
+        self.tier = tier # simulcast tier this client receives, switched with SET_TIER
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.sensor_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, sensor_queue_size))
+        self.camera_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, camera_queue_size))
+        self.task: asyncio.Task | None = None
+        self.sensor_task: asyncio.Task | None = None
+        self.camera_task: asyncio.Task | None = None
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.sensor_sent = 0
+        self.sensor_dropped = 0
+        self.camera_sent = 0
+        self.camera_dropped = 0
+        self.bytes_sent = 0
+        self.receive_fps: float | None = None # reported by the client with CLIENT_STATS
+        self.latency_ema: float | None = None # queue wait + send time of the frames
+
+    @property
+    def name(self) -> str:
+        return str(self.websocket.remote_address)
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._sender())
+        self.sensor_task = asyncio.create_task(self._sensor_sender())
+        self.camera_task = asyncio.create_task(self._camera_sender())
+
+    async def close(self) -> None:
+        self.closed = True
+        for task in (self.task, self.sensor_task, self.camera_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    def enqueue(self, data: bytes) -> None:
+        """Queue a frame for this client, dropping the oldest queued one if the queue is full."""
+        if self.closed:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((data, time.perf_counter()))
+
+    def enqueue_sensor(self, data: bytes) -> None:
+        """Queue a sensor frame, dropping the oldest queued one if the queue is full."""
+        if self.closed:
+            return
+        if self.sensor_queue.full():
+            self.sensor_queue.get_nowait()
+            self.sensor_dropped += 1
+        self.sensor_queue.put_nowait(data)
+
+    def enqueue_camera(self, data: bytes) -> None:
+        """Queue a frame of a camera other than RGB, dropping the oldest queued one if the queue is full."""
+        if self.closed:
+            return
+        if self.camera_queue.full():
+            self.camera_queue.get_nowait()
+            self.camera_dropped += 1
+        self.camera_queue.put_nowait(data)
+
+    async def send_control(self, message: str) -> None:
+        """Send a control message right away, bypassing the frame queue."""
+        if self.closed:
+            return
+        try:
+            await self.websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            logger.warning(f"Tried to send a message to client {self.name} that has disconnected.")
+            self.closed = True
+
+    async def _sender(self) -> None:
+        try:
+            while True:
+                data, queued_at = await self.queue.get()
+                await self.websocket.send(data)
+
+                latency = time.perf_counter() - queued_at
+                self.latency_ema = latency if self.latency_ema is None else self.latency_ema + 0.2 * (latency - self.latency_ema)
+                self.sent += 1
+                self.bytes_sent += len(data)
+
+        except websockets.exceptions.ConnectionClosed:
+            logger.warning(f"Client {self.name} disconnected while sending.")
+            self.closed = True
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error sending data to client {self.name}: {e}")
+            self.closed = True
+
+    async def _sensor_sender(self) -> None:
+        try:
+            while True:
+                data = await self.sensor_queue.get()
+                await self.websocket.send(data)
+                self.sensor_sent += 1
+                self.bytes_sent += len(data)
+
+        except websockets.exceptions.ConnectionClosed:
+            self.closed = True
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error sending sensor data to client {self.name}: {e}")
+            self.closed = True
+
+    async def _camera_sender(self) -> None:
+        try:
+            while True:
+                data = await self.camera_queue.get()
+                await self.websocket.send(data)
+                self.camera_sent += 1
+                self.bytes_sent += len(data)
+
+        except websockets.exceptions.ConnectionClosed:
+            self.closed = True
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error sending camera frames to client {self.name}: {e}")
+            self.closed = True
+
+    def stats(self) -> dict:
+        return {
+            "tier": self.tier,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "sensor_sent": self.sensor_sent,
+            "sensor_dropped": self.sensor_dropped,
+            "camera_sent": self.camera_sent,
+            "camera_dropped": self.camera_dropped,
+            "bytes_sent": self.bytes_sent,
+            "queued": self.queue.qsize(),
+            "receive_fps": self.receive_fps,
+            "latency_ms": None if self.latency_ema is None else self.latency_ema * 1000,
+        }
@@ -0,0 +1,149 @@
+import json
+import struct
+from dataclasses import dataclass, field
+from enum import Enum, IntEnum
+from typing import Any, Dict, Optional
+
+
+# ── Binary frames ─────────────────────────────────────────────────────────────
+# Every binary websocket message starts with a fixed little-endian header:
+#   magic (2s) | version (B) | kind (B) | codec (B) | stream id (B) | flags (H)
+#   seq (I) | capture timestamp ns (q) | host receive time ns (q) | encode duration us (I)
+# followed by the payload (JPEG bytes for video, packed records for sensors, PCM for audio).
+
+FRAME_MAGIC = b"AF"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<2sBBBBHIqqI")
+
+
+class FrameKind(IntEnum):
+    VIDEO = 1
+    SENSOR = 2
+    AUDIO = 3
+
+
+class Codec(IntEnum):
+    JPEG = 1
+    RECORDS = 2 # packed little-endian records, layout given by the stream id
+    PCM16 = 3 # AUDIO_FORMAT, then interleaved little-endian int16 samples
+
+
+class VideoStream(IntEnum):
+    """Stream id of video frames, the camera they come from."""
+    RGB = 0
+    SLAM1 = 1
+    SLAM2 = 2
+    ET = 3
+
+
+class SensorStream(IntEnum):
+    """Stream id of sensor frames."""
+    IMU0 = 1
+    IMU1 = 2
+    MAGNETO = 3
+    BARO = 4
+
+
+# Sensor frames carry a block of records, the header holds the timestamp of the first one:
+#   IMU:     timestamp ns (q) | accel m/s² xyz (3f) | gyro rad/s xyz (3f)
+#   MAGNETO: timestamp ns (q) | magnetic field T xyz (3f)
+#   BARO:    timestamp ns (q) | pressure Pa (f) | temperature °C (f)
+IMU_RECORD = struct.Struct("<q3f3f")
+SENSOR_RECORDS = {
+    SensorStream.IMU0: IMU_RECORD,
+    SensorStream.IMU1: IMU_RECORD,
+    SensorStream.MAGNETO: struct.Struct("<q3f"),
+    SensorStream.BARO: struct.Struct("<qff"),
+}
+
+# Audio frames carry one chunk, the header holds the timestamp of its first frame:
+#   sample rate Hz (I) | channels (H) | samples (h) interleaved by frame
+AUDIO_FORMAT = struct.Struct("<IH")
+
+
+@dataclass
+class FrameHeader:
+    kind: FrameKind
+    codec: Codec
+    seq: int # bus sequence number, gaps mean dropped frames
+    capture_timestamp_ns: int = 0 # device clock, ImageDataRecord.capture_timestamp_ns
+    host_receive_ns: int = 0 # host wall clock when the SDK delivered the frame
+    encode_us: int = 0
+    stream_id: int = 0
+    flags: int = 0
+
+    def pack(self) -> bytes:
+        return FRAME_HEADER.pack(
+            FRAME_MAGIC, FRAME_VERSION, self.kind, self.codec, self.stream_id, self.flags,
+            self.seq & 0xFFFFFFFF, self.capture_timestamp_ns, self.host_receive_ns,
+            min(self.encode_us, 0xFFFFFFFF),
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes) -> tuple["FrameHeader", memoryview]:
+        """Split a binary message into its header and payload."""
+        (magic, version, kind, codec, stream_id, flags,
+         seq, capture_ns, receive_ns, encode_us) = FRAME_HEADER.unpack_from(data)
+        if magic != FRAME_MAGIC or version != FRAME_VERSION:
+            raise ValueError(f"Not a frame of version {FRAME_VERSION}: magic={magic!r} version={version}")
+        header = cls(
+            kind=FrameKind(kind), codec=Codec(codec), seq=seq,
+            capture_timestamp_ns=capture_ns, host_receive_ns=receive_ns,
+            encode_us=encode_us, stream_id=stream_id, flags=flags,
+        )
+        return header, memoryview(data)[FRAME_HEADER.size:]
+
+
+def pack_frame(header: FrameHeader, payload: bytes) -> bytes:
+    return header.pack() + payload
+
+
+# ── Control messages ──────────────────────────────────────────────────────────
+# Text websocket messages are JSON objects {"type": ..., "payload": {...}}
+
+class MessageType(str, Enum):
+    # server -> client
+    STATUS_UPDATE = "STATUS_UPDATE"
+    STREAM_STARTED = "STREAM_STARTED"
+    ERROR_MSG = "ERROR_MSG"
+    # client -> server
+    CLIENT_STATS = "CLIENT_STATS"
+    SET_TIER = "SET_TIER"
+
+
+@dataclass
+class ControlMessage:
+    type: MessageType
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        return json.dumps({"type": self.type.value, "payload": self.payload})
+
+    @classmethod
+    def from_json(cls, message: str) -> "ControlMessage":
+        """Parse a control message, raises ValueError if it is malformed or of an unknown type."""
+        data = json.loads(message)
+        if not isinstance(data, dict):
+            raise ValueError("Control message must be a JSON object")
+        payload = data.get("payload")
+        if payload is None:
+            payload = {}
+        if not isinstance(payload, dict):
+            raise ValueError("Control message payload must be a JSON object")
+        return cls(type=MessageType(data.get("type")), payload=payload)
+
+
+def _payload(**fields: Optional[Any]) -> Dict[str, Any]:
+    return {key: value for key, value in fields.items() if value is not None}
+
+
+def status_update(status: str, reason: Optional[str] = None) -> str:
+    return ControlMessage(MessageType.STATUS_UPDATE, _payload(status=status, reason=reason)).to_json()
+
+
+def stream_started(status: str, reason: Optional[str] = None) -> str:
+    return ControlMessage(MessageType.STREAM_STARTED, _payload(status=status, reason=reason)).to_json()
+
+
+def error_msg(error: str, reason: str = "") -> str:
+    return ControlMessage(MessageType.ERROR_MSG, {"error": error, "reason": reason}).to_json()
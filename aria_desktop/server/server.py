@@ -1,17 +1,27 @@
 import websockets
 import asyncio
-import cv2
-import numpy as np
+import math
+import statistics
+import time
 
-from typing import Set
+from typing import Dict, List, Optional
 
 from ..utils.logger import logger
 from ..bus import AsyncEventBus, Event
 from ..utils.config import config
-from ..core.client import AriaClient
-from ..core.streaming_handler import StreamingHandler
+from ..core.session import SessionManager
+from ..core.replay import PreviewWindow, ReplayFrame, VideoReplaySource, display_available
+from ..core.vrs_replay import VrsReplaySource
+from ..core.streams import forwarded_cameras
+from ..utils.observer import StreamingObserver
 from ..workers.websocket_worker import  websocket_worker as ws_worker
-from ..utils.config import config
+from ..workers.video_tiers import VideoTier, load_tiers
+from ..workers.recorder import RecordingSink
+from ..workers.frame_cache import FrameCache
+from ..workers.local_yolo import yolo_worker
+from .client_connection import ClientConnection
+from . import protocol
+from .protocol import ControlMessage, MessageType
 
 
 DEBUG = config.getboolean('debug', 'enabled', fallback=False)
@@ -19,56 +29,83 @@ DEBUG = config.getboolean('debug', 'enabled', fallback=False)
 
 
 class WebSocketServer:
-    def __init__(self, bus: AsyncEventBus):
+    def __init__(self, bus: AsyncEventBus, preview: Optional[PreviewWindow] = None):
         self.bus = bus
+        self.preview = preview # debug preview drawn by the main thread, the loop runs on another one
         self.port = config.getint('websocket', 'port', fallback=8080)
         self.task : asyncio.Task | None = None
         self.stop = asyncio.Event() 
-        self.connected_client = None
-
-        # Allow possible multiple clients connections 
-        # self.connected_clients = set()
+        self.sessions = SessionManager(bus)
+
+        # Every connected client has its own bounded send queue
+        self.clients: Dict[object, ClientConnection] = {}
+        self.client_queue_size = config.getint('websocket', 'client_queue_size', fallback=2)
+        self.sensor_queue_size = config.getint('sensors', 'client_queue_size', fallback=64)
+        self.camera_queue_size = config.getint('websocket', 'camera_queue_size', fallback=4)
+
+        # Simulcast tiers of the video feed, each client watches one of them
+        self.tiers: Dict[str, VideoTier] = {tier.name: tier for tier in load_tiers()}
+        self.default_tier = config.get('websocket', 'default_tier', fallback=next(iter(self.tiers)))
+        if self.default_tier not in self.tiers:
+            raise ValueError(f"Unknown default_tier '{self.default_tier}', expected one of: {', '.join(self.tiers)}")
+
+        # Plain JPEGs shared by the recorder and the detector, the websocket tiers are enhanced and never shared
+        self.frame_cache = FrameCache(bus, max_entries=config.getint('websocket', 'frame_cache_entries', fallback=32))
     
-    async def _run_app(self):
-        """Main application logic to run the WebSocket server and handle connections."""
+    def _start_workers(self) -> List[asyncio.Task]:
+        """Start the bus consumers of a streaming run."""
         _ws_worker = ws_worker(self.bus, self)
-        streaming_handler = None
-        
-        loop = asyncio.get_running_loop()
+        tasks = [asyncio.create_task(_ws_worker.forward_rgb())]
+        for camera in forwarded_cameras():
+            tasks.append(asyncio.create_task(_ws_worker.forward_camera(camera)))
+
+        if config.getboolean('sensors', 'enabled', fallback=False):
+            tasks.append(asyncio.create_task(_ws_worker.forward_sensors()))
+        if config.getboolean('audio', 'enabled', fallback=False):
+            tasks.append(asyncio.create_task(_ws_worker.forward_audio()))
+
+        shared = False
+        if config.getboolean('recording', 'enabled', fallback=False):
+            sink = RecordingSink(self.bus, cache=self.frame_cache)
+            shared = sink.shares_jpeg("rgb_frame", config.getint('yolo', 'jpeg_quality', fallback=95))
+            tasks.append(asyncio.create_task(sink.run()))
+        if config.getboolean('yolo', 'enabled', fallback=False):
+            # Full-size frames are only worth sending to the detector when the recorder encodes them anyway
+            tasks.append(asyncio.create_task(yolo_worker(self.bus, self.frame_cache if shared else None)))
+        return tasks
+
+    async def _stop_workers(self, tasks: List[asyncio.Task]):
+        for task in tasks:
+            task.cancel()
+        # Wait for the workers to actually cancel
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"Frame cache: {self.frame_cache.stats()}")
 
-        # Start the worker task
-        worker_task = asyncio.create_task(_ws_worker.forward_rgb())
+    async def _run_app(self):
+        """Main application logic to run the WebSocket server and handle connections."""
+        # Start the worker tasks
+        worker_tasks = self._start_workers()
 
         try:
-            # Initialize the client (it will load settings from config.ini)
-            client = AriaClient()
-            
             # Start the pairing process
            # await client.pair()
-            
-            # Connect to the device
-            device = await client.connect()
-            
-            if device:
-                logger.info("Successfully connected to the Aria device.")
-            
-                battery_level = client.get_battery_level(device)
-                logger.info(f"Battery level : {battery_level}%")
 
-                if battery_level < config.getint('streaming', 'min_battery_level', fallback=20):
-                    logger.warning("Battery level is below 20%. Please charge the device soon.")
-                else :
-                    logger.info("Battery level is sufficient, ready to go.")
+            # Connect to the device, or reuse the session kept warm since the last stop
+            session = await self.sessions.acquire()
 
-                    # start streaming
-                    streaming_handler = StreamingHandler(device, self.bus, loop)
-                    await streaming_handler.start_streaming(self.connected_client)
-                    
+            if session.battery_level < config.getint('streaming', 'min_battery_level', fallback=20):
+                logger.warning("Battery level is below 20%. Please charge the device soon.")
+            else :
+                logger.info("Battery level is sufficient, ready to go.")
 
-            else:
-                logger.error("Could not connect to device. Exiting.")
+                # start streaming
+                await self.sessions.start(session)
+                logger.info("Streaming data... Press Ctrl+C to stop.")
+                await self.broadcast_control(protocol.stream_started("started", "starting streaming from sdk"))
+
+                # This will wait forever until the task is cancelled (stop command or Ctrl+C)
+                await asyncio.Event().wait()
 
-            
         except (asyncio.CancelledError, KeyboardInterrupt):
             logger.info("Application interrupted. Shutting down...")
         except Exception as e:
@@ -76,14 +113,10 @@ class WebSocketServer:
         finally:
             # --- CLEAN UP WORKER AND HTTP CLIENT ---
             logger.info("Cleaning up tasks and connections...")
-            if worker_task:
-                worker_task.cancel()
-                try:
-                    await worker_task # Wait for the worker to actually cancel
-                except asyncio.CancelledError:
-                    pass # Expected
-            if self.connected_client:
-                await self.connected_client.send('{"type": "STATUS_UPDATE", "payload": {"status": "stopped", "reason": "application shutdown"}}')
+            # Only unsubscribe, the device session stays warm for the next start
+            await self.sessions.stop()
+            await self._stop_workers(worker_tasks)
+            await self.broadcast_control(protocol.status_update("stopped", "application shutdown"))
     
             logger.info("Application has shut down.")
 
@@ -92,63 +125,51 @@ class WebSocketServer:
         logger.debug("Starting debug version of the application.")
         
         video_path = config.get('debug', 'video_path', fallback='debug_video.mp4')
-        
-        # Start the worker
-        _ws_worker = ws_worker(self.bus, self)
-        worker_task = asyncio.create_task(_ws_worker.forward_rgb())
+        loop = asyncio.get_running_loop()
+
+        # Start the workers
+        worker_tasks = self._start_workers()
+        if self.preview is not None:
+            worker_tasks.append(asyncio.create_task(self._feed_preview()))
+        elif config.getboolean('debug', 'show_window', fallback=True) and display_available():
+            logger.info("No debug preview, it needs the main thread and the event loop runs there")
+
+        # Decoding and pacing run on the replay threads, frames reach the loop through the bus
+        source_type = config.get('debug', 'source', fallback='video')
+        video_source = None
+        vrs_observer = None
+
+        def on_frame(frame: ReplayFrame):
+            event = Event(event_type="rgb_frame", payload={
+                "image": frame.image,
+                "record": None,
+                "host_time_ns": time.time_ns(),
+                "capture_timestamp_ns": frame.timestamp_ns,
+            })
+            self.bus.publish_threadsafe(event, loop)
 
         try:
-            video_source = cv2.VideoCapture(video_path)
-            # video_source = cv2.VideoCapture(0)# Use webcam for debug
-            if not video_source.isOpened():
-                logger.error(f"Could not open video file at {video_path}. Exiting debug mode.")
-                return
-            await self.connected_client.send('{"type": "STREAM_STARTED", "payload": {"status": "streaming_debug_video", "reason": "started streaming debug video from server"}}')
-            # Get video FPS to simulate real-time playback
-            fps = video_source.get(cv2.CAP_PROP_FPS) 
-            
-            desired_fps = 5
-            frame_limit =  fps / desired_fps # 5 fos
-            if fps <= 0 : fps = 1 # fallback default
-            logger.info(f"debugging at {fps} fps")
-            frame_delay = 1.0 / fps
-
-            success, image = video_source.read()
-            if not success:
-                logger.warning("Failed to get image from webcam")
-                
-            frame_counter = 0
-
-            # logger.info(f"Starting playback of {video_path} at {fps} FPS")
-
-            while success:
-                # Check if we should stop (e.g. if task cancelled)
-                if self.stop.is_set():
-                    break
-
-                if frame_counter % 1 == 0: # Adjust sampling as needed
-                    # logger.debug(f"Queueing RGB frame {frame_counter} for inference")
-                    img_rgb = cv2.cvtColor(image,cv2.COLOR_BGR2RGB)
-                    # image_to_send = np.rot90(image, 1, (1, 0))
-                    event = Event(event_type="rgb_frame", payload={"image": img_rgb, "record": None})
-                    window_name = "Debug Feed"
-                    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-        
-                    cv2.imshow(window_name, image)
-                    
-                    # 3. REQUIRED: updates the GUI. 1ms delay is sufficient.
-                    cv2.waitKey(1)
-                    # Use await here effectively or create_task, but sleep is crucial below
-                    await self.bus.publish(event)
-                    await asyncio.sleep(frame_delay)
-
-                success, image = video_source.read()
-                if not success:
-                    logger.warning("Failed to get image from webcam")
-                logger.debug(f"frame count: {frame_counter}")
-                frame_counter += 1
-
-            logger.info(f"Finished processing video frames: {frame_counter}")
+            if source_type == 'vrs':
+                # Recorded sensor data goes through the same observer as the live stream
+                vrs_path = config.get('debug', 'vrs_path', fallback='debug_recording.vrs')
+                video_source = await asyncio.to_thread(VrsReplaySource.from_config, vrs_path)
+                await self.broadcast_control(protocol.stream_started("streaming_debug_vrs", "started replaying vrs recording from server"))
+                vrs_observer = StreamingObserver(bus=self.bus, loop=loop)
+                video_source.start(vrs_observer)
+            else:
+                video_source = VideoReplaySource.from_config(video_path)
+                if not await asyncio.to_thread(video_source.open):
+                    logger.error(f"Could not open video file at {video_path}. Exiting debug mode.")
+                    return
+                await self.broadcast_control(protocol.stream_started("streaming_debug_video", "started streaming debug video from server"))
+                video_source.start(on_frame)
+
+            await asyncio.to_thread(video_source.join)
+
+            logger.info(
+                f"Finished processing video frames: {video_source.frames_delivered} "
+                f"({video_source.pacer.late} delivered late)"
+            )
             
             # Keep server alive after video ends, until externally stopped
             await asyncio.Event().wait()
@@ -159,22 +180,29 @@ class WebSocketServer:
             logger.critical("An error occurred during debug application startup.", exc_info=True)
         finally:
             logger.info("Cleaning up tasks and connections...")
-            cv2.destroyAllWindows()
-            if worker_task:
-                worker_task.cancel()
-                try:
-                    await worker_task
-                except asyncio.CancelledError:
-                    pass
+            if video_source:
+                video_source.stop()
+                await asyncio.to_thread(video_source.join, 2.0)
+            if vrs_observer is not None:
+                vrs_observer.close()
+            await self._stop_workers(worker_tasks)
             
-            if self.connected_client:
-                close_msg = '{"type": "STATUS_UPDATE", "payload": {"status": "stopped", "reason": "application shutdown"}}'
-                asyncio.create_task(self.connected_client.send(close_msg))
+            close_msg = protocol.status_update("stopped", "application shutdown")
+            asyncio.create_task(self.broadcast_control(close_msg))
     
             logger.info("Debug application has shut down.")
 
 
-    async def handle_start(self):
+    async def _feed_preview(self) -> None:
+        """Hands the latest rgb_frame to the preview window, drawing happens on the main thread."""
+        frames = self.bus.subscribe("rgb_frame", latest_only=True, name="preview")
+        try:
+            async for event in frames:
+                self.preview.show(event.payload["image"])
+        finally:
+            await frames.aclose()
+
+    async def handle_start(self, client: ClientConnection):
         """Handle start command from client."""
         # event = Event(event_type="start_command")
         # await self.bus.publish(event)
@@ -182,15 +210,10 @@ class WebSocketServer:
         # check if already running
         if self.task and not self.task.done():
             logger.warning("Received 'start' command, but application is already running.")
-            if self.connected_client:
-                # Optional: Send feedback to client
-                # await self.connected_client.send('{"status": "error", "message": "Application is already running."}')
-                await self.connected_client.send('{"type": "ERROR_MSG", "payload": {"error": "already running", "reason": "Application is already running, can\'t start again.""}}')
-    
+            await client.send_control(protocol.error_msg("already running", "Application is already running, can't start again."))
             return
         
-        if self.connected_client:
-            await self.connected_client.send('{"type": "STATUS_UPDATE", "payload": {"status": "starting"}}')
+        await self.broadcast_control(protocol.status_update("starting"))
     
         
         # Create task to start main desktop app functionality
@@ -201,68 +224,145 @@ class WebSocketServer:
             logger.info("Starting application in normal mode.")
             self.task = asyncio.create_task(self._run_app())
 
-    async def handle_stop(self):
+    async def handle_stop(self, client: ClientConnection):
         """Handle stop command from client."""
         if self.task and not self.task.done():
                 self.task.cancel()
-                if self.connected_client:
-                    await self.connected_client.send('{"type": "STATUS_UPDATE", "payload": {"status": "stopped", "reason": "stop was requested by client"}}')
+                await self.broadcast_control(protocol.status_update("stopped", "stop was requested by client"))
     
         else:
             logger.warning("Received 'stop' command, but application is not running.")
-            if self.connected_client:
-                await self.connected_client.send('{"type": "ERROR_MSG", "payload": {"error": "app not running", "reason": "Received stop command, but application is not running"}}')
+            await client.send_control(protocol.error_msg("app not running", "Received stop command, but application is not running"))
     
 
-    async def handle_message(self, message: str):
+    async def handle_message(self, message: str, client: ClientConnection):
         """Process incoming messages from clients."""
         logger.debug(f"Handling message: {message}")
 
-        if message.lower() == "start":
+        if message.startswith("{"):
+            await self.handle_json_message(message, client)
+
+        elif message.lower() == "start":
             logger.debug("Received start command from client")
-            await self.handle_start()            
+            await self.handle_start(client)
             
 
         elif message.lower() == "stop":
             logger.debug("Received stop command from client")
-            await self.handle_stop()
+            await self.handle_stop(client)
                     
         else:
             logger.warning(f"Unknown message received: {message}")
-            if self.connected_client:
-                await self.connected_client.send('{"type": "ERROR_MSG", "payload": {"error": "received unkown command", "reason": """}}')
+            await client.send_control(protocol.error_msg("received unkown command"))
     
     
+    async def handle_json_message(self, message: str, client: ClientConnection):
+        """Process JSON control messages from clients."""
+        try:
+            control = ControlMessage.from_json(message)
+        except ValueError:
+            logger.warning(f"Malformed or unknown control message received: {message}")
+            await client.send_control(protocol.error_msg("invalid message", "Expected {\"type\": ..., \"payload\": {...}} with a known type"))
+            return
+
+        msg_type = control.type
+        payload = control.payload
+        if msg_type == MessageType.CLIENT_STATS:
+            # Receive rate measured on the client, feeds the adaptive quality controller
+            fps = payload.get("fps")
+            if fps is None:
+                client.receive_fps = None
+                return
+            try:
+                fps = float(fps)
+            except (TypeError, ValueError):
+                fps = math.nan
+            # A NaN or infinite rate would poison the controller's median
+            if not math.isfinite(fps) or fps < 0:
+                await client.send_control(protocol.error_msg("invalid fps", "fps must be a finite, non-negative number"))
+                return
+            client.receive_fps = fps
+        elif msg_type == MessageType.SET_TIER:
+            tier = payload.get("tier")
+            if not isinstance(tier, str) or tier not in self.tiers:
+                await client.send_control(protocol.error_msg("unknown tier", f"Available tiers: {', '.join(self.tiers)}"))
+                return
+            logger.info(f"client {client.name} switched to tier {tier}")
+            client.tier = tier
+        else:
+            logger.warning(f"Unexpected message type received from client: {msg_type.value}")
+
     async def client_handler(self, websocket):
-        logger.info("client connected")
-        # self.connected_clients.add(websocket)
-        self.connected_client = websocket
+        client = ClientConnection(websocket, self.client_queue_size, self.default_tier,
+                                  self.sensor_queue_size, self.camera_queue_size)
+        self.clients[websocket] = client
+        client.start()
+        logger.info(f"client {client.name} connected ({len(self.clients)} connected)")
         try:
             async for message in websocket:
                 logger.info(f"Received message: {message}")
                 # handle commands from client if any
-                await self.handle_message(message)
+                await self.handle_message(message, client)
 
 
         except websockets.exceptions.ConnectionClosed:
             logger.info("client disconnected")
         finally:
-            # self.connected_clients.remove(websocket)
-            self.connected_client = None
-
-    async def send(self, data: bytes):
-        """Sends data to connected client"""
-        # loop = asyncio.get_event_loop()
-        if self.connected_client:
-            try:
-                await self.connected_client.send(data)
-              
-            except websockets.exceptions.ConnectionClosed:
-                logger.warning("Tried to send to a client that has disconnected.")
-                self.connected_client = None # Clear the disconnected client
-            except Exception as e:
-                logger.error(f"Error sending data: {e}")
-                self.connected_client = None
+            self.clients.pop(websocket, None)
+            await client.close()
+            logger.info(f"client {client.name} left, stats: {client.stats()}")
+
+    def active_tiers(self) -> List[VideoTier]:
+        """Tiers watched by at least one client, the others don't need to be encoded."""
+        watched = {client.tier for client in self.clients.values()}
+        return [tier for name, tier in self.tiers.items() if name in watched]
+
+    def send(self, frames_by_tier: Dict[str, bytes]) -> int:
+        """
+        Queue a frame for every connected client, without waiting for the sockets.
+        Each tier is encoded once, all clients of a tier get the same bytes.
+        Returns the number of clients the frame was queued for.
+        """
+        queued = 0
+        for client in self.clients.values():
+            data = frames_by_tier.get(client.tier)
+            if data is not None:
+                client.enqueue(data)
+                queued += 1
+        return queued
+
+    def send_camera(self, data: bytes) -> int:
+        """Queue a frame of a camera other than RGB for every connected client, returns the number of clients."""
+        for client in self.clients.values():
+            client.enqueue_camera(data)
+        return len(self.clients)
+
+    def send_sensor(self, data: bytes) -> int:
+        """Queue a sensor or audio frame for every connected client, returns the number of clients."""
+        for client in self.clients.values():
+            client.enqueue_sensor(data)
+        return len(self.clients)
+
+    async def broadcast_control(self, message: str):
+        """Send a control message to every connected client."""
+        if self.clients:
+            await asyncio.gather(*(client.send_control(message) for client in list(self.clients.values())))
+
+    @property
+    def client_receive_fps(self) -> float | None:
+        """Median receive rate reported by the clients, None if no client reports it."""
+        reported = [c.receive_fps for c in self.clients.values() if c.receive_fps is not None]
+        return statistics.median(reported) if reported else None
+
+    def send_latency(self) -> float | None:
+        """Median queue wait + send time of the clients, None before anything was sent."""
+        latencies = [c.latency_ema for c in self.clients.values() if c.latency_ema is not None]
+        return statistics.median(latencies) if latencies else None
+
+    def client_frame_bytes(self, frames_by_tier: Dict[str, bytes]) -> int:
+        """Median size of the frame a client receives, each one only gets the tier it watches."""
+        sizes = [len(frames_by_tier[c.tier]) for c in self.clients.values() if c.tier in frames_by_tier]
+        return int(statistics.median(sizes)) if sizes else 0
 
     async def start(self):
         """Start the WebSocket server."""
@@ -272,9 +372,13 @@ class WebSocketServer:
             "0.0.0.0",
             self.port,
             max_size=2*1024*1024,  # 2 MB,
-            write_limit=2**176,  # 128 KB,
+            write_limit=2**17,  # 128 KB, so a slow client fills its own queue instead of socket buffers
             ping_interval=20,
             ping_timeout=20,
             close_timeout=10
         )
-        await server.wait_closed()
+        try:
+            await server.wait_closed()
+        finally:
+            # Disconnect the device kept warm between start/stop cycles
+            await self.sessions.release()
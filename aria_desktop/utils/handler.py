@@ -6,27 +6,34 @@ from contextlib import contextmanager
 import cv2
 
 
-def update_iptables() -> None:
+IPTABLES_RULE = [
+    "INPUT",
+    "-p",
+    "udp",
+    "-m",
+    "udp",
+    "--dport",
+    "7000:8000",
+    "-j",
+    "ACCEPT",
+]
+
+
+def update_iptables(timeout: float = 30.0) -> None:
     """
-    Update firewall to permit incoming UDP connections for DDS
+    Update firewall to permit incoming UDP connections for DDS.
+    The rule is only appended if it isn't there already.
     """
-    update_iptables_cmd = [
-        "sudo",
-        "iptables",
-        "-A",
-        "INPUT",
-        "-p",
-        "udp",
-        "-m",
-        "udp",
-        "--dport",
-        "7000:8000",
-        "-j",
-        "ACCEPT",
-    ]
+    check_cmd = ["sudo", "iptables", "-C"] + IPTABLES_RULE
+    result = subprocess.run(check_cmd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode == 0:
+        print("iptables rule for DDS already present, skipping update")
+        return
+
+    update_iptables_cmd = ["sudo", "iptables", "-A"] + IPTABLES_RULE
     print("Running the following command to update iptables:")
     print(update_iptables_cmd)
-    subprocess.run(update_iptables_cmd, check=True)
+    subprocess.run(update_iptables_cmd, check=True, timeout=timeout)
 
 
 @contextmanager
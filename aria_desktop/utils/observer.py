@@ -1,10 +1,15 @@
 from .logger import logger
 from .config import config
 from ..bus import AsyncEventBus,Event
+from ..workers.sensor_aggregator import SensorAggregator
+from ..workers.audio import AudioPipeline
+from ..core.streams import CAMERAS_BY_ID
 
 import aria.sdk as aria
 import asyncio
+import time
 import numpy as np
+from collections import Counter
 from typing import Sequence
 
 from projectaria_tools.core.sensor_data import (
@@ -18,41 +23,63 @@ class StreamingObserver():
     """Streaming observer that handles incoming streaming data."""
 
     def __init__(self, bus: AsyncEventBus, loop: asyncio.AbstractEventLoop) -> None:
-        self.rgb_counter = 0
+        self.frame_counts: Counter = Counter() # frames received per camera
         self.loop = loop
         self.bus = bus
 
+        # IMU, magnetometer and barometer samples go to the bus in blocks, not one event per sample
+        self.sensors = None
+        if config.getboolean('sensors', 'enabled', fallback=False):
+            self.sensors = SensorAggregator.from_config(bus, loop)
+            self.sensors.start()
+
+        # Microphones go to the bus in fixed-size chunks
+        self.audio = None
+        if config.getboolean('audio', 'enabled', fallback=False):
+            self.audio = AudioPipeline.from_config(bus, loop)
+            self.audio.start()
+
 
     def on_image_received(self, image: np.array, record: ImageDataRecord) -> None:
-        if record.camera_id == aria.CameraId.Rgb:
-            self.rgb_counter += 1
-            # --- Only send every Nth frame to avoid overwhelming the server ---
-            if self.rgb_counter % 1 == 0: 
-                logger.debug(f"Queueing RGB frame {self.rgb_counter} for inference")
-
-                # Apply rotation
-                image_to_send = np.rot90(image, 1, (1, 0)) # Rotate 90 degrees clockwise
-                event = Event(event_type="rgb_frame", payload={"image": image_to_send, "record": record})
-                # asyncio.create_task(self.bus.publish(event))
-                asyncio.run_coroutine_threadsafe(
-                    self.bus.publish(event), 
-                    self.loop
-                )
+        # Every camera has its own topic, rgb_frame, slam1_frame, slam2_frame or et_frame
+        camera = CAMERAS_BY_ID.get(record.camera_id)
+        if camera is None:
+            return
+        self.frame_counts[camera.name] += 1
+        host_time_ns = time.time_ns()
+        logger.debug(f"Queueing {camera.name} frame {self.frame_counts[camera.name]}")
+
+        if camera.upright:
+            image = np.rot90(image, 1, (1, 0)) # Rotate 90 degrees clockwise
+        event = Event(event_type=camera.topic, payload={"image": image, "record": record, "host_time_ns": host_time_ns})
+        # Called from the SDK thread, bursts are coalesced into one loop wakeup
+        self.bus.publish_threadsafe(event, self.loop)
 
 
     def on_imu_received(self, samples: Sequence[MotionData], imu_idx: int) -> None:
-        pass
+        if self.sensors is not None:
+            self.sensors.add_imu(samples, imu_idx)
 
     def on_magneto_received(self, sample: MotionData) -> None:
-        pass
+        if self.sensors is not None:
+            self.sensors.add_magneto(sample)
 
     def on_baro_received(self, sample: BarometerData) -> None:
-        pass
+        if self.sensors is not None:
+            self.sensors.add_baro(sample)
 
     def on_audio_received(self, audio_and_record: AudioDataRecord) -> None:
-        pass
+        if self.audio is not None:
+            self.audio.add(audio_and_record)
 
     def on_streaming_client_failure(self, reason: aria.ErrorCode, message: str) -> None:
         pass
 
+    def close(self) -> None:
+        """Stops the sensor block and audio chunk publishing."""
+        if self.sensors is not None:
+            self.sensors.stop()
+        if self.audio is not None:
+            self.audio.stop()
+
 
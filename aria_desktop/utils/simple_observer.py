@@ -1,13 +1,14 @@
 import aria.sdk as aria
-import cv2
+import time
 from pathlib import Path
 
 
 from ..utils.visualizer import BaseStreamingClientObserver
 from ..utils.logger import logger
+from ..workers.recorder import RecordedFrame, RecordingWriter
 
 import numpy as np
-from typing import Sequence
+from typing import Optional, Sequence
 from projectaria_tools.core.sensor_data import (
     BarometerData,
     ImageDataRecord,
@@ -19,14 +20,13 @@ class SimplePrintObserver(BaseStreamingClientObserver):
     A simple observer that just logs to the console
     to prove data is being received.
     """
-    def __init__(self):
+    def __init__(self, writer: Optional[RecordingWriter] = None):
         self.img_counter = 0
         self.imu_counter = 0
 
-        # Create a directory to save frames
-        self.save_path = Path("./saved_frames")
-        self.save_path.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Saving frames to {self.save_path.resolve()}")
+        # Frames are written by a background writer, the SDK callback only queues them
+        self.writer = writer or RecordingWriter.from_config(Path("./saved_frames"))
+        self.writer.start()
 
     def on_image_received(self, image: np.array, record: ImageDataRecord) -> None:
         self.img_counter += 1
@@ -34,25 +34,18 @@ class SimplePrintObserver(BaseStreamingClientObserver):
             logger.info(
                 f"Received image #{self.img_counter} from {record.camera_id}"
             )
-        try:
-            # Apply the same rotation as the visualizer for correct orientation
-            if record.camera_id != aria.CameraId.EyeTrack:
-                image_to_save = np.rot90(image)
-            else:
-                image_to_save = np.rot90(image, 2)
-            
-            # Convert RGB to BGR for cv2.imwrite if it's a color image
-            if image_to_save.ndim == 3 and image_to_save.shape[2] == 3:
-                image_to_save = cv2.cvtColor(image_to_save, cv2.COLOR_RGB2BGR)
+        # Same orientation as the visualizer, rot90 is only a view, the writer thread does the copy
+        if record.camera_id != aria.CameraId.EyeTrack:
+            image_to_save = np.rot90(image)
+        else:
+            image_to_save = np.rot90(image, 2)
 
-            # Create a unique filename
-            filename = self.save_path / f"{record.camera_id}_{self.img_counter:06d}.png"
-            
-            # Save the image
-            cv2.imwrite(str(filename), image_to_save)
-
-        except Exception as e:
-            logger.error(f"Failed to save image: {e}")
+        self.writer.submit(RecordedFrame(
+            stream=str(record.camera_id).split(".")[-1].lower(),
+            capture_ns=record.capture_timestamp_ns,
+            host_ns=time.time_ns(),
+            image=image_to_save,
+        ))
 
 
     def on_imu_received(self, samples: Sequence[MotionData], imu_idx: int) -> None:
@@ -70,4 +63,8 @@ class SimplePrintObserver(BaseStreamingClientObserver):
         logger.info("Received Barometer data")
 
     def on_streaming_client_failure(self, reason: aria.ErrorCode, message: str) -> None:
-        logger.error(f"Streaming Client Failure: {reason}: {message}")
\ No newline at end of file
+        logger.error(f"Streaming Client Failure: {reason}: {message}")
+
+    def close(self) -> None:
+        """Flush the frames still queued for writing."""
+        self.writer.close()
@@ -12,10 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from collections import deque
-from typing import Sequence
+import threading
+from typing import Any, Dict, Sequence
 
 import aria.sdk as aria
+import cv2
 import fastplotlib as fpl
 import numpy as np
 from .handler import ctrl_c_handler
@@ -24,7 +25,6 @@ from projectaria_tools.core.sensor_data import (
     BarometerData,
     ImageDataRecord,
     MotionData,
-    AudioDataRecord,
 )
 
 from ..utils.logger import logger
@@ -32,10 +32,24 @@ from ..utils.logger import logger
 
 NANOSECOND = 1e-9
 
+# Rotation that matches the orientation of each camera
+CAMERA_ROTATIONS = {
+    aria.CameraId.Rgb: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    aria.CameraId.Slam1: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    aria.CameraId.Slam2: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    aria.CameraId.EyeTrack: cv2.ROTATE_180,
+}
+
+# Min/max buckets per IMU plot window, about one per horizontal pixel of a subplot
+IMU_ENVELOPE_BUCKETS = 400
+
 
 class TemporalWindowPlot:
     """
     Manage an fastplotlib plot with streaming data, showing the most recent values.
+    Samples go into a preallocated ring of line vertices, one line per dimension, and only the
+    vertices written since the last frame are uploaded to the existing graphic. A NaN vertex after
+    the newest sample breaks the line where the ring wraps, the camera follows the time window.
     """
 
     def __init__(
@@ -44,48 +58,148 @@ class TemporalWindowPlot:
         title: str,
         dim: int,
         window_duration_sec: float = 4,
+        capacity: int = 4096,
     ):
         self.axes = axes
         self.title = title
         self.window_duration = window_duration_sec
-        self.timestamps = deque()
-        self.samples = [deque() for _ in range(dim)]
+        self.capacity = capacity
+        # x: seconds since the first sample, y: sample value, z: 0
+        self.positions = np.zeros((dim, capacity, 3), dtype="float32")
+        self.positions[:, :, :2] = np.nan
+        self.origin = None
+        self.count = 0 # samples written so far, the next one goes to count % capacity
+        self.uploaded = 0 # value of count at the last upload
+        self.lines = None
         self.axes.add_animations(self.update)
-        self.count = 0
 
     def add_samples(self, timestamp_ns: float, samples: Sequence[float]):
         # Convert timestamp to seconds
         timestamp = timestamp_ns * NANOSECOND
+        if self.origin is None:
+            self.origin = timestamp
+
+        # Overwrite the oldest vertex and move the line break behind the new one
+        index = self.count % self.capacity
+        self.positions[:, index, 0] = timestamp - self.origin
+        self.positions[:, index, 1] = samples
+        self.positions[:, (index + 1) % self.capacity, :2] = np.nan
+        self.count += 1
+
+    def add_block(self, timestamps_ns: np.ndarray, samples: np.ndarray):
+        """add_samples for a whole block at once, samples has a row per timestamp and a column per dimension."""
+        if len(timestamps_ns) == 0:
+            return
+        # Only the newest capacity - 1 fit next to the line break
+        timestamps = np.asarray(timestamps_ns[-(self.capacity - 1):], dtype=np.float64) * NANOSECOND
+        samples = samples[-(self.capacity - 1):]
+        if self.origin is None:
+            self.origin = timestamps[0]
+
+        indices = (self.count + np.arange(len(timestamps))) % self.capacity
+        self.positions[:, indices, 0] = timestamps - self.origin
+        self.positions[:, indices, 1] = samples.T
+        self.positions[:, (indices[-1] + 1) % self.capacity, :2] = np.nan
+        self.count += len(timestamps)
+
+    def _changed_ranges(self, count: int) -> list:
+        """Ring slices written since the last upload, the line break included."""
+        changed = count - self.uploaded + 1
+        start = self.uploaded % self.capacity
+        if changed >= self.capacity:
+            return [(0, self.capacity)]
+        if start + changed <= self.capacity:
+            return [(start, start + changed)]
+        return [(start, self.capacity), (0, start + changed - self.capacity)]
 
-        # Remove old data outside of the window
-        while (
-            self.timestamps and (timestamp - self.timestamps[0]) > self.window_duration
-        ):
-            self.timestamps.popleft()
-            for sample in self.samples:
-                sample.popleft()
+    def update(self):
+        count = self.count
+        if count == self.uploaded:
+            return
 
-        # Add new data
-        self.timestamps.append(timestamp)
-        for i, sample in enumerate(samples):
-            self.samples[i].append(sample)
+        if self.lines is None:
+            line_collection = self.axes.add_line_collection(list(self.positions), cmap="tab10")
+            self.lines = list(line_collection.graphics)
+            self.axes.camera.maintain_aspect = False
+            self.axes.set_title(self.title)
+            self.axes.center_title()
+        else:
+            for start, stop in self._changed_ranges(count):
+                for line, positions in zip(self.lines, self.positions):
+                    line.data[start:stop] = positions[start:stop]
+        self.uploaded = count
 
-    def update(self):
-        if not self.timestamps:
+        # Show the last window_duration seconds, scaled to the values inside it
+        newest = float(self.positions[0, (count - 1) % self.capacity, 0])
+        in_window = self.positions[:, :, 0] >= newest - self.window_duration
+        values = self.positions[:, :, 1][in_window]
+        low, high = float(values.min()), float(values.max())
+        margin = (high - low) * 0.1 or max(abs(high) * 0.01, 1e-9)
+        self.axes.camera.show_rect(newest - self.window_duration, newest, high + margin, low - margin)
+
+
+def motion_arrays(samples: Sequence[MotionData]) -> tuple:
+    """Timestamps (ns), accelerometer and gyroscope of a batch of IMU samples as arrays."""
+    timestamps = np.fromiter((sample.capture_timestamp_ns for sample in samples), dtype=np.int64, count=len(samples))
+    accel = np.array([sample.accel_msec2 for sample in samples], dtype=np.float32).reshape(-1, 3)
+    gyro = np.array([sample.gyro_radsec for sample in samples], dtype=np.float32).reshape(-1, 3)
+    return timestamps, accel, gyro
+
+
+class EnvelopeDecimator:
+    """
+    Reduces full rate samples to the min and max of every time bucket before they reach a
+    TemporalWindowPlot, one bucket per horizontal pixel of the window. Each bucket is drawn
+    as a min and a max vertex, so every excursion stays visible at 2 * buckets points per window
+    whatever the sample rate. A bucket is handed to the plot once a later sample closes it.
+    """
+
+    def __init__(self, plot: TemporalWindowPlot, buckets: int = 400):
+        self.plot = plot
+        self.bucket_ns = plot.window_duration / buckets / NANOSECOND
+        self.open_bucket = None # id of the bucket still collecting samples
+        self.open_low = None
+        self.open_high = None
+
+    def add_batch(self, timestamps_ns: np.ndarray, samples: np.ndarray):
+        if len(timestamps_ns) == 0:
+            return
+        # Runs of consecutive samples in the same bucket
+        bucket_ids = timestamps_ns // self.bucket_ns
+        starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+        ids = bucket_ids[starts]
+        lows = np.minimum.reduceat(samples, starts, axis=0)
+        highs = np.maximum.reduceat(samples, starts, axis=0)
+
+        if self.open_bucket is not None:
+            if ids[0] == self.open_bucket:
+                np.minimum(lows[0], self.open_low, out=lows[0])
+                np.maximum(highs[0], self.open_high, out=highs[0])
+            else:
+                ids = np.r_[self.open_bucket, ids]
+                lows = np.vstack((self.open_low, lows))
+                highs = np.vstack((self.open_high, highs))
+
+        # The last bucket may still get samples from the next batch
+        self.open_bucket, self.open_low, self.open_high = ids[-1], lows[-1], highs[-1]
+        closed = len(ids) - 1
+        if not closed:
             return
-        self.axes.clear()
-        self.line_collection = self.axes.add_line_collection(
-            [np.asarray(s, dtype="float32") for s in self.samples],
-            cmap="tab10",
-        )
-        self.axes.auto_scale()
-        self.axes.set_title(self.title)
-        self.axes.center_title()
+
+        timestamps = np.empty(2 * closed, dtype=np.float64)
+        timestamps[0::2] = ids[:-1] * self.bucket_ns
+        timestamps[1::2] = (ids[:-1] + 0.5) * self.bucket_ns
+        values = np.empty((2 * closed, samples.shape[1]), dtype=samples.dtype)
+        values[0::2] = lows[:-1]
+        values[1::2] = highs[:-1]
+        self.plot.add_block(timestamps, values)
 
 
 class AriaVisualizer:
     """
-    Example Aria visualiser class
+    Example Aria visualiser class.
+    Images are handed over through a latest-only slot per camera and drawn once per display
+    frame, so textures are uploaded at display rate whatever the camera rates are.
     """
 
     def __init__(self):
@@ -126,19 +240,54 @@ class AriaVisualizer:
         for axes, title in zip(image_axes, titles):
             axes.set_title(title)
 
-        # Create the sensor plots
+        # Latest image of each camera that has not been drawn yet
+        self.pending_images: Dict[Any, np.ndarray] = {}
+        self.pending_lock = threading.Lock()
+        self.images_received = 0
+        self.images_skipped = 0 # replaced by a newer image before a frame was drawn
+        self.plots.add_animations(self.draw_images)
+
+        # Create the sensor plots, the IMU ones get every sample through min/max envelopes
+        imu_capacity = 2 * IMU_ENVELOPE_BUCKETS + 8
         self.sensor_plot = {
             "accel": [
-                TemporalWindowPlot(axes, f"IMU{idx} accel", 3)
+                TemporalWindowPlot(axes, f"IMU{idx} accel", 3, capacity=imu_capacity)
                 for idx, axes in enumerate(self.plots[1, 0:2])
             ],
             "gyro": [
-                TemporalWindowPlot(axes, f"IMU{idx} gyro", 3)
+                TemporalWindowPlot(axes, f"IMU{idx} gyro", 3, capacity=imu_capacity)
                 for idx, axes in enumerate(self.plots[1, 2:4])
             ],
             "magneto": TemporalWindowPlot(self.plots[2, 0], "Magnetometer", 3),
             "baro": TemporalWindowPlot(self.plots[2, 1], "Barometer", 1),
         }
+        self.imu_envelopes = {
+            kind: [EnvelopeDecimator(plot, IMU_ENVELOPE_BUCKETS) for plot in self.sensor_plot[kind]]
+            for kind in ("accel", "gyro")
+        }
+
+    def submit_image(self, camera_id: Any, image: np.ndarray) -> None:
+        """Called from the SDK thread, only keeps a reference to the image."""
+        with self.pending_lock:
+            if camera_id in self.pending_images:
+                self.images_skipped += 1
+            self.pending_images[camera_id] = image
+            self.images_received += 1
+
+    def draw_images(self):
+        """Render animation: rotates the new images straight into their texture buffers."""
+        with self.pending_lock:
+            if not self.pending_images:
+                return
+            pending, self.pending_images = self.pending_images, {}
+
+        for camera_id, image in pending.items():
+            graphic = self.image_plot[camera_id]
+            texture = graphic.data()
+            if cv2.rotate(image, CAMERA_ROTATIONS[camera_id], dst=texture) is not texture:
+                logger.warning(f"{camera_id} image of shape {image.shape} does not fit its {texture.shape} texture")
+                continue
+            graphic.data.update_gpu()
 
     def render_loop(self):
         logger.info("Rendering visualizer plots")
@@ -150,6 +299,7 @@ class AriaVisualizer:
             fpl.run()
 
     def stop(self):
+        logger.info(f"Visualizer: {self.images_received} images received, {self.images_skipped} skipped")
         self.plots.close()
 
 
@@ -186,25 +336,15 @@ class AriaVisualizerStreamingClientObserver(BaseStreamingClientObserver):
         self.visualizer = visualizer
 
     def on_image_received(self, image: np.array, record: ImageDataRecord) -> None:
-        # Rotate images to match the orientation of the camera
-        logger.info(f"Image received from camera ID: {record.camera_id}")
-        if record.camera_id != aria.CameraId.EyeTrack:
-            image = np.rot90(image)
-        else:
-            image = np.rot90(image, 2)
-
-        # Update the image
-        self.visualizer.image_plot[record.camera_id].data = image
+        # Rotated and uploaded by the render loop, at most once per display frame
+        logger.debug(f"Image received from camera ID: {record.camera_id}")
+        self.visualizer.submit_image(record.camera_id, image)
 
     def on_imu_received(self, samples: Sequence[MotionData], imu_idx: int) -> None:
-        # Only plot the first IMU sample per batch
-        sample = samples[0]
-        self.visualizer.sensor_plot["accel"][imu_idx].add_samples(
-            sample.capture_timestamp_ns, sample.accel_msec2
-        )
-        self.visualizer.sensor_plot["gyro"][imu_idx].add_samples(
-            sample.capture_timestamp_ns, sample.gyro_radsec
-        )
+        # Every sample of the batch, decimated to the min/max envelope of each plot pixel
+        timestamps, accel, gyro = motion_arrays(samples)
+        self.visualizer.imu_envelopes["accel"][imu_idx].add_batch(timestamps, accel)
+        self.visualizer.imu_envelopes["gyro"][imu_idx].add_batch(timestamps, gyro)
 
     def on_magneto_received(self, sample: MotionData) -> None:
         self.visualizer.sensor_plot["magneto"].add_samples(
@@ -216,69 +356,5 @@ class AriaVisualizerStreamingClientObserver(BaseStreamingClientObserver):
             sample.capture_timestamp_ns, [sample.pressure]
         )
 
-    # def on_audio_received(self, audio_and_record: AudioDataRecord):
-    #     def on_audio_received(self, audio_and_record: AudioDataAndRecord):
-    #         # Try to extract raw audio array/bytes and sample rate from the record
-    #         audio = None
-    #         sr = None
-    #         record = getattr(audio_and_record, "record", None)
-
-    #         # possible sample rate locations
-    #         for candidate in (getattr(audio_and_record, "sample_rate_hz", None),
-    #                           getattr(audio_and_record, "sample_rate", None),
-    #                           getattr(record, "sample_rate_hz", None) if record else None,
-    #                           getattr(record, "sample_rate", None) if record else None):
-    #             if candidate:
-    #                 sr = int(candidate)
-    #                 break
-    #         if sr is None:
-    #             sr = 48000  # fallback
-
-    #         # possible audio payload locations
-    #         for attr in ("audio", "audio_data", "pcm", "samples", "audio_bytes", "data"):
-    #             if hasattr(audio_and_record, attr):
-    #                 audio = getattr(audio_and_record, attr)
-    #                 break
-
-    #         if audio is None:
-    #             print("No audio payload found in audio_and_record")
-    #             return
-
-    #         # Convert bytes -> numpy, or ensure numpy array
-    #         if isinstance(audio, (bytes, bytearray)):
-    #             # assume 16-bit PCM little-endian by default
-    #             arr = np.frombuffer(audio, dtype=np.int16)
-    #         else:
-    #             arr = np.asarray(audio)
-
-    #         # If interleaved int arrays, convert to float32 in [-1,1] for playback libraries
-    #         if arr.dtype.kind in ("i", "u"):
-    #             info = np.iinfo(arr.dtype) if arr.dtype.kind == "i" else np.iinfo(arr.dtype)
-    #             arr = arr.astype("float32") / float(info.max)
-
-    #         # If 1D but record indicates multiple channels, reshape interleaved data
-    #         channels = None
-    #         for c in (getattr(record, "channel_count", None) if record else None,
-    #                   getattr(record, "channels", None) if record else None,
-    #                   getattr(audio_and_record, "channel_count", None),
-    #                   getattr(audio_and_record, "channels", None)):
-    #             if c:
-    #                 channels = int(c)
-    #                 break
-    #         if channels and arr.ndim == 1 and arr.size % channels == 0:
-    #             arr = arr.reshape((-1, channels))
-
-    #         # Play using sounddevice if available
-    #         try:
-
-    #             try:
-    #                 sd.stop()
-    #             except Exception:
-    #                 pass
-
-    #             sd.play(arr, samplerate=sr)
-    #         except Exception as e:
-    #             print(f"Audio playback failed: {e}")
-
     def on_streaming_client_failure(self, reason: aria.ErrorCode, message: str) -> None:
         print(f"Streaming Client Failure: {reason}: {message}")
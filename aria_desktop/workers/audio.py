@@ -0,0 +1,211 @@
+import asyncio
+import math
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+import numpy as np
+
+from ..utils.config import config
+from ..utils.logger import logger
+from ..bus import AsyncEventBus, Event
+from .sensor_aggregator import SampleRing
+
+FULL_SCALE = 32768.0 # int16 full scale, levels are in dB relative to it
+SILENCE_DB = -120.0 # level of an all-zero chunk
+
+
+@dataclass
+class AudioChunk:
+    """Payload of the "audio_chunk" bus events, a fixed number of frames after downmix and resampling."""
+    seq: int # chunk number, gaps mean dropped chunks
+    timestamp_ns: int # device clock of the first frame
+    sample_rate: int
+    samples: np.ndarray # int16, (frames, channels)
+    level_db: float # RMS level in dBFS
+    voiced: bool # the energy gate was open, silent chunks are not sent to the clients
+    host_time_ns: int # when the chunk was cut
+    overruns: int = 0 # input frames overwritten in the ring before this chunk could take them
+
+
+class Decimator:
+    """
+    Integer factor downsampling: windowed-sinc low-pass, then every factor-th frame.
+    The filter history is carried across chunks, so chunk boundaries don't click.
+    """
+
+    def __init__(self, factor: int, channels: int, taps_per_phase: int = 16):
+        self.factor = factor
+        if factor == 1:
+            return
+        taps = factor * taps_per_phase
+        cutoff = 0.45 / factor # fraction of the input rate, a little below the output Nyquist
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        self.kernel = (kernel / kernel.sum()).astype(np.float32)
+        self.history = np.zeros((taps - 1, channels), dtype=np.float32)
+
+    def process(self, frames: np.ndarray) -> np.ndarray:
+        """frames is float32 (count, channels) with count a multiple of factor."""
+        if self.factor == 1:
+            return frames
+        signal = np.concatenate((self.history, frames))
+        self.history = signal[len(frames):]
+        windows = np.lib.stride_tricks.sliding_window_view(signal, len(self.kernel), axis=0)
+        return windows[::self.factor] @ self.kernel
+
+
+def level_db(samples: np.ndarray) -> float:
+    """RMS level of float samples in int16 units, in dBFS."""
+    rms = float(np.sqrt(np.mean(np.square(samples)))) if samples.size else 0.0
+    return 20 * math.log10(rms / FULL_SCALE) if rms > 0 else SILENCE_DB
+
+
+class AudioPipeline:
+    """
+    Turns the microphone callbacks into fixed-size "audio_chunk" bus events.
+    The SDK callback only converts each record once into a multichannel int16 ring, a loop task
+    cuts the ring into chunks of chunk_ms and picks the channels, downmixes and resamples them
+    as the chunks are published. An energy gate with a hangover marks the chunks that carry sound.
+    """
+
+    def __init__(self, bus: AsyncEventBus, loop: asyncio.AbstractEventLoop,
+                 input_channels: int = 7, input_rate: int = 48000, input_bits: int = 32,
+                 chunk_ms: float = 20, channels: Optional[List[int]] = None, downmix: bool = True,
+                 sample_rate: int = 16000, ring_seconds: float = 2.0,
+                 vad_threshold_db: float = -45.0, vad_hangover_ms: float = 300):
+        self.bus = bus
+        self.loop = loop
+        self.input_channels = input_channels
+        self.input_rate = input_rate
+        self.shift = max(0, input_bits - 16)
+        self.channels = channels or None
+        self.downmix = downmix
+
+        factor = input_rate // sample_rate if sample_rate and input_rate % sample_rate == 0 else 1
+        if factor == 1 and sample_rate and sample_rate != input_rate:
+            logger.warning(f"Audio sample rate {sample_rate} does not divide {input_rate}, sending {input_rate}")
+        self.sample_rate = input_rate // factor
+        # Whole output frames per chunk
+        self.chunk_frames = max(factor, int(input_rate * chunk_ms / 1000) // factor * factor)
+        self.interval = self.chunk_frames / input_rate
+
+        self.decimator = Decimator(factor, self.output_channels)
+        self.ring = SampleRing(np.int16, int(ring_seconds * input_rate), shape=(input_channels,))
+        # Ring frame index and device timestamp of the first frame of the latest record
+        self._anchor = (0, 0)
+        self._frames_read = 0
+
+        self.vad_threshold_db = vad_threshold_db
+        self.hangover_chunks = round(vad_hangover_ms / 1000 / self.interval)
+        self._hold = 0
+
+        self.seq = 0
+        self.voiced = 0
+        self.overruns = 0
+        self._task: Optional[Future] = None
+
+    @classmethod
+    def from_config(cls, bus: AsyncEventBus, loop: asyncio.AbstractEventLoop) -> "AudioPipeline":
+        channels = config.get('audio', 'channels', fallback='')
+        return cls(
+            bus, loop,
+            input_channels=config.getint('audio', 'input_channels', fallback=7),
+            input_rate=config.getint('audio', 'input_rate', fallback=48000),
+            input_bits=config.getint('audio', 'input_bits', fallback=32),
+            chunk_ms=config.getfloat('audio', 'chunk_ms', fallback=20),
+            channels=[int(channel) for channel in channels.split(",") if channel.strip()],
+            downmix=config.getboolean('audio', 'downmix', fallback=True),
+            sample_rate=config.getint('audio', 'sample_rate', fallback=16000),
+            ring_seconds=config.getfloat('audio', 'ring_seconds', fallback=2.0),
+            vad_threshold_db=config.getfloat('audio', 'vad_threshold_db', fallback=-45.0),
+            vad_hangover_ms=config.getfloat('audio', 'vad_hangover_ms', fallback=300),
+        )
+
+    @property
+    def output_channels(self) -> int:
+        return 1 if self.downmix else len(self.channels or range(self.input_channels))
+
+    def add(self, audio_and_record: Any) -> None:
+        """SDK thread: interleaved int32 samples of every input channel into the int16 ring."""
+        frames = np.asarray(audio_and_record.data, dtype=np.int32).reshape(-1, self.input_channels)
+        timestamps = audio_and_record.record.capture_timestamps_ns
+        if not len(frames):
+            return
+        if len(timestamps):
+            self._anchor = (self.ring.written, timestamps[0])
+        self.ring.write((frames >> self.shift).astype(np.int16))
+
+    def start(self) -> None:
+        """Starts publishing on the loop, callable from any thread."""
+        if self._task is None:
+            self._task = asyncio.run_coroutine_threadsafe(self.run(), self.loop)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self) -> None:
+        logger.info(
+            f"Audio pipeline started, {self.interval * 1000:.0f}ms chunks of {self.output_channels}ch "
+            f"at {self.sample_rate}Hz, gate at {self.vad_threshold_db:.0f}dBFS"
+        )
+        deadline = self.loop.time()
+        try:
+            while True:
+                # Absolute deadlines, a late cut doesn't shift the following ones
+                deadline += self.interval
+                await asyncio.sleep(max(0.0, deadline - self.loop.time()))
+                await self.flush()
+        except asyncio.CancelledError:
+            logger.info(f"Audio pipeline: {self.seq} chunks, {self.voiced} voiced, {self.overruns} frames overwritten")
+
+    async def flush(self) -> None:
+        """Publishes every whole chunk the ring got since the last flush."""
+        frames, overruns = self.ring.drain(multiple=self.chunk_frames)
+        if overruns:
+            self.overruns += overruns
+            logger.warning(f"Audio ring overrun, {overruns} frames lost")
+        start = self._frames_read + overruns
+        self._frames_read = start + len(frames)
+
+        host_time_ns = time.time_ns()
+        anchor_index, anchor_ns = self._anchor
+        for offset in range(0, len(frames), self.chunk_frames):
+            samples = self._convert(frames[offset:offset + self.chunk_frames])
+            level = level_db(samples)
+            voiced = self._gate(level)
+            self.seq += 1
+            self.voiced += voiced
+            chunk = AudioChunk(
+                seq=self.seq,
+                timestamp_ns=anchor_ns + round((start + offset - anchor_index) * 1e9 / self.input_rate),
+                sample_rate=self.sample_rate,
+                samples=np.clip(np.rint(samples), -32768, 32767).astype(np.int16),
+                level_db=level,
+                voiced=voiced,
+                host_time_ns=host_time_ns,
+                overruns=overruns if offset == 0 else 0,
+            )
+            await self.bus.publish(Event("audio_chunk", chunk))
+
+    def _convert(self, frames: np.ndarray) -> np.ndarray:
+        """Channel selection, downmix and resampling of one chunk, float32 in int16 units."""
+        if self.channels:
+            frames = frames[:, self.channels]
+        samples = frames.astype(np.float32)
+        if self.downmix:
+            samples = samples.mean(axis=1, keepdims=True)
+        return self.decimator.process(samples)
+
+    def _gate(self, level: float) -> bool:
+        """Open on a loud chunk, stay open for the hangover so word endings and short pauses go through."""
+        if level >= self.vad_threshold_db:
+            self._hold = self.hangover_chunks
+            return True
+        if self._hold > 0:
+            self._hold -= 1
+            return True
+        return False
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..bus import AsyncEventBus
+from ..utils.logger import logger
+
+
+@dataclass(frozen=True)
+class EncodeParams:
+    """What an encoded frame was produced with, consumers with equal params share the bytes."""
+    quality: int
+    scale: float = 1.0
+
+
+CacheKey = Tuple[str, int, EncodeParams]
+
+
+class FrameCache:
+    """
+    Encoded frames keyed by (topic, bus sequence number, encode params).
+    The first consumer that needs an encoding produces it, the others wait for it or reuse it,
+    an encoding is never produced twice at the same time.
+    Entries are evicted once every latest-only subscriber of the topic has moved past their frame,
+    consumers that work behind their bus cursor (queued writers) hold entries with track()/advance().
+    max_entries bounds the cache if a subscriber stops reading.
+    Thread safe, get() is called from encoder and writer threads.
+    """
+
+    def __init__(self, bus: AsyncEventBus, max_entries: int = 32):
+        self.bus = bus
+        self.max_entries = max_entries
+        self._entries: Dict[CacheKey, Future] = {}
+        self._positions: Dict[Tuple[str, str], int] = {} # (consumer, topic) -> last seq it is done with
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get(self, topic: str, seq: int, params: EncodeParams, encode: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """Encoded frame for these params, encode() runs only if nobody produced it yet. None if encoding failed."""
+        key = (topic, seq, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = Future()
+                self._entries[key] = entry
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return entry.result()
+
+        try:
+            data = encode()
+        except BaseException as e:
+            entry.set_exception(e)
+            self._discard(key)
+            raise
+        entry.set_result(data)
+        if data is None:
+            self._discard(key)
+        self._evict(topic)
+        return data
+
+    def track(self, consumer: str, topic: str) -> None:
+        """Keep the entries of topic until consumer has advanced past them."""
+        with self._lock:
+            self._positions[(consumer, topic)] = 0
+
+    def untrack(self, consumer: str, topic: str) -> None:
+        with self._lock:
+            self._positions.pop((consumer, topic), None)
+
+    def advance(self, consumer: str, topic: str, seq: int) -> None:
+        """consumer is done with every frame of topic up to seq."""
+        with self._lock:
+            if (consumer, topic) not in self._positions:
+                return
+            self._positions[(consumer, topic)] = seq
+        self._evict(topic)
+
+    def _discard(self, key: CacheKey) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self, topic: str) -> None:
+        # Every subscriber has already taken a newer frame and every tracked consumer is done with it
+        marks = [cursor.seq for cursor in self.bus.cursors(topic)]
+        with self._lock:
+            marks.extend(seq + 1 for (_, tracked), seq in self._positions.items() if tracked == topic)
+            low = min(marks) if marks else None
+            stale = [key for key in self._entries if key[0] == topic and low is not None and key[1] < low]
+            overflow = len(self._entries) - len(stale) - self.max_entries
+            if overflow > 0:
+                remaining = sorted((key for key in self._entries if key not in stale), key=lambda key: key[1])
+                stale.extend(remaining[:overflow])
+                logger.debug(f"Frame cache full, evicting {overflow} entries still in use")
+            for key in stale:
+                del self._entries[key]
+            self.evicted += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,191 @@
+import asyncio
+from collections import Counter
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.config import config
+from ..utils.logger import logger
+from ..bus import AsyncEventBus, Event
+from .local_yolo import Detection, Detections, frame_detections
+
+THUMBNAIL_SIZE = 32 # side of the grayscale thumbnail the scene change score is computed on
+
+
+def _create_tracker(kind: str):
+    """OpenCV single object tracker, kcf, csrt and mosse come with opencv-contrib-python."""
+    if kind == "mosse":
+        return cv2.legacy.TrackerMOSSE_create()
+    return getattr(cv2, f"Tracker{kind.upper()}_create")()
+
+
+@dataclass
+class _Track:
+    tracker: object
+    detection: Detection # keyframe detection, its class and confidence go with the tracked boxes
+
+
+class KeyframeScheduler:
+    """
+    Runs the detector on keyframes only and carries its boxes forward with OpenCV trackers
+    on every other frame, publishing "tracked_detections" events at the frame rate.
+    A frame becomes a keyframe after keyframe_interval frames, when the scene changed by more
+    than scene_change since the last keyframe, or when a tracker lost its object.
+    The detectors read their frames from keyframes() instead of the rgb_frame topic.
+    """
+
+    def __init__(self, bus: AsyncEventBus, interval: int = 15, scene_change: float = 0.08,
+                 tracker: str = "kcf", track_scale: float = 0.5):
+        self.bus = bus
+        self.interval = max(1, interval)
+        self.scene_change = scene_change
+        self.track_scale = min(1.0, track_scale)
+        self.tracker_kind = tracker
+        try:
+            _create_tracker(tracker)
+        except AttributeError:
+            logger.warning(f"OpenCV has no {tracker} tracker (needs opencv-contrib-python), tracking with mil")
+            self.tracker_kind = "mil"
+
+        # Latest keyframe the detector has not taken yet, newer ones replace it
+        self._keyframe: Optional[Event] = None
+        self._keyframe_ready = asyncio.Event()
+        # Tracking images of requested keyframes by seq, the trackers start from them
+        self._keyframe_images: Dict[int, np.ndarray] = {}
+        self._reference: Optional[np.ndarray] = None # thumbnail of the last keyframe
+        self._since_keyframe = 0
+        self._detected: Optional[Detections] = None
+        self._tracks: List[_Track] = []
+
+        self.frames = 0
+        self.reasons: Counter = Counter() # keyframes by the reason they were taken
+
+    @classmethod
+    def from_config(cls, bus: AsyncEventBus) -> "KeyframeScheduler":
+        return cls(
+            bus,
+            interval=config.getint('yolo', 'keyframe_interval', fallback=15),
+            scene_change=config.getfloat('yolo', 'scene_change', fallback=0.08),
+            tracker=config.get('yolo', 'tracker', fallback='kcf'),
+            track_scale=config.getfloat('yolo', 'track_scale', fallback=0.5),
+        )
+
+    async def keyframes(self) -> AsyncIterator[Event]:
+        """The rgb_frame events picked as keyframes, latest-only like a bus subscription."""
+        while True:
+            await self._keyframe_ready.wait()
+            self._keyframe_ready.clear()
+            event, self._keyframe = self._keyframe, None
+            if event is not None:
+                yield event
+
+    async def run(self) -> None:
+        logger.info(f"Keyframe scheduler started, {self.tracker_kind} trackers between keyframes")
+        frames = self.bus.subscribe("rgb_frame", latest_only=True, name="tracker")
+        results = asyncio.create_task(self._collect_detections())
+        try:
+            async for event in frames:
+                self.frames += 1
+                detected, self._detected = self._detected, None
+                # The keyframe images belong to the loop, the tracking thread only gets the one it starts from
+                keyframe = self._take_keyframe(detected) if detected is not None else None
+                tracked, lost, thumbnail, image = await asyncio.to_thread(self._step, event.payload["image"], detected, keyframe)
+
+                reason = self._keyframe_reason(thumbnail, lost)
+                if reason:
+                    self._request_keyframe(event, thumbnail, image, reason)
+                else:
+                    self._since_keyframe += 1
+
+                await self.bus.publish(Event("tracked_detections", frame_detections(event, tracked, tracked=True)))
+
+        except asyncio.CancelledError:
+            logger.info("Keyframe scheduler shutting down.")
+        finally:
+            results.cancel()
+            await asyncio.gather(results, return_exceptions=True)
+            await frames.aclose()
+            keyframes = sum(self.reasons.values())
+            logger.info(f"Keyframe scheduler: {keyframes} keyframes in {self.frames} frames {dict(self.reasons)}")
+
+    async def _collect_detections(self) -> None:
+        # Only handed over here, the trackers are touched by the frame loop alone
+        async for event in self.bus.subscribe("detections"):
+            if event.payload.seq in self._keyframe_images:
+                self._detected = event.payload
+
+    def _keyframe_reason(self, thumbnail: np.ndarray, lost: int) -> Optional[str]:
+        if self._reference is None:
+            return "first"
+        if lost:
+            return "tracker_lost"
+        if self._since_keyframe + 1 >= self.interval:
+            return "interval"
+        score = float(np.mean(cv2.absdiff(thumbnail, self._reference))) / 255
+        if score > self.scene_change:
+            return "scene_change"
+        return None
+
+    def _request_keyframe(self, event: Event, thumbnail: np.ndarray, image: np.ndarray, reason: str) -> None:
+        self.reasons[reason] += 1
+        self._reference = thumbnail
+        self._since_keyframe = 0
+        self._keyframe_images[event.seq] = image
+        # A few keyframes may be waiting for their detections, older ones never will
+        for seq in sorted(self._keyframe_images)[:-4]:
+            del self._keyframe_images[seq]
+        self._keyframe = event
+        self._keyframe_ready.set()
+
+    def _take_keyframe(self, detected: Detections) -> Optional[np.ndarray]:
+        """Image of the keyframe the detections belong to, None if it was dropped. Older keyframes are dropped too."""
+        keyframe = self._keyframe_images.pop(detected.seq, None)
+        for seq in [seq for seq in self._keyframe_images if seq < detected.seq]:
+            del self._keyframe_images[seq]
+        return keyframe
+
+    def _step(self, frame: np.ndarray, detected: Optional[Detections],
+              keyframe: Optional[np.ndarray] = None) -> Tuple[List[Detection], int, np.ndarray, np.ndarray]:
+        """
+        Tracking thread: restarts the trackers from fresh detections on their keyframe, then follows them into frame.
+        Returns the tracked boxes in frame pixels, the number of lost trackers, the thumbnail
+        and the scaled down image of the frame.
+        """
+        image = frame
+        if self.track_scale < 1:
+            image = cv2.resize(frame, None, fx=self.track_scale, fy=self.track_scale, interpolation=cv2.INTER_AREA)
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        thumbnail = cv2.resize(gray, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA)
+
+        if detected is not None and keyframe is not None:
+            self._start_tracks(detected, keyframe)
+
+        tracked, lost = [], 0
+        height, width = image.shape[:2]
+        for track in list(self._tracks):
+            ok, (x, y, w, h) = track.tracker.update(image)
+            # Boxes that slid out of the frame are as good as lost
+            if not ok or w <= 0 or h <= 0 or x + w <= 0 or y + h <= 0 or x >= width or y >= height:
+                self._tracks.remove(track)
+                lost += 1
+                continue
+            tracked.append(Detection(
+                class_name=track.detection.class_name,
+                confidence=track.detection.confidence,
+                bbox=[x / self.track_scale, y / self.track_scale, (x + w) / self.track_scale, (y + h) / self.track_scale],
+            ))
+        return tracked, lost, thumbnail, image
+
+    def _start_tracks(self, detected: Detections, keyframe: np.ndarray) -> None:
+        """Replaces the trackers by new ones started on the keyframe the detections belong to."""
+        self._tracks = []
+        for det in detected.detections:
+            if not det.bbox:
+                continue
+            x1, y1, x2, y2 = (coord * self.track_scale for coord in det.bbox)
+            box = (int(x1), int(y1), max(1, int(x2 - x1)), max(1, int(y2 - y1)))
+            tracker = _create_tracker(self.tracker_kind)
+            tracker.init(keyframe, box)
+            self._tracks.append(_Track(tracker=tracker, detection=det))
@@ -1,55 +1,630 @@
 import asyncio
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import threading
+import time
 import httpx
 import cv2
-import io
+import numpy as np
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from ..utils.config import config
 from ..utils.logger import logger
-from ..bus import AsyncEventBus
+from ..bus import AsyncEventBus, Event
+from .frame_cache import EncodeParams, FrameCache
 
 
-async def yolo_worker(bus: AsyncEventBus, client: httpx.AsyncClient):
+@dataclass
+class Detection:
+    class_name: str
+    confidence: float
+    bbox: Optional[List[float]] = None # x1, y1, x2, y2 in pixels of the original frame
+
+
+@dataclass
+class Detections:
+    """Payload of the "detections" bus events, one per inferred frame."""
+    seq: int # bus seq of the rgb_frame the detections belong to
+    capture_timestamp_ns: int
+    host_time_ns: int
+    latency_ms: float # frame arrival to detections
+    detections: List[Detection] = field(default_factory=list)
+    tracked: bool = False # boxes carried forward from the last keyframe by the trackers
+
+
+class Backoff:
+    """Exponential backoff with jitter while the model server is unreachable, reset on success."""
+
+    def __init__(self, initial: float = 0.5, maximum: float = 30.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = 0.0
+        self.failures = 0
+
+    def failed(self) -> float:
+        self.failures += 1
+        self.delay = self.initial if self.delay == 0 else min(self.delay * 2, self.maximum)
+        return self.delay * random.uniform(0.8, 1.2)
+
+    def succeeded(self) -> None:
+        if self.failures:
+            logger.info(f"YOLO server reachable again after {self.failures} failed requests")
+        self.delay = 0.0
+        self.failures = 0
+
+
+def _encode_jpeg(image, size: int, quality: int) -> Optional[bytes]:
+    # We need to convert from RGB (from camera) to BGR (for cv2)
+    image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    scale = size / max(image.shape[:2])
+    if scale < 1:
+        image_bgr = cv2.resize(image_bgr, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    is_success, buffer = cv2.imencode(".jpg", image_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buffer.tobytes() if is_success else None
+
+
+class InferenceClient:
     """
-    Subscribes to the event bus and sends images to the YOLO server.
+    Sends rgb frames to the YOLO server and publishes the results as "detections" events.
+    Frames are taken latest-only when a request slot is free, so inference runs at whatever rate
+    the server sustains and never queues stale frames. Requests go over a pooled keep-alive connection,
+    frames that arrive within batch_window are sent together, at most max_in_flight requests run at once.
     """
-    logger.info("YOLO worker started, waiting for images...")
+
+    def __init__(self, bus: AsyncEventBus, cache: Optional[FrameCache] = None,
+                 frames: Optional[AsyncIterator[Event]] = None):
+        self.bus = bus
+        self.cache = cache # with a cache full-size frames are sent, sharing the recorder's encoding
+        self.source = frames # rgb frames to run on, latest of the rgb_frame topic if None
+        self.url = config.get('yolo', 'url', fallback='http://127.0.0.1:8008/infer/')
+        self.batch_url = config.get('yolo', 'batch_url', fallback='http://127.0.0.1:8008/infer_batch/')
+        self.batch_size = max(1, config.getint('yolo', 'batch_size', fallback=4))
+        self.batch_window = config.getfloat('yolo', 'batch_window_ms', fallback=25.0) / 1000
+        self.max_in_flight = max(1, config.getint('yolo', 'max_in_flight', fallback=2))
+        self.timeout = config.getfloat('yolo', 'timeout', fallback=5.0)
+        self.image_size = config.getint('yolo', 'image_size', fallback=640)
+        self.jpeg_quality = config.getint('yolo', 'jpeg_quality', fallback=95)
+        self.backoff = Backoff(maximum=config.getfloat('yolo', 'backoff_max', fallback=30.0))
+
+        self.client: Optional[httpx.AsyncClient] = None
+        self._pending: Optional[asyncio.Future] = None
+        self.requests = 0
+        self.frames = 0
+        self.failures = 0
+
+    async def run(self) -> None:
+        logger.info(f"YOLO worker started, sending frames to {self.url}")
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        requests: set[asyncio.Task] = set()
+        frames = self.source or self.bus.subscribe("rgb_frame", latest_only=True, name="yolo")
+
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            self.client = client
+            try:
+                while True:
+                    # Take frames only when a request can go out, the cursor skips the rest
+                    await slots.acquire()
+                    if self.backoff.delay:
+                        await asyncio.sleep(self.backoff.delay)
+                    batch = await self._collect(frames)
+                    task = asyncio.create_task(self._infer(batch))
+                    requests.add(task)
+                    task.add_done_callback(lambda task: (requests.discard(task), slots.release()))
+
+            except asyncio.CancelledError:
+                logger.info("YOLO worker shutting down.")
+            finally:
+                pending = [self._pending] if self._pending is not None else []
+                for task in [*pending, *requests]:
+                    task.cancel()
+                await asyncio.gather(*pending, *requests, return_exceptions=True)
+                await frames.aclose()
+                logger.info(f"YOLO worker: {self.requests} requests, {self.frames} frames, {self.failures} failed")
+
+    async def _next_frame(self, frames, timeout: Optional[float] = None) -> Optional[Event]:
+        """
+        Next frame of the subscription, None if none arrived within timeout.
+        A timed out read stays pending for the next call, cancelling it would close the subscription.
+        """
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(frames.__anext__())
+        done, _ = await asyncio.wait({self._pending}, timeout=timeout)
+        if not done:
+            return None
+        pending, self._pending = self._pending, None
+        return pending.result()
+
+    async def _collect(self, frames) -> List[Event]:
+        """The next frame plus those arriving within batch_window, up to batch_size."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._next_frame(frames)]
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            event = await self._next_frame(frames, remaining) if remaining > 0 else None
+            if event is None:
+                break
+            batch.append(event)
+        return batch
+
+    async def _encode(self, event: Event) -> Optional[bytes]:
+        image = event.payload["image"]
+        if self.cache is not None:
+            # The recorder's plain full-size JPEG, the server resizes it to the model input
+            encode = lambda: _encode_jpeg(image, max(image.shape[:2]), self.jpeg_quality)
+            return await asyncio.to_thread(self.cache.get, event.event_type, event.seq, EncodeParams(self.jpeg_quality), encode)
+        return await asyncio.to_thread(_encode_jpeg, image, self.image_size, self.jpeg_quality)
+
+    async def _post(self, jpegs: List[bytes]) -> List[List[Dict[str, Any]]]:
+        """Detections of every image, one batch request if the server supports it."""
+        if len(jpegs) > 1 and self.batch_url:
+            files = [("files", (f"image{i}.jpg", jpeg, "image/jpeg")) for i, jpeg in enumerate(jpegs)]
+            response = await self.client.post(self.batch_url, files=files)
+            self.requests += 1
+            if response.status_code in (404, 405):
+                logger.warning(f"YOLO server has no batch endpoint at {self.batch_url}, sending frames one by one")
+                self.batch_url = ""
+            else:
+                response.raise_for_status()
+                return [result.get("detections", []) for result in response.json().get("results", [])]
+
+        async def post_one(jpeg: bytes) -> List[Dict[str, Any]]:
+            response = await self.client.post(self.url, files={"file": ("image.jpg", jpeg, "image/jpeg")})
+            self.requests += 1
+            response.raise_for_status()
+            return response.json().get("detections", [])
+
+        return await asyncio.gather(*(post_one(jpeg) for jpeg in jpegs))
+
+    async def _infer(self, batch: List[Event]) -> None:
+        try:
+            jpegs = await asyncio.gather(*(self._encode(event) for event in batch))
+            encoded = [(event, jpeg) for event, jpeg in zip(batch, jpegs) if jpeg is not None]
+            if not encoded:
+                logger.warning("Failed to encode image to JPG")
+                return
+
+            results = await self._post([jpeg for _, jpeg in encoded])
+            self.backoff.succeeded()
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            self.failures += 1
+            delay = self.backoff.failed()
+            logger.error(f"YOLO request failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+            return
+        except Exception as e:
+            logger.error(f"Error in YOLO worker: {e}", exc_info=True)
+            return
+
+        self.frames += len(encoded)
+        for (event, _), raw in zip(encoded, results):
+            await self.bus.publish(Event("detections", self._detections(event, raw)))
+
+    def _detections(self, event: Event, raw: List[Dict[str, Any]]) -> Detections:
+        image = event.payload["image"]
+        # Boxes come back in pixels of the image sent, resized unless it came from the cache
+        size = max(image.shape[:2])
+        scale = size / self.image_size if self.cache is None and size > self.image_size else 1.0
+        return frame_detections(event, [
+            Detection(
+                class_name=det["class_name"],
+                confidence=float(det["confidence"]),
+                bbox=[coord * scale for coord in det["bbox"]] if det.get("bbox") else None,
+            )
+            for det in raw
+        ])
+
+
+def frame_detections(event: Event, found: List[Detection], tracked: bool = False) -> Detections:
+    """Detections event payload for the frame of event."""
+    payload = event.payload
+    record = payload.get("record")
+    host_time_ns = payload.get("host_time_ns", 0)
+    for det in found:
+        logger.debug(f"  > Found '{det.class_name}' (Conf: {det.confidence:.2f})")
+    return Detections(
+        seq=event.seq,
+        capture_timestamp_ns=record.capture_timestamp_ns if record is not None else payload.get("capture_timestamp_ns", 0),
+        host_time_ns=host_time_ns,
+        latency_ms=(time.time_ns() - host_time_ns) / 1e6 if host_time_ns else 0.0,
+        detections=found,
+        tracked=tracked,
+    )
+
+
+# Classes of the stock YOLO exports, used when no class_names file is configured
+COCO_CLASSES = (
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat", "traffic light",
+    "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog", "horse", "sheep", "cow",
+    "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella", "handbag", "tie", "suitcase", "frisbee",
+    "skis", "snowboard", "sports ball", "kite", "baseball bat", "baseball glove", "skateboard", "surfboard",
+    "tennis racket", "bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple",
+    "sandwich", "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch",
+    "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard", "cell phone",
+    "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase", "scissors", "teddy bear",
+    "hair drier", "toothbrush",
+)
+
+# (class id, confidence, [x1, y1, x2, y2]) in pixels of the original frame
+RawDetection = Tuple[int, float, List[float]]
+
+
+@dataclass
+class DnnSettings:
+    model_path: str
+    input_size: int = 640
+    conf_threshold: float = 0.25
+    nms_threshold: float = 0.45
+    threads: int = 1 # OpenCV threads of each worker process
+
+
+def _letterbox(image: np.ndarray, canvas: np.ndarray) -> float:
+    """Scales image into the top left of the square canvas keeping the aspect ratio, returns the scale."""
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    size = canvas.shape[0]
+    scale = size / max(image.shape[:2])
+    width, height = round(image.shape[1] * scale), round(image.shape[0] * scale)
+    canvas.fill(114)
+    canvas[:height, :width] = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+    return scale
+
+
+def _decode(output: np.ndarray, scale: float, conf_threshold: float, nms_threshold: float) -> List[RawDetection]:
+    """Boxes of a YOLO output tensor after confidence filtering and per class NMS."""
+    preds = output[0]
+    if preds.shape[0] < preds.shape[1]:
+        # YOLOv8 and later: (4 + classes, anchors)
+        preds = preds.T
+        boxes, scores = preds[:, :4], preds[:, 4:]
+    else:
+        # YOLOv5: (anchors, 5 + classes) with an objectness column
+        boxes, scores = preds[:, :4], preds[:, 5:] * preds[:, 4:5]
+
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+    keep = confidences >= conf_threshold
+    if not keep.any():
+        return []
+    boxes, confidences, class_ids = boxes[keep], confidences[keep], class_ids[keep]
+
+    # Center, size in model pixels to top left, size in frame pixels
+    xywh = np.empty_like(boxes)
+    xywh[:, :2] = (boxes[:, :2] - boxes[:, 2:] / 2) / scale
+    xywh[:, 2:] = boxes[:, 2:] / scale
+    indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confidences.tolist(), class_ids.tolist(), conf_threshold, nms_threshold)
+    return [
+        (int(class_ids[i]), float(confidences[i]), [float(x), float(y), float(x + w), float(y + h)])
+        for i in np.asarray(indices, dtype=int).reshape(-1)
+        for x, y, w, h in [xywh[i]]
+    ]
+
+
+def _dnn_worker(settings: DnnSettings, slot: int, slot_name: str, conn) -> None:
+    """
+    Worker process: loads the model, then runs every frame written to its shared memory slot.
+    Tasks are (shape, dtype) of the frame in the slot, results (detections, error).
+    """
+    cv2.setNumThreads(settings.threads)
+    try:
+        net = cv2.dnn.readNetFromONNX(settings.model_path)
+        shm = shared_memory.SharedMemory(name=slot_name)
+    except Exception as e:
+        conn.send((None, f"{type(e).__name__}: {e}"))
+        return
+    canvas = np.empty((settings.input_size, settings.input_size, 3), dtype=np.uint8)
+    conn.send((None, None)) # ready
+
     try:
-        async for event in bus.subscribe("image_received"): #
+        while (task := conn.recv()) is not None:
+            shape, dtype = task
             try:
-                image_np = event.payload["image"]
-                
-                # Encode image to JPEG in memory
-                # We need to convert from RGB (from camera) to BGR (for cv2)
-                image_bgr = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-                is_success, buffer = cv2.imencode(".jpg", image_bgr)
-                if not is_success:
-                    logger.warning("Failed to encode image to JPG")
-                    continue
-                
-                image_bytes = io.BytesIO(buffer)
-                
-                # Send to YOLO server (non-blocking)
-                response = await client.post(
-                    "http://127.0.0.1:8008/infer/",
-                    files={"file": ("image.jpg", image_bytes, "image/jpeg")}
-                )
-                
-                if response.status_code == 200:
-                    detections = response.json().get("detections", [])
-                    if detections:
-                        logger.info(f"--- YOLO Detections ---")
-                        for det in detections:
-                            logger.info(f"  > Found '{det['class_name']}' (Conf: {det['confidence']:.2f})")
-                    else:
-                        logger.info("No objects detected by YOLO.")
-                else:
-                    logger.error(f"YOLO server returned error: {response.status_code}")
-
-            except httpx.ConnectError:
-                logger.error("Could not connect to YOLO server. Is it running?")
-                # Stop worker for 10s to avoid spamming
-                await asyncio.sleep(10)
+                image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                scale = _letterbox(image, canvas)
+                del image # no view may outlive the shared memory
+                net.setInput(cv2.dnn.blobFromImage(canvas, 1 / 255.0))
+                found = _decode(net.forward(), scale, settings.conf_threshold, settings.nms_threshold)
+                conn.send((found, None))
             except Exception as e:
-                logger.error(f"Error in YOLO worker: {e}")
-                
-    except asyncio.CancelledError:
-        logger.info("YOLO worker shutting down.")
\ No newline at end of file
+                conn.send((None, f"{type(e).__name__}: {e}"))
+    finally:
+        shm.close()
+
+
+class DnnInferencePool:
+    """
+    ONNX detector run through cv2.dnn in a pool of worker processes.
+    Each process owns a shared memory slot of slot_bytes and a pipe, frames are copied into
+    the slot and only the frame shape goes through the pipe, arrays are never pickled.
+    A slot is free while its process is idle. A process that dies fails the frame it was running,
+    gets its slot back and is respawned with a new pipe.
+    """
+
+    def __init__(self, settings: DnnSettings, processes: int = 2):
+        self.settings = settings
+        self.processes = max(1, processes)
+        self.slot_bytes = 0
+        self.respawns = 0
+        self._context = multiprocessing.get_context("spawn") # no forking of the event loop and its threads
+        self._target = _dnn_worker
+        self._workers: List[multiprocessing.Process] = []
+        self._slots: List[shared_memory.SharedMemory] = []
+        self._conns: List[Any] = []
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._free: Optional[asyncio.Queue] = None
+        self._futures: Dict[int, Tuple[Any, asyncio.Future]] = {} # slot -> (pipe it was sent to, future) of its frame
+        self._retired: set = set() # slots whose respawned worker could not load the model
+        self._closing = threading.Event()
+
+    def _spawn(self, slot: int) -> None:
+        conn, child_conn = self._context.Pipe()
+        worker = self._context.Process(
+            target=self._target, args=(self.settings, slot, self._slots[slot].name, child_conn),
+            name=f"dnn-worker-{slot}", daemon=True,
+        )
+        worker.start()
+        child_conn.close()
+        self._conns[slot], self._workers[slot] = conn, worker
+
+    def start(self, slot_bytes: int, loop: asyncio.AbstractEventLoop, timeout: float = 60.0) -> None:
+        """Spawns the workers and waits until each one has loaded the model. Blocking."""
+        self.slot_bytes = slot_bytes
+        self._loop = loop
+        self._slots = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(self.processes)]
+        self._conns = [None] * self.processes
+        self._workers = [None] * self.processes
+        for slot in range(self.processes):
+            self._spawn(slot)
+
+        deadline = time.monotonic() + timeout
+        try:
+            for conn in self._conns:
+                if not conn.poll(max(0.0, deadline - time.monotonic())):
+                    raise TimeoutError(f"DNN workers not ready after {timeout:.0f}s")
+                _, error = conn.recv()
+                if error is not None:
+                    raise RuntimeError(f"DNN worker failed to load {self.settings.model_path}: {error}")
+        except (TimeoutError, EOFError, RuntimeError) as e:
+            self.close()
+            if isinstance(e, EOFError):
+                raise RuntimeError("DNN worker exited while loading the model") from e
+            raise RuntimeError(str(e)) from e
+
+        self._free = asyncio.Queue()
+        for slot in range(self.processes):
+            self._free.put_nowait(slot)
+        self._reader = threading.Thread(target=self._read_results, name="dnn-results", daemon=True)
+        self._reader.start()
+        logger.info(f"DNN inference pool ready: {self.processes} processes, {slot_bytes / 1e6:.1f}MB frame slots")
+
+    async def acquire(self) -> int:
+        """Waits for a slot whose worker is idle."""
+        return await self._free.get()
+
+    def release(self, slot: int) -> None:
+        self._free.put_nowait(slot)
+
+    def submit(self, slot: int, image: np.ndarray) -> asyncio.Future:
+        """Copies image into slot and hands it to its worker, the future resolves to its detections."""
+        if image.nbytes > self.slot_bytes:
+            raise ValueError(f"{image.shape} frame does not fit the {self.slot_bytes} byte slots")
+        view = np.ndarray(image.shape, dtype=image.dtype, buffer=self._slots[slot].buf)
+        np.copyto(view, image)
+        del view
+        future = self._loop.create_future()
+        conn = self._conns[slot]
+        self._futures[slot] = (conn, future)
+        try:
+            conn.send((image.shape, image.dtype.str))
+        except OSError:
+            pass # the worker is dead, the frame fails once the reader has respawned it
+        return future
+
+    def _read_results(self) -> None:
+        """Reader thread: hands the results to the loop, respawns the workers that died."""
+        loading = set() # respawned workers that haven't sent their ready message yet
+        while not self._closing.is_set():
+            live = [slot for slot in range(self.processes) if slot not in self._retired]
+            conns = {self._conns[slot]: slot for slot in live}
+            sentinels = {self._workers[slot].sentinel: slot for slot in live}
+            ready = multiprocessing.connection.wait([*conns, *sentinels], timeout=0.5)
+            # Results first, a worker may have sent its result right before it died
+            died = set()
+            for conn in (conn for conn in ready if conn in conns):
+                slot = conns[conn]
+                try:
+                    found, error = conn.recv()
+                except (EOFError, OSError):
+                    died.add(slot)
+                    continue
+                if slot in loading:
+                    loading.discard(slot)
+                    if error is not None:
+                        logger.error(f"Respawned DNN worker {slot} failed to load {self.settings.model_path}: {error}")
+                        self._retired.add(slot)
+                    continue
+                self._loop.call_soon_threadsafe(self._complete, slot, conn, found, error)
+            died.update(sentinels[sentinel] for sentinel in ready if sentinel in sentinels)
+            for slot in sorted(died - self._retired):
+                dead = self._conns[slot]
+                worker = self._workers[slot]
+                worker.join(timeout=1)
+                logger.error(f"DNN worker {slot} died (exit code {worker.exitcode}), respawning it")
+                self._spawn(slot)
+                dead.close()
+                self.respawns += 1
+                loading.add(slot)
+                # Frames sent to the new worker wait in its pipe until the model is loaded
+                self._loop.call_soon_threadsafe(self._complete, slot, dead, None, f"DNN worker {slot} died")
+
+    def _complete(self, slot: int, conn: Any, found: Optional[List[RawDetection]], error: Optional[str]) -> None:
+        """Result of the frame sent to slot through conn, an error if its worker died."""
+        # Only a frame sent to that worker is settled, a dead worker may have been idle
+        # or its slot already handed to the respawned one
+        if slot not in self._futures or self._futures[slot][0] is not conn:
+            return
+        _, future = self._futures.pop(slot)
+        # The slot is only reused once its worker is done with it, even if the caller gave up waiting
+        self.release(slot)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(found)
+
+    def alive(self) -> bool:
+        return all(worker.is_alive() for worker in self._workers)
+
+    def close(self) -> None:
+        self._closing.set()
+        if self._reader is not None:
+            self._reader.join(timeout=2)
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (OSError, AttributeError):
+                pass
+        for worker in self._workers:
+            if worker is None:
+                continue
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        for conn in self._conns:
+            if conn is not None:
+                conn.close()
+        for shm in self._slots:
+            shm.close()
+            shm.unlink()
+        self._workers, self._slots, self._conns, self._reader = [], [], [], None
+
+
+class DnnDetector:
+    """
+    Runs the YOLO model in process through cv2.dnn and publishes "detections" events,
+    no JPEG round trip and no model server. Like the HTTP client, frames are taken latest-only
+    whenever a worker process is idle.
+    """
+
+    def __init__(self, bus: AsyncEventBus, frames: Optional[AsyncIterator[Event]] = None):
+        self.bus = bus
+        self.source = frames # rgb frames to run on, latest of the rgb_frame topic if None
+        processes = config.getint('yolo', 'dnn_processes', fallback=2)
+        self.settings = DnnSettings(
+            model_path=config.get('yolo', 'model_path', fallback='models/yolov8n.onnx'),
+            input_size=config.getint('yolo', 'image_size', fallback=640),
+            conf_threshold=config.getfloat('yolo', 'conf_threshold', fallback=0.25),
+            nms_threshold=config.getfloat('yolo', 'nms_threshold', fallback=0.45),
+            threads=config.getint('yolo', 'dnn_threads', fallback=max(1, (os.cpu_count() or 1) // max(1, processes))),
+        )
+        self.max_frame_side = config.getint('yolo', 'dnn_max_frame_side', fallback=2880)
+        self.timeout = config.getfloat('yolo', 'timeout', fallback=5.0)
+        self.class_names = self._load_class_names(config.get('yolo', 'class_names', fallback=''))
+        self.pool = DnnInferencePool(self.settings, processes)
+        self.frames = 0
+        self.failures = 0
+        self.skipped = 0 # frames too large for the slots
+
+    @staticmethod
+    def _load_class_names(path: str) -> Tuple[str, ...]:
+        if not path:
+            return COCO_CLASSES
+        with open(path) as f:
+            return tuple(line.strip() for line in f if line.strip())
+
+    async def run(self) -> None:
+        logger.info(f"YOLO worker started, running {self.settings.model_path} through cv2.dnn")
+        loop = asyncio.get_running_loop()
+        inferences: set[asyncio.Task] = set()
+        frames = self.source or self.bus.subscribe("rgb_frame", latest_only=True, name="yolo")
+
+        try:
+            # Slots fit an RGB frame of max_frame_side, no frame is taken before the models are loaded
+            await asyncio.to_thread(self.pool.start, self.max_frame_side ** 2 * 3, loop)
+            while True:
+                slot = await self.pool.acquire()
+                try:
+                    event = await frames.__anext__()
+                    image = event.payload["image"]
+                    if image.nbytes > self.pool.slot_bytes:
+                        self.pool.release(slot)
+                        self.skipped += 1
+                        if self.skipped % 100 == 1:
+                            logger.warning(f"{image.shape} frame does not fit the DNN slots, {self.skipped} skipped so far")
+                        continue
+                    future = self.pool.submit(slot, image)
+                except BaseException:
+                    self.pool.release(slot)
+                    raise
+                task = asyncio.create_task(self._infer(event, future))
+                inferences.add(task)
+                task.add_done_callback(inferences.discard)
+
+        except asyncio.CancelledError:
+            logger.info("YOLO worker shutting down.")
+        except (RuntimeError, OSError) as e:
+            logger.error(f"YOLO worker stopped: {e}")
+        finally:
+            for task in inferences:
+                task.cancel()
+            await asyncio.gather(*inferences, return_exceptions=True)
+            await frames.aclose()
+            await asyncio.to_thread(self.pool.close)
+            logger.info(
+                f"YOLO worker: {self.frames} frames, {self.failures} failed, {self.skipped} too large, "
+                f"{self.pool.respawns} worker processes respawned"
+            )
+
+    async def _infer(self, event: Event, future: asyncio.Future) -> None:
+        try:
+            found = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.failures += 1
+            state = "" if self.pool.alive() else ", a worker process has died"
+            logger.error(f"DNN inference took longer than {self.timeout:.1f}s{state}")
+            return
+        except RuntimeError as e:
+            self.failures += 1
+            logger.error(f"DNN inference failed: {e}")
+            return
+
+        self.frames += 1
+        detections = [
+            Detection(
+                class_name=self.class_names[class_id] if class_id < len(self.class_names) else str(class_id),
+                confidence=confidence,
+                bbox=bbox,
+            )
+            for class_id, confidence, bbox in found
+        ]
+        await self.bus.publish(Event("detections", frame_detections(event, detections)))
+
+
+async def yolo_worker(bus: AsyncEventBus, cache: Optional[FrameCache] = None):
+    """
+    Subscribes to the event bus and runs YOLO on the rgb frames,
+    on the YOLO server or in local worker processes depending on [yolo] backend.
+    With [yolo] keyframes only keyframes are detected and trackers fill in the frames between them.
+    """
+    scheduler = None
+    frames = None
+    if config.getboolean('yolo', 'keyframes', fallback=False):
+        from .keyframes import KeyframeScheduler # imports the detection types from here
+        scheduler = KeyframeScheduler.from_config(bus)
+        frames = scheduler.keyframes()
+
+    if config.get('yolo', 'backend', fallback='http') == 'dnn':
+        detector = DnnDetector(bus, frames)
+    else:
+        detector = InferenceClient(bus, cache, frames)
+
+    if scheduler is None:
+        await detector.run()
+    else:
+        await asyncio.gather(scheduler.run(), detector.run())
@@ -0,0 +1,145 @@
+import time
+from typing import Optional
+
+from ..utils.logger import logger
+from ..utils.config import config
+
+
+class AdaptiveQualityController:
+    """
+    Closed loop controller for the websocket video feed.
+    Uses encode time, send time and frame size measured by the worker, plus the receive
+    rate reported by the client, to keep the per-frame latency around a target by
+    adjusting JPEG quality, output resolution and frame rate.
+    Latencies between headroom * target and the target are left alone, and a step up
+    that runs into congestion right away doubles the wait before the next one.
+    """
+
+    def __init__(
+        self,
+        target_latency: float = 0.15,
+        min_quality: int = 30,
+        max_quality: int = 75,
+        min_scale: float = 0.25,
+        min_fps: float = 2.0,
+        max_fps: float = 30.0,
+    ):
+        self.target_latency = target_latency
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.min_scale = min_scale
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+
+        # Current output settings, start at full quality and let congestion bring them down
+        self.quality = max_quality
+        self.scale = 1.0
+        self.target_fps = max_fps
+
+        # Smoothed measurements
+        self.alpha = 0.2
+        self.latency_ema: Optional[float] = None
+        self.send_fps_ema: Optional[float] = None
+        self.bytes_per_sec_ema: Optional[float] = None
+        self.client_fps: Optional[float] = None
+
+        self.last_send = 0.0
+        self.last_decrease = 0.0
+        self.last_increase = 0.0
+        self.last_step_up = 0.0
+        self.headroom = 0.6 # step up only below this fraction of the target latency
+        self.decrease_cooldown = 0.5 # let a decrease show in the measurements before the next one
+        self.min_increase_interval = 2.0 # stay below target this long before stepping back up
+        self.max_increase_interval = 30.0
+        self.increase_interval = self.min_increase_interval
+
+    @classmethod
+    def from_config(cls) -> "AdaptiveQualityController":
+        return cls(
+            target_latency=config.getint('websocket', 'target_latency_ms', fallback=150) / 1000,
+            min_quality=config.getint('websocket', 'min_quality', fallback=30),
+            max_quality=config.getint('websocket', 'max_quality', fallback=75),
+            min_scale=config.getfloat('websocket', 'min_scale', fallback=0.25),
+            min_fps=config.getfloat('websocket', 'min_fps', fallback=2),
+            max_fps=config.getfloat('websocket', 'max_fps', fallback=30),
+        )
+
+    @property
+    def min_interval(self) -> float:
+        """Minimum time between two frames at the current target frame rate."""
+        return 1.0 / self.target_fps
+
+    def _smooth(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + self.alpha * (value - current)
+
+    def report_client_fps(self, fps: Optional[float]) -> None:
+        """Receive rate reported by the client, None if it doesn't report it."""
+        self.client_fps = fps
+
+    def update(self, encode_time: float, send_time: float, frame_bytes: int) -> None:
+        """Feed the measurements of a frame that was sent and adjust the output settings."""
+        now = time.monotonic()
+        if self.last_send:
+            interval = now - self.last_send
+            if interval > 0:
+                self.send_fps_ema = self._smooth(self.send_fps_ema, 1.0 / interval)
+        self.last_send = now
+
+        self.latency_ema = self._smooth(self.latency_ema, encode_time + send_time)
+        if send_time > 0:
+            self.bytes_per_sec_ema = self._smooth(self.bytes_per_sec_ema, frame_bytes / send_time)
+
+        # Client falling behind what we send means the link is buffering somewhere
+        client_behind = (
+            self.client_fps is not None
+            and self.send_fps_ema is not None
+            and self.client_fps < 0.8 * self.send_fps_ema
+        )
+
+        if self.latency_ema > self.target_latency or client_behind:
+            self._decrease(now)
+        elif self.latency_ema < self.headroom * self.target_latency:
+            self._increase(now)
+
+    def _decrease(self, now: float) -> None:
+        if now - self.last_decrease < self.decrease_cooldown:
+            return
+        # The last step up didn't hold, wait longer before trying it again
+        if self.last_step_up > self.last_decrease and now - self.last_step_up < self.increase_interval:
+            self.increase_interval = min(self.max_increase_interval, self.increase_interval * 2)
+        self.last_decrease = now
+        self.last_increase = now
+
+        # Cheapest for the viewer first: quality, then resolution, then frame rate
+        if self.quality > self.min_quality:
+            self.quality = max(self.min_quality, self.quality - 10)
+        elif self.scale > self.min_scale:
+            self.scale = max(self.min_scale, round(self.scale * 0.75, 3))
+        elif self.target_fps > self.min_fps:
+            self.target_fps = max(self.min_fps, self.target_fps * 0.75)
+        else:
+            return
+        logger.info(f"Congestion, lowering video to {self.describe()}")
+
+    def _increase(self, now: float) -> None:
+        if now - self.last_increase < self.increase_interval:
+            return
+        # The last step up held, come back towards the normal pace
+        if self.last_step_up > self.last_decrease:
+            self.increase_interval = max(self.min_increase_interval, self.increase_interval / 2)
+        self.last_increase = now
+
+        # Undo the decreases in reverse order
+        if self.target_fps < self.max_fps:
+            self.target_fps = min(self.max_fps, self.target_fps + 2)
+        elif self.scale < 1.0:
+            self.scale = min(1.0, self.scale + 0.125)
+        elif self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + 5)
+        else:
+            return
+        self.last_step_up = now
+        logger.info(f"Link has headroom, raising video to {self.describe()}")
+
+    def describe(self) -> str:
+        return f"Q{self.quality} x{self.scale:.2f} @ {self.target_fps:.0f}fps"
@@ -0,0 +1,361 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from ..utils.config import config
+from ..utils.logger import logger
+from ..bus import AsyncEventBus
+from .frame_cache import EncodeParams, FrameCache
+
+# One fixed-size entry per frame in <stream>/index.bin, sorted by arrival
+INDEX_ENTRY = np.dtype([
+    ("capture_ns", "<i8"), # device capture timestamp
+    ("host_ns", "<i8"), # host wall clock when the frame arrived
+    ("chunk", "<u4"),
+    ("offset", "<u8"), # byte offset in the chunk file
+    ("length", "<u4"),
+])
+FORMATS = ("raw", "jpeg")
+
+
+@dataclass
+class RecordedFrame:
+    stream: str
+    capture_ns: int
+    host_ns: int
+    image: Optional[np.ndarray] = None
+    jpeg: Optional[bytes] = None # already encoded frame, written as is
+    seq: Optional[int] = None # bus sequence number, for the frame cache
+
+
+class _StreamWriter:
+    """
+    Append-only container of one stream: chunk files plus the timestamp index.
+    raw: frames copied into preallocated memory-mapped chunks of frames_per_chunk frames.
+    jpeg: encoded frames appended to chunk files of up to chunk_bytes.
+    """
+
+    def __init__(self, root: Path, fmt: str, frames_per_chunk: int, chunk_bytes: int, jpeg_quality: int,
+                 cache: Optional[FrameCache] = None):
+        self.root = root
+        self.cache = cache
+        self.format = fmt
+        self.frames_per_chunk = frames_per_chunk
+        self.chunk_bytes = chunk_bytes
+        self.jpeg_quality = jpeg_quality
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_file = open(self.root / "index.bin", "ab")
+
+        self.chunk = -1
+        self.frames = 0
+        self.shape: Optional[tuple] = None
+        self.dtype: Optional[np.dtype] = None
+        self._memmap: Optional[np.memmap] = None
+        self._slot = 0
+        self._file = None
+
+    def _chunk_path(self, chunk: int) -> Path:
+        return self.root / f"chunk_{chunk:06d}.{'raw' if self.format == 'raw' else 'jpg.bin'}"
+
+    def _write_meta(self, image: Optional[np.ndarray]) -> None:
+        meta: Dict[str, Any] = {"format": self.format}
+        if image is not None:
+            meta.update(shape=list(image.shape), dtype=image.dtype.str)
+        if self.format == "raw":
+            meta["frames_per_chunk"] = self.frames_per_chunk
+        (self.root / "stream.json").write_text(json.dumps(meta))
+
+    def write(self, frames: List[RecordedFrame]) -> None:
+        entries = np.zeros(len(frames), dtype=INDEX_ENTRY)
+        count = 0
+        for frame in frames:
+            placed = self._write_raw(frame) if self.format == "raw" else self._write_jpeg(frame)
+            if placed is None:
+                continue
+            entries[count] = (frame.capture_ns, frame.host_ns, self.chunk, placed[0], placed[1])
+            count += 1
+        # One index write per batch
+        entries[:count].tofile(self.index_file)
+        self.index_file.flush()
+        self.frames += count
+
+        seqs = [frame.seq for frame in frames if frame.seq is not None]
+        if self.cache is not None and seqs:
+            self.cache.advance("recorder", self.root.name, max(seqs))
+
+    def _write_raw(self, frame: RecordedFrame) -> Optional[tuple]:
+        image = frame.image
+        if image is None:
+            return None
+        if self.shape is None:
+            self.shape, self.dtype = image.shape, image.dtype
+            self._write_meta(image)
+        elif image.shape != self.shape or image.dtype != self.dtype:
+            logger.warning(f"Recording {self.root.name}: frame {image.shape} doesn't match {self.shape}, skipped")
+            return None
+
+        if self._memmap is None or self._slot == self.frames_per_chunk:
+            self._close_chunk()
+            self.chunk += 1
+            self._memmap = np.memmap(self._chunk_path(self.chunk), dtype=self.dtype, mode="w+",
+                                     shape=(self.frames_per_chunk, *self.shape))
+            self._slot = 0
+
+        self._memmap[self._slot] = image
+        nbytes = image.nbytes
+        offset = self._slot * nbytes
+        self._slot += 1
+        return offset, nbytes
+
+    def _encode(self, image: np.ndarray) -> Optional[bytes]:
+        if image.ndim == 3 and image.shape[2] == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        is_success, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        return buffer.tobytes() if is_success else None
+
+    def _write_jpeg(self, frame: RecordedFrame) -> Optional[tuple]:
+        data = frame.jpeg
+        if data is None:
+            if self.cache is not None and frame.seq is not None:
+                # Reuse the encoding if another consumer already made it
+                data = self.cache.get(frame.stream, frame.seq, EncodeParams(self.jpeg_quality), lambda: self._encode(frame.image))
+            else:
+                data = self._encode(frame.image)
+            if data is None:
+                logger.warning(f"Recording {self.root.name}: failed to encode frame")
+                return None
+
+        if self._file is None:
+            self._write_meta(frame.image)
+        if self._file is None or self._file.tell() + len(data) > self.chunk_bytes:
+            self._close_chunk()
+            self.chunk += 1
+            self._file = open(self._chunk_path(self.chunk), "ab")
+
+        offset = self._file.tell()
+        self._file.write(data)
+        return offset, len(data)
+
+    def _close_chunk(self) -> None:
+        if self._memmap is not None:
+            self._memmap.flush()
+            used = self._slot * self._memmap[0].nbytes
+            self._memmap = None
+            # Drop the preallocated frames the last chunk didn't use
+            os.truncate(self._chunk_path(self.chunk), used)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        self._close_chunk()
+        self.index_file.close()
+
+
+class RecordingWriter:
+    """
+    Writes frames to disk on a background thread.
+    submit() never blocks: when the writer falls behind, frames that don't fit in the queue
+    are dropped and counted, the caller (SDK callback, bus subscriber) keeps its pace.
+    Frames are written in batches, one index write per stream and batch.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        fmt: str = "jpeg",
+        queue_size: int = 64,
+        batch_size: int = 8,
+        frames_per_chunk: int = 100,
+        chunk_mb: int = 256,
+        jpeg_quality: int = 95,
+        cache: Optional[FrameCache] = None,
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown recording format '{fmt}', expected one of: {', '.join(FORMATS)}")
+        self.path = Path(path)
+        self.format = fmt
+        self.batch_size = max(1, batch_size)
+        self.frames_per_chunk = max(1, frames_per_chunk)
+        self.chunk_bytes = chunk_mb * 2**20
+        self.jpeg_quality = jpeg_quality
+        self.cache = cache
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._streams: Dict[str, _StreamWriter] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.submitted = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @classmethod
+    def from_config(cls, path: Optional[Union[str, Path]] = None, cache: Optional[FrameCache] = None) -> "RecordingWriter":
+        if path is None:
+            # Every recording gets its own folder
+            root = Path(config.get('recording', 'path', fallback='./recordings'))
+            path = root / time.strftime("%Y%m%d-%H%M%S")
+        return cls(
+            path,
+            fmt=config.get('recording', 'format', fallback='jpeg'),
+            queue_size=config.getint('recording', 'queue_size', fallback=64),
+            batch_size=config.getint('recording', 'batch_size', fallback=8),
+            frames_per_chunk=config.getint('recording', 'frames_per_chunk', fallback=100),
+            chunk_mb=config.getint('recording', 'chunk_mb', fallback=256),
+            jpeg_quality=config.getint('recording', 'jpeg_quality', fallback=95),
+            cache=cache,
+        )
+
+    def start(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Recording {self.format} frames to {self.path.resolve()}")
+        self._thread = threading.Thread(target=self._run, name="recording-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: RecordedFrame) -> bool:
+        """Queue a frame for writing, returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"Recording writer behind, {self.dropped} frames dropped so far")
+            return False
+        self.submitted += 1
+        return True
+
+    def close(self) -> None:
+        """Write what is still queued and close the files."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        logger.info(f"Recording closed: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "frames": {name: stream.frames for name, stream in self._streams.items()},
+        }
+
+    def _stream(self, name: str) -> _StreamWriter:
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = _StreamWriter(self.path / name, self.format, self.frames_per_chunk, self.chunk_bytes,
+                                   self.jpeg_quality, self.cache)
+            self._streams[name] = stream
+        return stream
+
+    def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=0.1)]
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                by_stream: Dict[str, List[RecordedFrame]] = {}
+                for frame in batch:
+                    by_stream.setdefault(frame.stream, []).append(frame)
+                for name, frames in by_stream.items():
+                    self._stream(name).write(frames)
+                self.batches += 1
+        except Exception as e:
+            logger.error(f"Recording writer failed: {e}", exc_info=True)
+        finally:
+            for stream in self._streams.values():
+                stream.close()
+
+
+class RecordingReader:
+    """Random access to one recorded stream, seek() finds frames by capture timestamp."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.root = Path(path)
+        self.meta = json.loads((self.root / "stream.json").read_text())
+        self.index = np.fromfile(self.root / "index.bin", dtype=INDEX_ENTRY)
+        self._chunks: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def seek(self, capture_ns: int) -> int:
+        """Position of the first frame captured at or after capture_ns."""
+        return int(np.searchsorted(self.index["capture_ns"], capture_ns))
+
+    def _chunk(self, chunk: int):
+        if chunk not in self._chunks:
+            suffix = "raw" if self.meta["format"] == "raw" else "jpg.bin"
+            self._chunks[chunk] = np.memmap(self.root / f"chunk_{chunk:06d}.{suffix}", dtype=np.uint8, mode="r")
+        return self._chunks[chunk]
+
+    def read(self, position: int) -> Union[np.ndarray, bytes]:
+        """The frame at this position: an array for raw recordings, JPEG bytes otherwise."""
+        entry = self.index[position]
+        data = self._chunk(int(entry["chunk"]))[int(entry["offset"]):int(entry["offset"]) + int(entry["length"])]
+        if self.meta["format"] == "raw":
+            return data.view(np.dtype(self.meta["dtype"])).reshape(self.meta["shape"])
+        return data.tobytes()
+
+
+class RecordingSink:
+    """Records bus topics. Subscribes latest-only, so the live preview never waits on the recorder."""
+
+    def __init__(self, bus: AsyncEventBus, writer: Optional[RecordingWriter] = None, cache: Optional[FrameCache] = None):
+        self.bus = bus
+        self.writer = writer or RecordingWriter.from_config(cache=cache)
+        streams = config.get('recording', 'streams', fallback='rgb_frame')
+        self.topics = [topic.strip() for topic in streams.split(",") if topic.strip()]
+
+    def shares_jpeg(self, topic: str, quality: int) -> bool:
+        """The recorder caches plain full-size JPEGs of topic at this quality, others can reuse them."""
+        return (self.writer.cache is not None and self.writer.format == "jpeg"
+                and self.writer.jpeg_quality == quality and topic in self.topics)
+
+    async def run(self) -> None:
+        cache = self.writer.cache
+        if cache is not None and self.writer.format == "jpeg":
+            # The writer encodes behind the bus cursor, hold the cached encodings until it is done
+            for topic in self.topics:
+                cache.track("recorder", topic)
+        self.writer.start()
+        try:
+            await asyncio.gather(*(self._record(topic) for topic in self.topics))
+        except asyncio.CancelledError:
+            logger.info("Recording sink shutting down.")
+        finally:
+            await asyncio.to_thread(self.writer.close)
+            if cache is not None:
+                for topic in self.topics:
+                    cache.untrack("recorder", topic)
+
+    async def _record(self, topic: str) -> None:
+        async for event in self.bus.subscribe(topic, latest_only=True, name="recorder"):
+            payload = event.payload
+            record = payload.get("record")
+            capture_ns = record.capture_timestamp_ns if record is not None else payload.get("capture_timestamp_ns", 0)
+            self.writer.submit(RecordedFrame(
+                stream=topic,
+                capture_ns=int(capture_ns),
+                host_ns=payload.get("host_time_ns", 0),
+                image=payload.get("image"),
+                jpeg=payload.get("jpeg"),
+                seq=event.seq,
+            ))
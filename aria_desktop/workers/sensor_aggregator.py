@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from ..utils.config import config
+from ..utils.logger import logger
+from ..bus import AsyncEventBus, Event
+from ..server.protocol import SensorStream
+
+# Records of each stream, same layout as the sensor frames sent to the clients (protocol.SENSOR_RECORDS)
+IMU_DTYPE = np.dtype([("timestamp_ns", "<i8"), ("accel", "<f4", 3), ("gyro", "<f4", 3)])
+SENSOR_DTYPES = {
+    SensorStream.IMU0: IMU_DTYPE,
+    SensorStream.IMU1: IMU_DTYPE,
+    SensorStream.MAGNETO: np.dtype([("timestamp_ns", "<i8"), ("mag", "<f4", 3)]),
+    SensorStream.BARO: np.dtype([("timestamp_ns", "<i8"), ("pressure", "<f4"), ("temperature", "<f4")]),
+}
+IMU_STREAMS = (SensorStream.IMU0, SensorStream.IMU1)
+
+
+@dataclass
+class SensorBlock:
+    """Payload of the "sensor_block" bus events, the samples of one stream since the previous block."""
+    stream: SensorStream
+    seq: int # block number of the stream, gaps mean dropped blocks
+    samples: np.ndarray # records of SENSOR_DTYPES[stream]
+    host_time_ns: int # when the block was cut
+    overruns: int = 0 # samples overwritten in the ring before this block could take them
+
+
+class SampleRing:
+    """
+    Preallocated ring of records (rows of shape), written by the SDK thread and drained by the loop.
+    If the reader falls behind by more than the capacity, the oldest records are overwritten.
+    """
+
+    def __init__(self, dtype: np.dtype, capacity: int, shape: tuple = ()):
+        self.buffer = np.zeros((capacity, *shape), dtype=dtype)
+        self.capacity = capacity
+        self.written = 0
+        self.read = 0
+        self.overruns = 0
+        self._lock = threading.Lock()
+
+    def write(self, records: np.ndarray) -> None:
+        count = len(records)
+        # More than the capacity in one write: only the last ones are stored, the others count as overruns
+        kept = records[-self.capacity:]
+        with self._lock:
+            start = (self.written + count - len(kept)) % self.capacity
+            first = min(len(kept), self.capacity - start)
+            self.buffer[start:start + first] = kept[:first]
+            self.buffer[:len(kept) - first] = kept[first:]
+            self._advance(count)
+
+    def append(self, record: tuple) -> None:
+        with self._lock:
+            self.buffer[self.written % self.capacity] = record
+            self._advance(1)
+
+    def _advance(self, count: int) -> None:
+        self.written += count
+        behind = self.written - self.read - self.capacity
+        if behind > 0:
+            self.overruns += behind
+            self.read += behind
+
+    def drain(self, multiple: int = 1) -> tuple[np.ndarray, int]:
+        """
+        Copy of the records written since the last drain, and how many were lost before it.
+        With multiple, only whole multiples of it are taken and the rest stays for the next drain.
+        """
+        with self._lock:
+            count = self.written - self.read
+            count -= count % multiple
+            start, stop = self.read % self.capacity, (self.read + count) % self.capacity
+            if count == 0:
+                records = self.buffer[:0].copy()
+            elif start < stop:
+                records = self.buffer[start:stop].copy()
+            else:
+                records = np.concatenate((self.buffer[start:], self.buffer[:stop]))
+            self.read += count
+            overruns, self.overruns = self.overruns, 0
+        return records, overruns
+
+
+class SensorAggregator:
+    """
+    Packs IMU, magnetometer and barometer samples into structured blocks.
+    The SDK callbacks only copy samples into a ring per stream, a loop task cuts the rings
+    every interval and publishes one "sensor_block" event per stream that got samples,
+    instead of one event per sample.
+    """
+
+    def __init__(self, bus: AsyncEventBus, loop: asyncio.AbstractEventLoop,
+                 interval: float = 0.02, ring_samples: int = 2048):
+        self.bus = bus
+        self.loop = loop
+        self.interval = interval
+        self.rings = {stream: SampleRing(dtype, ring_samples) for stream, dtype in SENSOR_DTYPES.items()}
+        self.seqs: Dict[SensorStream, int] = {stream: 0 for stream in SENSOR_DTYPES}
+        self._task: Optional[Future] = None
+
+        self.blocks = 0
+        self.samples = 0
+        self.overruns = 0
+
+    @classmethod
+    def from_config(cls, bus: AsyncEventBus, loop: asyncio.AbstractEventLoop) -> "SensorAggregator":
+        return cls(
+            bus, loop,
+            interval=config.getfloat('sensors', 'interval_ms', fallback=20) / 1000,
+            ring_samples=config.getint('sensors', 'ring_samples', fallback=2048),
+        )
+
+    def add_imu(self, samples: Sequence[Any], imu_idx: int) -> None:
+        records = np.fromiter(
+            ((sample.capture_timestamp_ns, sample.accel_msec2, sample.gyro_radsec) for sample in samples),
+            dtype=IMU_DTYPE, count=len(samples),
+        )
+        self.rings[IMU_STREAMS[imu_idx]].write(records)
+
+    def add_magneto(self, sample: Any) -> None:
+        self.rings[SensorStream.MAGNETO].append((sample.capture_timestamp_ns, sample.mag_tesla))
+
+    def add_baro(self, sample: Any) -> None:
+        self.rings[SensorStream.BARO].append((sample.capture_timestamp_ns, sample.pressure, sample.temperature))
+
+    def start(self) -> None:
+        """Starts publishing on the loop, callable from any thread."""
+        if self._task is None:
+            self._task = asyncio.run_coroutine_threadsafe(self.run(), self.loop)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self) -> None:
+        logger.info(f"Sensor aggregator started, publishing blocks every {self.interval * 1000:.0f}ms")
+        deadline = self.loop.time()
+        try:
+            while True:
+                # Absolute deadlines, a late cut doesn't shift the following ones
+                deadline += self.interval
+                await asyncio.sleep(max(0.0, deadline - self.loop.time()))
+                await self.flush()
+        except asyncio.CancelledError:
+            logger.info(f"Sensor aggregator: {self.blocks} blocks, {self.samples} samples, {self.overruns} overwritten")
+
+    async def flush(self) -> None:
+        """Publishes the samples every stream got since the last flush."""
+        host_time_ns = time.time_ns()
+        for stream, ring in self.rings.items():
+            samples, overruns = ring.drain()
+            if overruns:
+                self.overruns += overruns
+                logger.warning(f"{stream.name} ring overrun, {overruns} samples lost")
+            if not len(samples):
+                continue
+            self.seqs[stream] += 1
+            self.blocks += 1
+            self.samples += len(samples)
+            block = SensorBlock(stream=stream, seq=self.seqs[stream], samples=samples,
+                                host_time_ns=host_time_ns, overruns=overruns)
+            await self.bus.publish(Event("sensor_block", block))
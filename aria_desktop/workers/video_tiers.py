@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from typing import List
+
+from ..utils.config import config
+
+
+@dataclass(frozen=True)
+class VideoTier:
+    """One simulcast output of the video feed: a downscale factor and a JPEG quality."""
+    name: str
+    scale: float
+    quality: int
+
+
+DEFAULT_TIERS = "full:1.0:75, half:0.5:60, thumb:0.25:50"
+
+
+def parse_tiers(spec: str) -> List[VideoTier]:
+    """Parse 'name:scale:quality' entries separated by commas, largest tier first."""
+    tiers = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, scale, quality = entry.split(":")
+        tiers.append(VideoTier(name=name.strip(), scale=float(scale), quality=int(quality)))
+    if not tiers:
+        raise ValueError("At least one video tier is required")
+    return sorted(tiers, key=lambda tier: tier.scale, reverse=True)
+
+
+def load_tiers() -> List[VideoTier]:
+    return parse_tiers(config.get('websocket', 'tiers', fallback=DEFAULT_TIERS))
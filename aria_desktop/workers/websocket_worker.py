@@ -1,7 +1,12 @@
 import asyncio
+import os
+import time
 import cv2
 import numpy as np
-from typing import Any, TYPE_CHECKING
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, TYPE_CHECKING
 
 # Avoid a runtime import of WebSocketServer to prevent circular import.
 # Import only for type checking (no runtime dependency).
@@ -9,17 +14,58 @@ if TYPE_CHECKING:
     from ..server.server import WebSocketServer
 
 from ..utils.logger import logger
-from ..bus import AsyncEventBus
+from ..utils.config import config
+from ..bus import AsyncEventBus, Event
+from .quality_controller import AdaptiveQualityController
+from .video_tiers import VideoTier
+from ..server.protocol import AUDIO_FORMAT, Codec, FrameHeader, FrameKind, VideoStream
+from ..core.streams import CameraStream
+from .sensor_aggregator import SensorBlock
+from .audio import AudioChunk
+
+# Gamma 0.5 lookup table for severely overexposed frames
+GAMMA_LUT = np.array(
+    [(i / 255.0) ** 0.5 * 255 for i in range(256)],
+    dtype=np.uint8
+)
+
+
+@dataclass
+class _EncodeJob:
+    event: Event
+    future: asyncio.Future
+    frame_start: float
+
+
 class websocket_worker:
     
     def __init__(self, bus: AsyncEventBus, server: Any):
         logger.info("WebSocket worker started, waiting for connections...")
         self.bus = bus
         self.server: Any = server
-        self.sending = False
         self.last_send_time = 0.0
         self.min_send_interval = 0.05  # 80ms between sends (allows up to ~12 FPS)
 
+        # Frames that may be encoding or waiting to be sent at the same time
+        self.encode_window = max(1, config.getint('websocket', 'encode_window', fallback=2))
+        # Dedicated encoder pool, OpenCV releases the GIL while converting and encoding
+        # so threads scale over the cores without pickling frames to other processes.
+        # A frame is a single job that encodes its tiers one after the other, so at most
+        # encode_window threads are busy and more of them would only sit idle
+        self.encoder_threads = config.getint(
+            'websocket', 'encoder_threads', fallback=min(self.encode_window, os.cpu_count() or 1)
+        )
+        self.encoder = ThreadPoolExecutor(max_workers=self.encoder_threads, thread_name_prefix="jpeg-encoder")
+        self.superseded = 0 # encoded frames dropped because a newer one was ready
+
+        # Adjusts quality, resolution and frame rate from the send measurements
+        self.controller = AdaptiveQualityController.from_config()
+        self.last_submit_time = 0.0
+
+        # Cameras besides RGB are sent at a fixed quality and scale
+        self.camera_quality = config.getint('websocket', 'camera_quality', fallback=60)
+        self.camera_scale = config.getfloat('websocket', 'camera_scale', fallback=1.0)
+
     # def _process_image(self, image: Any) -> tuple[bool, Any]:
     #     image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
     #     # height, width = image_bgr.shape[:2]
@@ -31,7 +77,8 @@ class websocket_worker:
     #     is_success, buffer = cv2.imencode(".jpg", image_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 75])
     #     return is_success, buffer
 
-    def _process_image(self, image: Any) -> tuple[bool, Any]:
+    def _prepare_image(self, image: Any) -> Any:
+        """Colour conversion and exposure correction, shared by all the tiers of a frame."""
         image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
 
         # ── Exposure correction ───────────────────────────────────────────────
@@ -50,98 +97,260 @@ class websocket_worker:
 
             # Extra gamma pass for severely overexposed frames
             if mean_brightness > 200:
-                lut = np.array(
-                    [(i / 255.0) ** 0.5 * 255 for i in range(256)],
-                    dtype=np.uint8
-                )
-                image_bgr = cv2.LUT(image_bgr, lut)
+                image_bgr = cv2.LUT(image_bgr, GAMMA_LUT)
+
+        return image_bgr
+
+    def _process_image(self, image: Any, tiers: Iterable[VideoTier],
+                       quality: int = 75, scale: float = 1.0) -> Dict[str, bytes]:
+        """
+        Encode one frame for each requested tier.
+        quality caps and scale multiplies the tier settings (adaptive controller output).
+        Smaller tiers are resized from the previous, larger one.
+        """
+        source = self._prepare_image(image)
+        source_scale = 1.0
+        buffers = {}
+
+        for tier in sorted(tiers, key=lambda tier: tier.scale, reverse=True):
+            tier_scale = tier.scale * scale
+            tier_quality = min(tier.quality, quality)
+
+            if tier_scale < source_scale:
+                factor = tier_scale / source_scale
+                source = cv2.resize(source, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+                source_scale = tier_scale
+            is_success, buffer = cv2.imencode(".jpg", source, [int(cv2.IMWRITE_JPEG_QUALITY), tier_quality])
+            if not is_success:
+                logger.warning(f"Failed to encode image for tier {tier.name}")
+                continue
+            buffers[tier.name] = buffer.tobytes()
+        return buffers
+
+    def _timed_process_image(self, image: Any, tiers: Iterable[VideoTier],
+                             quality: int, scale: float) -> tuple[Dict[str, bytes], float]:
+        """Run _process_image on an encoder thread and measure how long it took."""
+        encode_start = time.perf_counter()
+        buffers = self._process_image(image, tiers, quality, scale)
+        return buffers, time.perf_counter() - encode_start
 
-        is_success, buffer = cv2.imencode(".jpg", image_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 75])
-        return is_success, buffer
 
+    def _encode_camera(self, image: Any) -> tuple[Optional[bytes], float]:
+        """JPEG of a non-RGB camera frame, grayscale stays single channel. Runs on the camera's encoder thread."""
+        encode_start = time.perf_counter()
+        if self.camera_scale < 1:
+            image = cv2.resize(image, None, fx=self.camera_scale, fy=self.camera_scale, interpolation=cv2.INTER_AREA)
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        is_success, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), self.camera_quality])
+        return (buffer.tobytes() if is_success else None), time.perf_counter() - encode_start
+
+    def _frame_header(self, event: Event, encode_time: float, stream_id: VideoStream = VideoStream.RGB) -> bytes:
+        """Binary header sent in front of every encoded frame."""
+        payload = event.payload
+        record = payload.get("record")
+        capture_ns = record.capture_timestamp_ns if record is not None else payload.get("capture_timestamp_ns", 0)
+        return FrameHeader(
+            kind=FrameKind.VIDEO,
+            codec=Codec.JPEG,
+            seq=event.seq,
+            capture_timestamp_ns=int(capture_ns),
+            host_receive_ns=payload.get("host_time_ns", 0),
+            encode_us=int(encode_time * 1e6),
+            stream_id=stream_id,
+        ).pack()
 
     async def forward_rgb(self):
-        """Forwards RGB frames to connected WebSocket clients."""
-        loop = asyncio.get_event_loop()
-        frame_count = 0
+        """
+        Forwards RGB frames to connected WebSocket clients.
+        Frames are encoded on the encoder pool while the previous ones are being sent,
+        at most encode_window frames are in flight and they are sent in order.
+        """
+        loop = asyncio.get_running_loop()
+        window = asyncio.Semaphore(self.encode_window)
+        in_flight: deque[_EncodeJob] = deque()
+        job_ready = asyncio.Event()
+
+        sender_task = asyncio.create_task(self._send_encoded(in_flight, job_ready, window))
+        frames = self.bus.subscribe("rgb_frame", latest_only=True, name="websocket")
 
         try:
-            async for event in self.bus.subscribe("rgb_frame", latest_only=True):
-                # Skip if no client
-                if not self.server.connected_client:
+            while True:
+                # Wait for a free slot first, then take whatever frame is the latest by then
+                await window.acquire()
+
+                # Pace frames at the frame rate the controller currently allows
+                wait = self.last_submit_time + self.controller.min_interval - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                event = await frames.__anext__()
+
+                # Only encode the tiers somebody is watching, skip if no client
+                tiers = self.server.active_tiers()
+                if not tiers:
                     logger.debug("No client connected, skipping")
+                    window.release()
+                    continue
+
+                self.last_submit_time = loop.time()
+                self.controller.report_client_fps(self.server.client_receive_fps)
+                future = loop.run_in_executor(
+                    self.encoder, self._timed_process_image,
+                    event.payload["image"], tiers, self.controller.quality, self.controller.scale
+                )
+                in_flight.append(_EncodeJob(event=event, future=future, frame_start=loop.time()))
+                job_ready.set()
+
+        except asyncio.CancelledError:
+            logger.info("WebSocket RGB forwarder shutting down.")
+        finally:
+            sender_task.cancel()
+            try:
+                await sender_task
+            except asyncio.CancelledError:
+                pass
+            await frames.aclose()
+            self.encoder.shutdown(wait=False, cancel_futures=True)
+
+    async def forward_camera(self, camera: CameraStream):
+        """
+        Forwards the frames of a camera other than RGB, from its own topic.
+        Every camera has its own latest-only cursor, encoder thread and client queue,
+        so SLAM and eye tracking frames never hold up the RGB feed.
+        """
+        loop = asyncio.get_running_loop()
+        encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{camera.name}-encoder")
+        frames = self.bus.subscribe(camera.topic, latest_only=True, name="websocket")
+        sent = 0
+        try:
+            async for event in frames:
+                if not self.server.clients:
                     continue
-                
-                # Skip if still sending previous frame
-                if self.sending:
-                    logger.debug("Still sending previous frame, skipping")
+                data, encode_time = await loop.run_in_executor(encoder, self._encode_camera, event.payload["image"])
+                if data is None:
+                    logger.warning(f"Failed to encode {camera.name} frame")
                     continue
-                
-                # Rate limiting
-                current_time = loop.time()
-                time_since_last = current_time - self.last_send_time
-                # if self.last_send_time > 0 and time_since_last < self.min_send_interval or frame_count == 0:
-                #     logger.debug(f"Rate limiting: {time_since_last*1000:.0f}ms since last")
-                #     continue
-                
-                self.sending = True
-                frame_start = loop.time()
-                
-                try:
-                    image_np = event.payload["image"]
-                    
-                    # Encode
-                    encode_start = loop.time()
-                    is_success, buffer = await loop.run_in_executor(
-                        None, self._process_image, image_np
-                    )
-                    encode_time = loop.time() - encode_start
-                    
-                    if not is_success:
-                        logger.warning("Failed to encode image")
-                        continue
-                    
-                    image_bytes = buffer.tobytes()
-                    image_size_kb = len(image_bytes) / 1024
-                    frame_count += 1
-                    
-                    # Send with generous timeout
-                    send_start = loop.time()
-                    try:
-                        await asyncio.wait_for(
-                            self.server.send(image_bytes),
-                            timeout=2.0  # Increased to 2 seconds for stability
-                        )
-                        finish_time = loop.time()
-                        
-                        # Calculate interval from last frame
-                        interval_since_last_frame = (finish_time - self.last_send_time) if self.last_send_time > 0 else 0
-                        
-                        # Update timestamp
-                        self.last_send_time = finish_time
-                        
-                        send_time = finish_time - send_start
-                        total_proc_time = finish_time - frame_start
-                        
-                        logger.info(
-                            f"Frame #{frame_count}: {image_size_kb:.1f}KB | "
-                            f"Encode: {encode_time*1000:.0f}ms | "
-                            f"Send: {send_time*1000:.0f}ms | "
-                            f"Total: {total_proc_time*1000:.0f}ms | "
-                            f"Interval: {interval_since_last_frame*1000:.0f}ms"
-                        )
-                        
-                        if send_time > 100:
-                            logger.warning(f"Slow send: {send_time*1000:.0f}ms")
-                            
-                    except asyncio.TimeoutError:
-                        logger.warning(f"Frame #{frame_count} send timeout (>2s) - dropping")
-                        # Don't update last_send_time on failure
-                        
-                except Exception as e:
-                    logger.error(f"Error processing frame: {e}", exc_info=True)
-                finally:
-                    self.sending = False  
-                    
+                self.server.send_camera(self._frame_header(event, encode_time, camera.stream_id) + data)
+                sent += 1
         except asyncio.CancelledError:
-            logger.info("WebSocket RGB forwarder shutting down.")
\ No newline at end of file
+            logger.info(f"WebSocket {camera.name} forwarder shutting down after {sent} frames.")
+        finally:
+            await frames.aclose()
+            encoder.shutdown(wait=False, cancel_futures=True)
+
+    async def forward_sensors(self):
+        """Forwards the sensor blocks of the aggregator to the clients as binary frames."""
+        blocks = self.bus.subscribe("sensor_block")
+        sent = 0
+        try:
+            async for event in blocks:
+                block: SensorBlock = event.payload
+                if not self.server.clients:
+                    continue
+                header = FrameHeader(
+                    kind=FrameKind.SENSOR,
+                    codec=Codec.RECORDS,
+                    seq=block.seq,
+                    capture_timestamp_ns=int(block.samples["timestamp_ns"][0]),
+                    host_receive_ns=block.host_time_ns,
+                    stream_id=block.stream,
+                ).pack()
+                self.server.send_sensor(header + block.samples.tobytes())
+                sent += 1
+        except asyncio.CancelledError:
+            logger.info(f"WebSocket sensor forwarder shutting down after {sent} blocks.")
+        finally:
+            await blocks.aclose()
+
+    async def forward_audio(self):
+        """Forwards the voiced audio chunks to the clients, silence costs no bandwidth."""
+        chunks = self.bus.subscribe("audio_chunk")
+        sent = gated = 0
+        try:
+            async for event in chunks:
+                chunk: AudioChunk = event.payload
+                if not self.server.clients:
+                    continue
+                if not chunk.voiced:
+                    gated += 1
+                    continue
+                header = FrameHeader(
+                    kind=FrameKind.AUDIO,
+                    codec=Codec.PCM16,
+                    seq=chunk.seq,
+                    capture_timestamp_ns=chunk.timestamp_ns,
+                    host_receive_ns=chunk.host_time_ns,
+                ).pack()
+                audio_format = AUDIO_FORMAT.pack(chunk.sample_rate, chunk.samples.shape[1])
+                self.server.send_sensor(header + audio_format + chunk.samples.tobytes())
+                sent += 1
+        except asyncio.CancelledError:
+            logger.info(f"WebSocket audio forwarder shutting down after {sent} chunks, {gated} silent ones gated.")
+        finally:
+            await chunks.aclose()
+
+    async def _send_encoded(self, in_flight: deque, job_ready: asyncio.Event, window: asyncio.Semaphore):
+        """Sends encoded frames in submission order, overlapping with the encoding of the next ones."""
+        loop = asyncio.get_running_loop()
+        frame_count = 0
+
+        while True:
+            while not in_flight:
+                job_ready.clear()
+                await job_ready.wait()
+
+            job = in_flight.popleft()
+            try:
+                buffers, encode_time = await job.future
+
+                # Latest frame wins: a newer frame is already encoded, don't spend the link on this one
+                if in_flight and in_flight[0].future.done():
+                    self.superseded += 1
+                    logger.debug("Newer frame already encoded, dropping older one")
+                    continue
+
+                if not buffers:
+                    logger.warning("Failed to encode image")
+                    continue
+
+                header = self._frame_header(job.event, encode_time)
+                frames_by_tier = {name: header + data for name, data in buffers.items()}
+                frame_count += 1
+
+                # Queue the frame for every client, each one has its own sender and drops frames it can't keep up with
+                clients = self.server.send(frames_by_tier)
+                finish_time = loop.time()
+
+                # Calculate interval from last frame
+                interval_since_last_frame = (finish_time - self.last_send_time) if self.last_send_time > 0 else 0
+
+                # Update timestamp
+                self.last_send_time = finish_time
+
+                # Queue wait + socket send time as seen by the clients
+                send_time = self.server.send_latency() or 0.0
+                total_proc_time = finish_time - job.frame_start
+                # Bytes of the tier the clients watch, in line with their median send time
+                self.controller.update(encode_time, send_time, self.server.client_frame_bytes(frames_by_tier))
+
+                sizes = ", ".join(f"{name} {len(data)/1024:.1f}KB" for name, data in frames_by_tier.items())
+                logger.info(
+                    f"Frame #{frame_count}: {sizes} | "
+                    f"{self.controller.describe()} | "
+                    f"Clients: {clients} | "
+                    f"Encode: {encode_time*1000:.0f}ms | "
+                    f"Send: {send_time*1000:.0f}ms | "
+                    f"Total: {total_proc_time*1000:.0f}ms | "
+                    f"Interval: {interval_since_last_frame*1000:.0f}ms"
+                )
+
+                if send_time > 0.1:
+                    logger.warning(f"Slow send: {send_time*1000:.0f}ms")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing frame: {e}", exc_info=True)
+            finally:
+                window.release()
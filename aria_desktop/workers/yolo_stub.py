@@ -0,0 +1,96 @@
+"""
+Stand-in for the YOLO model server, to run the inference client without a model:
+    python -m aria_desktop.workers.yolo_stub --port 8008 --latency-ms 30
+POST /infer/ takes one "file", POST /infer_batch/ any number of "files",
+both answer with made up detections after the configured model latency.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLASSES = ["person", "door", "exit sign", "chair", "stairs"]
+
+
+class _Model:
+    """Serializes 'inference' like a single GPU would, batches cost less per image."""
+
+    def __init__(self, latency: float, batch_cost: float):
+        self.latency = latency
+        self.batch_cost = batch_cost
+        self.lock = threading.Lock()
+
+    def infer(self, images: list) -> list:
+        with self.lock:
+            time.sleep(self.latency * (1 + self.batch_cost * (len(images) - 1)))
+        return [
+            {"detections": [
+                {
+                    "class_name": random.choice(CLASSES),
+                    "confidence": round(random.uniform(0.3, 0.95), 2),
+                    "bbox": [x := random.uniform(0, 500), y := random.uniform(0, 500), x + 100, y + 120],
+                }
+                for _ in range(random.randint(0, 3))
+            ]}
+            for _ in images
+        ]
+
+
+def _images(handler: BaseHTTPRequestHandler) -> list:
+    """File parts of a multipart/form-data request body."""
+    body = handler.rfile.read(int(handler.headers.get("Content-Length", 0)))
+    head = f"Content-Type: {handler.headers.get('Content-Type')}\r\n\r\n".encode()
+    message = BytesParser(policy=HTTP).parsebytes(head + body)
+    return [part.get_payload(decode=True) for part in message.iter_parts() if part.get_filename()]
+
+
+def make_handler(model: _Model):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # keep-alive
+
+        def do_POST(self):
+            # Read the body first, an unread one would break the next request on the connection
+            images = _images(self)
+            if self.path.rstrip("/") == "/infer":
+                results = model.infer(images[:1])
+                body = results[0] if results else {"detections": []}
+            elif self.path.rstrip("/") == "/infer_batch":
+                body = {"results": model.infer(images)}
+            else:
+                self.send_error(404)
+                return
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO server stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="model time per request")
+    parser.add_argument("--batch-cost", type=float, default=0.3, help="extra time per additional image of a batch, fraction of latency")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(_Model(args.latency_ms / 1000, args.batch_cost)))
+    print(f"YOLO stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from aria_desktop.bus import AsyncEventBus
+from aria_desktop.workers.audio import AudioPipeline, Decimator, SILENCE_DB, level_db
+
+
+def _tone(frequency, rate, count):
+    return np.sin(2 * np.pi * frequency * np.arange(count) / rate).astype(np.float32)[:, None] * 10000
+
+
+def test_decimator_keeps_every_factor_th_frame_rate():
+    decimator = Decimator(3, channels=2)
+    out = decimator.process(np.ones((960, 2), dtype=np.float32))
+    assert out.shape == (320, 2)
+    # Past the filter warmup a constant goes through unchanged
+    np.testing.assert_allclose(out[-100:], 1.0, rtol=1e-3)
+
+
+def test_decimator_chunks_join_without_a_seam():
+    signal = _tone(440, 48000, 4800)
+    whole = Decimator(3, channels=1).process(signal)
+    chunked = Decimator(3, channels=1)
+    parts = np.concatenate([chunked.process(signal[i:i + 960]) for i in range(0, len(signal), 960)])
+    np.testing.assert_allclose(parts, whole, atol=1e-2)
+
+
+def test_decimator_filters_out_what_would_alias():
+    decimator = Decimator(3, channels=1)
+    passed = decimator.process(_tone(1000, 48000, 9600))[-1000:]
+    decimator = Decimator(3, channels=1)
+    stopped = decimator.process(_tone(12000, 48000, 9600))[-1000:] # above the 8kHz output Nyquist
+    assert level_db(passed) > level_db(stopped) + 40
+
+
+def test_factor_one_is_a_passthrough():
+    frames = np.arange(6, dtype=np.float32).reshape(3, 2)
+    assert Decimator(1, channels=2).process(frames) is frames
+
+
+def test_level_of_silence():
+    assert level_db(np.zeros((10, 1), dtype=np.float32)) == SILENCE_DB
+
+
+def _pipeline(**kwargs):
+    return AudioPipeline(AsyncEventBus(), loop=None, input_channels=2, **kwargs)
+
+
+def test_gate_stays_open_for_the_hangover():
+    pipeline = _pipeline(chunk_ms=20, vad_threshold_db=-45, vad_hangover_ms=60)
+    assert pipeline.hangover_chunks == 3
+    levels = [-60, -20, -60, -60, -60, -60, -20, -60]
+    assert [pipeline._gate(level) for level in levels] == [False, True, True, True, True, False, True, True]
+
+
+def test_flush_cuts_whole_chunks_with_their_timestamps():
+    async def main():
+        pipeline = _pipeline(chunk_ms=20, input_bits=16, sample_rate=16000)
+        chunks = pipeline.bus.subscribe("audio_chunk")
+        # 50ms of input, two whole 20ms chunks and 10ms that waits for the next flush
+        frames = np.full((2400, 2), 1000, dtype=np.int32)
+        pipeline.add(SimpleNamespace(data=frames.ravel(), record=SimpleNamespace(capture_timestamps_ns=[1_000_000_000])))
+        await pipeline.flush()
+        received = [(await chunks.__anext__()).payload for _ in range(2)]
+        await chunks.aclose()
+        return pipeline, received
+
+    pipeline, received = asyncio.run(main())
+    assert [chunk.seq for chunk in received] == [1, 2]
+    assert [chunk.timestamp_ns for chunk in received] == [1_000_000_000, 1_020_000_000]
+    assert received[0].samples.shape == (320, 1)
+    assert pipeline.ring.written - pipeline.ring.read == 480
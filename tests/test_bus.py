@@ -0,0 +1,215 @@
+import asyncio
+import configparser
+
+from aria_desktop.bus import AsyncEventBus, Event, OverflowPolicy, TopicOptions, load_topic_options
+
+
+def _coalescing_bus():
+    return AsyncEventBus(topic_options={"frame": TopicOptions(policy=OverflowPolicy.COALESCE)})
+
+
+async def _take(subscription, count):
+    return [await subscription.__anext__() for _ in range(count)]
+
+
+def test_latest_only_subscribers_have_their_own_cursor():
+    async def main():
+        bus = _coalescing_bus()
+        fast = bus.subscribe("frame", latest_only=True, name="fast")
+        slow = bus.subscribe("frame", latest_only=True, name="slow")
+
+        await bus.publish(Event("frame", 1))
+        first = await _take(fast, 1) + await _take(slow, 1)
+        for payload in (2, 3, 4):
+            await bus.publish(Event("frame", payload))
+            first += await _take(fast, 1)
+        # The slow subscriber only sees the latest event, the fast one was not held back by it
+        latest = await _take(slow, 1)
+
+        cursors = {cursor.name: cursor for cursor in bus.cursors("frame")}
+        await fast.aclose()
+        await slow.aclose()
+        return [event.payload for event in first], latest[0].payload, cursors
+
+    payloads, latest, cursors = asyncio.run(main())
+    assert payloads == [1, 1, 2, 3, 4]
+    assert latest == 4
+    assert cursors["fast"].skipped == 0
+    assert cursors["slow"].skipped == 2
+    assert cursors["slow"].delivered == 2
+
+
+def test_late_subscriber_gets_the_current_event():
+    async def main():
+        bus = _coalescing_bus()
+        await bus.publish(Event("frame", "a"))
+        await bus.publish(Event("frame", "b"))
+        late = bus.subscribe("frame", latest_only=True)
+        event = await late.__anext__()
+        await late.aclose()
+        return event, bus.cursors("frame")
+
+    event, cursors = asyncio.run(main())
+    assert (event.payload, event.seq) == ("b", 2)
+    assert cursors == [] # closing the subscription removes its cursor
+
+
+def _queued(bus, event_type):
+    queue = bus.topic(event_type).queue
+    return [queue.get_nowait().payload for _ in range(queue.qsize())]
+
+
+def test_drop_oldest_keeps_the_newest_events():
+    async def main():
+        bus = AsyncEventBus(topic_options={"s": TopicOptions(maxsize=2, policy=OverflowPolicy.DROP_OLDEST)})
+        for payload in range(5):
+            await bus.publish(Event("s", payload))
+        return bus.stats()["s"], _queued(bus, "s")
+
+    stats, queued = asyncio.run(main())
+    assert queued == [3, 4]
+    assert (stats["published"], stats["dropped"], stats["high_water"]) == (5, 3, 2)
+
+
+def test_drop_newest_keeps_the_oldest_events():
+    async def main():
+        bus = AsyncEventBus(topic_options={"s": TopicOptions(maxsize=2, policy=OverflowPolicy.DROP_NEWEST)})
+        for payload in range(5):
+            await bus.publish(Event("s", payload))
+        return bus.stats()["s"], _queued(bus, "s")
+
+    stats, queued = asyncio.run(main())
+    assert queued == [0, 1]
+    assert stats["dropped"] == 3
+
+
+def test_block_waits_for_room():
+    async def main():
+        bus = AsyncEventBus(topic_options={"s": TopicOptions(maxsize=1, policy=OverflowPolicy.BLOCK)})
+        await bus.publish(Event("s", 0))
+        blocked = asyncio.create_task(bus.publish(Event("s", 1)))
+        await asyncio.sleep(0.01)
+        waited = not blocked.done()
+        subscription = bus.subscribe("s")
+        received = [(await subscription.__anext__()).payload]
+        await blocked
+        received.append((await subscription.__anext__()).payload)
+        await subscription.aclose()
+        return waited, received, bus.stats()["s"]
+
+    waited, received, stats = asyncio.run(main())
+    assert waited
+    assert received == [0, 1]
+    assert stats["dropped"] == 0
+
+
+def test_topic_options_from_config():
+    parser = configparser.ConfigParser()
+    parser.read_string("[bus]\ndefault_maxsize=8\ndefault_policy=drop_newest\n[bus.s]\npolicy=drop_oldest\n")
+    default, per_topic = load_topic_options(parser)
+    assert default == TopicOptions(maxsize=8, policy=OverflowPolicy.DROP_NEWEST)
+    assert per_topic["s"].policy == OverflowPolicy.DROP_OLDEST
+    assert per_topic["s"].maxsize == 8 # not set in the section, taken from [bus]
+    assert per_topic["rgb_frame"].policy == OverflowPolicy.COALESCE
+
+
+def test_publish_threadsafe_coalesces_a_burst():
+    async def main():
+        bus = _coalescing_bus()
+        loop = asyncio.get_running_loop()
+        subscription = bus.subscribe("frame", latest_only=True)
+        # The whole burst is handed over before the loop gets to run the wakeup
+        for payload in range(10):
+            bus.publish_threadsafe(Event("frame", payload), loop)
+        event = await subscription.__anext__()
+        await subscription.aclose()
+        return event, bus
+
+    event, bus = asyncio.run(main())
+    assert event.payload == 9
+    assert bus.wakeups == 1
+    assert bus.stats()["frame"]["coalesced"] == 9
+
+
+def test_threadsafe_events_of_a_full_blocking_topic_stay_in_order():
+    async def main():
+        bus = AsyncEventBus(topic_options={"s": TopicOptions(maxsize=2, policy=OverflowPolicy.BLOCK)})
+        loop = asyncio.get_running_loop()
+        for payload in range(3):
+            bus.publish_threadsafe(Event("s", payload), loop)
+        # 0 and 1 are queued, 2 finds the topic full and has to wait for room
+        for _ in range(2):
+            await asyncio.sleep(0)
+        # 3 is drained right after the subscriber makes room, it must not overtake 2
+        bus.publish_threadsafe(Event("s", 3), loop)
+        subscription = bus.subscribe("s")
+        received = [(await subscription.__anext__()).payload for _ in range(4)]
+        await subscription.aclose()
+        return received, bus.stats()["s"]
+
+    received, stats = asyncio.run(main())
+    assert received == [0, 1, 2, 3]
+    assert (stats["published"], stats["dropped"]) == (4, 0)
+
+
+def test_coalescing_drops_outlive_their_cursor():
+    async def main():
+        bus = _coalescing_bus()
+        subscription = bus.subscribe("frame", latest_only=True)
+        await bus.publish(Event("frame", 0))
+        await subscription.__anext__()
+        for payload in range(1, 5):
+            await bus.publish(Event("frame", payload))
+        await subscription.__anext__()
+        await subscription.aclose()
+        return bus.stats()["frame"]
+
+    stats = asyncio.run(main())
+    assert stats["cursors"] == {}
+    assert stats["dropped"] == 3
+
+
+def test_latest_only_keeps_the_configured_policy():
+    async def main():
+        bus = AsyncEventBus(topic_options={"s": TopicOptions(maxsize=4, policy=OverflowPolicy.DROP_OLDEST)})
+        errors = []
+        for _ in range(2): # topic created by the subscription, then already existing
+            try:
+                await asyncio.wait_for(bus.subscribe("s", latest_only=True).__anext__(), 0.1)
+            except (ValueError, asyncio.TimeoutError) as error:
+                errors.append(error)
+        return errors, bus.stats()["s"]
+
+    errors, stats = asyncio.run(main())
+    assert [type(error) for error in errors] == [ValueError, ValueError]
+    assert (stats["policy"], stats["maxsize"]) == ("drop_oldest", 4)
+
+
+def test_threadsafe_backlog_of_a_full_blocking_topic_is_bounded():
+    async def main():
+        bus = AsyncEventBus(topic_options={"s": TopicOptions(maxsize=2, policy=OverflowPolicy.BLOCK)})
+        loop = asyncio.get_running_loop()
+        for payload in range(10):
+            bus.publish_threadsafe(Event("s", payload), loop)
+            await asyncio.sleep(0)
+        subscription = bus.subscribe("s")
+        received = [(await subscription.__anext__()).payload for _ in range(4)]
+        await subscription.aclose()
+        return received, bus.stats()["s"]
+
+    received, stats = asyncio.run(main())
+    # Two events queued, two pending, the rest dropped as they came in
+    assert received == [0, 1, 2, 3]
+    assert (stats["published"], stats["dropped"]) == (10, 6)
+
+
+def test_blocking_publish_is_rate_limited():
+    async def main():
+        bus = AsyncEventBus(topic_options={"s": TopicOptions(maxsize=1, policy=OverflowPolicy.BLOCK, max_rate=1)})
+        await bus.publish(Event("s", 0))
+        # The queue is full, an event that comes too early is dropped instead of waiting
+        await asyncio.wait_for(bus.publish(Event("s", 1)), 0.1)
+        return bus.stats()["s"]
+
+    stats = asyncio.run(main())
+    assert (stats["published"], stats["rate_limited"]) == (1, 1)
@@ -0,0 +1,107 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from aria_desktop.bus import AsyncEventBus, Event
+from aria_desktop.workers.local_yolo import DnnDetector, DnnInferencePool, DnnSettings
+
+
+class _Pool:
+    """Runs every frame at once, no worker processes."""
+
+    def __init__(self):
+        self.slot_bytes = 0
+        self.respawns = 0
+        self.shapes = []
+
+    def start(self, slot_bytes, loop, timeout=60.0):
+        self.slot_bytes = slot_bytes
+        self._loop = loop
+
+    async def acquire(self):
+        return 0
+
+    def release(self, slot):
+        pass
+
+    def submit(self, slot, image):
+        if image.nbytes > self.slot_bytes:
+            raise ValueError("does not fit")
+        self.shapes.append(image.shape)
+        future = self._loop.create_future()
+        future.set_result([])
+        return future
+
+    def alive(self):
+        return True
+
+    def close(self):
+        pass
+
+
+async def _frames(*shapes):
+    for seq, shape in enumerate(shapes, 1):
+        yield Event("rgb_frame", {"image": np.zeros(shape, dtype=np.uint8)}, seq=seq)
+    await asyncio.Event().wait() # like a bus subscription, never ends
+
+
+def _run(detector):
+    async def main():
+        task = asyncio.create_task(detector.run())
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await task
+
+    asyncio.run(main())
+
+
+def test_slots_fit_frames_larger_than_the_first():
+    detector = DnnDetector(AsyncEventBus(), _frames((480, 640, 3), (1408, 1408, 3), (480, 640, 3)))
+    detector.pool = _Pool()
+    _run(detector)
+
+    # Every frame is detected, the first one too
+    assert detector.pool.shapes == [(480, 640, 3), (1408, 1408, 3), (480, 640, 3)]
+    assert detector.pool.slot_bytes == 2880 * 2880 * 3
+    assert (detector.frames, detector.skipped) == (3, 0)
+
+
+def test_frames_too_large_for_the_slots_are_skipped():
+    detector = DnnDetector(AsyncEventBus(), _frames((64, 64, 3), (64, 64, 3), (128, 128, 3), (64, 64, 3)))
+    detector.max_frame_side = 64
+    detector.pool = _Pool()
+    _run(detector)
+
+    assert detector.pool.shapes == [(64, 64, 3), (64, 64, 3), (64, 64, 3)]
+    assert (detector.frames, detector.skipped) == (3, 1)
+
+
+def _crashing_worker(settings, slot, slot_name, conn):
+    """Stands in for _dnn_worker: no model, dies on frames 13 rows high."""
+    conn.send((None, None))
+    while (task := conn.recv()) is not None:
+        shape, _ = task
+        if shape[0] == 13:
+            os._exit(1)
+        conn.send(([], None))
+
+
+def test_a_dead_worker_fails_its_frame_and_gets_its_slot_back():
+    async def main():
+        pool = DnnInferencePool(DnnSettings(model_path=""), processes=1)
+        pool._target = _crashing_worker
+        await asyncio.to_thread(pool.start, 1024, asyncio.get_running_loop())
+        try:
+            slot = await pool.acquire()
+            with pytest.raises(RuntimeError, match="died"):
+                await asyncio.wait_for(pool.submit(slot, np.zeros((13, 4), np.uint8)), 10)
+            slot = await asyncio.wait_for(pool.acquire(), 1)
+            found = await asyncio.wait_for(pool.submit(slot, np.zeros((4, 4), np.uint8)), 30)
+        finally:
+            await asyncio.to_thread(pool.close)
+        return found, pool.respawns
+
+    assert asyncio.run(main()) == ([], 1)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("aria.sdk")
+pytest.importorskip("fastplotlib")
+
+from aria_desktop.utils.visualizer import EnvelopeDecimator
+
+
+class _Plot:
+    window_duration = 1.0 # 10 buckets of 100ms
+
+    def __init__(self):
+        self.blocks = []
+
+    def add_block(self, timestamps_ns, samples):
+        self.blocks.append((timestamps_ns, samples))
+
+
+def _vertices(plot):
+    timestamps = np.concatenate([block[0] for block in plot.blocks])
+    values = np.concatenate([block[1] for block in plot.blocks])
+    return timestamps.tolist(), values[:, 0].tolist()
+
+
+def test_each_closed_bucket_becomes_its_min_and_max():
+    plot = _Plot()
+    envelope = EnvelopeDecimator(plot, buckets=10)
+    timestamps = np.array([0, 20, 40, 100, 150, 210]) * 1_000_000
+    samples = np.array([[1.0], [-3.0], [2.0], [5.0], [4.0], [0.0]])
+    envelope.add_batch(timestamps, samples)
+
+    # The third bucket stays open, a later sample may still land in it
+    assert _vertices(plot) == ([0, 50e6, 100e6, 150e6], [-3.0, 2.0, 4.0, 5.0])
+
+
+def test_a_bucket_spanning_batches_keeps_its_extremes():
+    plot = _Plot()
+    envelope = EnvelopeDecimator(plot, buckets=10)
+    envelope.add_batch(np.array([0, 10_000_000]), np.array([[1.0, 0.0], [2.0, 0.0]]))
+    envelope.add_batch(np.array([30_000_000, 120_000_000]), np.array([[-1.0, 7.0], [0.0, 0.0]]))
+
+    timestamps, _ = _vertices(plot)
+    values = np.concatenate([block[1] for block in plot.blocks])
+    assert timestamps == [0, 50e6]
+    assert values.tolist() == [[-1.0, 0.0], [2.0, 7.0]]
+
+
+def test_empty_batches_are_ignored():
+    plot = _Plot()
+    envelope = EnvelopeDecimator(plot, buckets=10)
+    envelope.add_batch(np.array([], dtype=np.int64), np.empty((0, 1)))
+    assert plot.blocks == [] and envelope.open_bucket is None
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from aria_desktop.bus import AsyncEventBus, Event, OverflowPolicy, TopicOptions
+from aria_desktop.workers.frame_cache import EncodeParams, FrameCache
+from aria_desktop.workers.recorder import RecordedFrame, RecordingReader, RecordingWriter
+
+
+def _encoder(data, calls):
+    def encode():
+        calls.append(data)
+        return data
+    return encode
+
+
+def test_second_consumer_reuses_the_recorder_encoding(tmp_path):
+    cache = FrameCache(AsyncEventBus())
+    writer = RecordingWriter(tmp_path, fmt="jpeg", jpeg_quality=95, cache=cache)
+    writer.start()
+    writer.submit(RecordedFrame("rgb_frame", capture_ns=1, host_ns=1, image=np.zeros((8, 8, 3), np.uint8), seq=1))
+    writer.close()
+
+    # The detector asks for the same plain JPEG of the same frame
+    calls = []
+    data = cache.get("rgb_frame", 1, EncodeParams(95), _encoder(b"detector", calls))
+
+    assert calls == []
+    assert data == RecordingReader(tmp_path / "rgb_frame").read(0)
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_concurrent_lookups_encode_once():
+    cache = FrameCache(AsyncEventBus())
+    started, release = threading.Event(), threading.Event()
+
+    def slow_encode():
+        started.set()
+        release.wait(1)
+        return b"jpeg"
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get("rgb_frame", 1, EncodeParams(95), slow_encode)))
+    owner.start()
+    started.wait(1)
+    waiter = threading.Thread(target=lambda: results.append(cache.get("rgb_frame", 1, EncodeParams(95), lambda: b"again")))
+    waiter.start()
+    release.set()
+    owner.join()
+    waiter.join()
+
+    assert results == [b"jpeg", b"jpeg"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_are_evicted_once_every_subscriber_moved_past_them():
+    async def main():
+        bus = AsyncEventBus(topic_options={"rgb_frame": TopicOptions(policy=OverflowPolicy.COALESCE)})
+        cache = FrameCache(bus)
+        frames = bus.subscribe("rgb_frame", latest_only=True)
+        cache.track("recorder", "rgb_frame")
+
+        await bus.publish(Event("rgb_frame", 1))
+        event = await frames.__anext__()
+        cache.get("rgb_frame", event.seq, EncodeParams(95), lambda: b"1")
+        await bus.publish(Event("rgb_frame", 2))
+        event = await frames.__anext__()
+        cache.get("rgb_frame", event.seq, EncodeParams(95), lambda: b"2")
+        # The subscriber is on frame 2, the recorder still holds frame 1
+        held = cache.stats()["entries"]
+
+        cache.advance("recorder", "rgb_frame", 1)
+        await frames.aclose()
+        return held, cache.stats()
+
+    held, stats = asyncio.run(main())
+    assert held == 2
+    assert (stats["entries"], stats["evicted"]) == (1, 1)
+
+
+def test_max_entries_evicts_the_oldest_frames():
+    cache = FrameCache(AsyncEventBus(), max_entries=2)
+    cache.track("recorder", "rgb_frame") # never advances
+    for seq in range(1, 5):
+        cache.get("rgb_frame", seq, EncodeParams(95), lambda: b"jpeg")
+
+    calls = []
+    cache.get("rgb_frame", 4, EncodeParams(95), _encoder(b"4", calls))
+    cache.get("rgb_frame", 1, EncodeParams(95), _encoder(b"1", calls))
+    assert calls == [b"1"]
+    assert cache.evicted == 3
@@ -0,0 +1,35 @@
+import numpy as np
+
+from aria_desktop.bus import AsyncEventBus
+from aria_desktop.workers.keyframes import KeyframeScheduler
+from aria_desktop.workers.local_yolo import Detection, Detections
+
+
+def _detections(seq):
+    return Detections(seq=seq, capture_timestamp_ns=0, host_time_ns=0, latency_ms=0.0,
+                      detections=[Detection("box", 0.9, [16, 16, 48, 48])])
+
+
+def test_the_keyframe_is_taken_on_the_loop_and_the_trackers_start_from_it():
+    scheduler = KeyframeScheduler(AsyncEventBus(), tracker="mil", track_scale=1.0)
+    frame = np.zeros((64, 64, 3), dtype=np.uint8)
+    frame[16:48, 16:48] = 255
+    scheduler._keyframe_images = {3: frame, 5: frame, 7: frame}
+
+    keyframe = scheduler._take_keyframe(_detections(5))
+    # Older keyframes will never get their detections, newer ones still may
+    assert keyframe is frame
+    assert list(scheduler._keyframe_images) == [7]
+
+    images = dict(scheduler._keyframe_images)
+    tracked, lost, _, _ = scheduler._step(frame, _detections(5), keyframe)
+    assert scheduler._keyframe_images == images # the tracking thread never touches them
+    assert ([det.class_name for det in tracked], lost) == (["box"], 0)
+
+
+def test_detections_of_a_dropped_keyframe_keep_the_trackers():
+    scheduler = KeyframeScheduler(AsyncEventBus(), tracker="mil")
+    assert scheduler._take_keyframe(_detections(2)) is None
+    tracks = scheduler._tracks
+    scheduler._step(np.zeros((64, 64, 3), dtype=np.uint8), _detections(2), None)
+    assert scheduler._tracks is tracks
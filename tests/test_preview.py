@@ -0,0 +1,31 @@
+import threading
+
+import numpy as np
+
+from aria_desktop.core import replay
+from aria_desktop.core.replay import PreviewWindow
+
+
+def test_preview_draws_the_latest_frame_on_the_calling_thread(monkeypatch):
+    drawn = []
+    monkeypatch.setattr(replay.cv2, "imshow", lambda name, image: drawn.append((threading.get_ident(), image[0, 0, 0])))
+    monkeypatch.setattr(replay.cv2, "waitKey", lambda ms: -1)
+    monkeypatch.setattr(replay.cv2, "destroyAllWindows", lambda: None)
+
+    preview = PreviewWindow(interval_ms=1)
+    # Handed over from the loop thread, only the newest one is drawn
+    producer = threading.Thread(target=lambda: [preview.show(np.full((2, 2, 3), value, np.uint8)) for value in (1, 2, 3)])
+    producer.start()
+    producer.join()
+
+    rounds = iter(range(3))
+    preview.run(lambda: next(rounds, None) is not None)
+
+    assert drawn == [(threading.get_ident(), 3)]
+    assert preview.shown == 1
+
+
+def test_no_preview_without_a_display(monkeypatch):
+    monkeypatch.setattr(replay, "display_available", lambda: False)
+    monkeypatch.setattr(replay.config, "getboolean", lambda section, key, fallback=None: True)
+    assert PreviewWindow.from_config() is None
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from aria_desktop.server.protocol import (
+    FRAME_HEADER, Codec, ControlMessage, FrameHeader, FrameKind, MessageType, pack_frame,
+)
+
+
+def test_frame_header_round_trip():
+    header = FrameHeader(kind=FrameKind.SENSOR, codec=Codec.RECORDS, seq=7, capture_timestamp_ns=-5,
+                         host_receive_ns=1_700_000_000_000_000_000, encode_us=1234, stream_id=3, flags=1)
+    data = pack_frame(header, b"payload")
+    assert FRAME_HEADER.size == 32
+    assert data[:2] == b"AF"
+
+    unpacked, payload = FrameHeader.unpack(data)
+    assert unpacked == header
+    assert bytes(payload) == b"payload"
+
+
+def test_frame_header_wraps_seq_and_clamps_encode_time():
+    header = FrameHeader(kind=FrameKind.VIDEO, codec=Codec.JPEG, seq=2**32 + 5, encode_us=2**40)
+    unpacked, _ = FrameHeader.unpack(header.pack())
+    assert unpacked.seq == 5
+    assert unpacked.encode_us == 0xFFFFFFFF
+
+
+def test_frame_header_rejects_other_data():
+    with pytest.raises(ValueError):
+        FrameHeader.unpack(b"XX" + bytes(30))
+
+
+def test_control_message_round_trip():
+    message = ControlMessage(MessageType.SET_TIER, {"tier": "half"})
+    assert ControlMessage.from_json(message.to_json()) == message
+    assert ControlMessage.from_json('{"type": "CLIENT_STATS"}').payload == {}
+
+
+@pytest.mark.parametrize("message", [
+    "not json",
+    "[1, 2]",
+    '{"type": "NOPE"}',
+    '{"type": "CLIENT_STATS", "payload": [1]}',
+    '{"type": "CLIENT_STATS", "payload": "fps"}',
+])
+def test_malformed_control_messages_raise_value_error(message):
+    with pytest.raises(ValueError):
+        ControlMessage.from_json(message)
+
+
+def test_message_types_are_the_wire_names():
+    assert json.loads(ControlMessage(MessageType.ERROR_MSG).to_json())["type"] == "ERROR_MSG"
@@ -0,0 +1,102 @@
+import pytest
+
+from aria_desktop.workers import quality_controller
+from aria_desktop.workers.quality_controller import AdaptiveQualityController
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(quality_controller.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _settings(controller):
+    return controller.quality, controller.scale, controller.target_fps
+
+
+def test_congestion_lowers_quality_then_scale_then_fps(clock):
+    controller = AdaptiveQualityController(target_latency=0.1, min_quality=50, max_quality=70,
+                                           min_scale=0.5, min_fps=10, max_fps=30)
+    steps = [_settings(controller)]
+    for _ in range(12):
+        clock[0] += controller.decrease_cooldown
+        controller.update(encode_time=0.2, send_time=0.2, frame_bytes=10_000)
+        if _settings(controller) != steps[-1]:
+            steps.append(_settings(controller))
+
+    assert steps == [
+        (70, 1.0, 30),
+        (60, 1.0, 30),
+        (50, 1.0, 30),
+        (50, 0.75, 30),
+        (50, 0.562, 30),
+        (50, 0.5, 30),
+        (50, 0.5, 22.5),
+        (50, 0.5, 16.875),
+        (50, 0.5, 12.65625),
+        (50, 0.5, 10),
+    ]
+
+
+def test_decreases_wait_for_the_cooldown(clock):
+    controller = AdaptiveQualityController(target_latency=0.1)
+    controller.update(encode_time=0.2, send_time=0.2, frame_bytes=10_000)
+    clock[0] += controller.decrease_cooldown / 2
+    controller.update(encode_time=0.2, send_time=0.2, frame_bytes=10_000)
+    assert controller.quality == controller.max_quality - 10
+
+
+def test_headroom_undoes_the_decreases_in_reverse_order(clock):
+    controller = AdaptiveQualityController(target_latency=0.1, min_quality=60, max_quality=70,
+                                           min_scale=0.75, min_fps=20, max_fps=24)
+    controller.quality, controller.scale, controller.target_fps = 60, 0.75, 20
+    steps = []
+    for _ in range(8):
+        clock[0] += controller.increase_interval
+        controller.update(encode_time=0.001, send_time=0.001, frame_bytes=10_000)
+        steps.append(_settings(controller))
+
+    assert steps[:6] == [
+        (60, 0.75, 22),
+        (60, 0.75, 24),
+        (60, 0.875, 24),
+        (60, 1.0, 24),
+        (65, 1.0, 24),
+        (70, 1.0, 24),
+    ]
+    assert steps[-1] == (70, 1.0, 24)
+
+
+def test_a_step_up_that_does_not_hold_doubles_the_wait(clock):
+    controller = AdaptiveQualityController(target_latency=0.1, min_quality=50, max_quality=70)
+    controller.quality = 60
+    controller.latency_ema = 0.001
+    clock[0] += controller.increase_interval
+    controller.update(encode_time=0.001, send_time=0.001, frame_bytes=10_000)
+    assert controller.quality == 65
+
+    # Congested right after the step up, twice: the wait only doubles once
+    for _ in range(2):
+        clock[0] += controller.decrease_cooldown
+        controller.latency_ema = None
+        controller.update(encode_time=0.2, send_time=0.2, frame_bytes=10_000)
+    assert (controller.quality, controller.increase_interval) == (50, 4.0)
+
+    # Headroom again, the old interval is not enough any more
+    controller.latency_ema = None
+    clock[0] += 2.0
+    controller.update(encode_time=0.001, send_time=0.001, frame_bytes=10_000)
+    assert controller.quality == 50
+    clock[0] += 2.0
+    controller.update(encode_time=0.001, send_time=0.001, frame_bytes=10_000)
+    assert controller.quality == 55
+
+
+def test_latency_inside_the_dead_band_keeps_the_settings(clock):
+    controller = AdaptiveQualityController(target_latency=0.1)
+    controller.quality = 50
+    for _ in range(10):
+        clock[0] += controller.increase_interval
+        controller.update(encode_time=0.04, send_time=0.04, frame_bytes=10_000)
+    assert _settings(controller) == (50, 1.0, controller.max_fps)
@@ -0,0 +1,70 @@
+import numpy as np
+
+from aria_desktop.workers.recorder import RecordedFrame, RecordingReader, RecordingWriter
+
+
+def _image(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def _record(path, frames, **kwargs):
+    writer = RecordingWriter(path, **kwargs)
+    writer.start()
+    for frame in frames:
+        assert writer.submit(frame)
+    writer.close()
+    return writer
+
+
+def test_raw_frames_read_back_across_chunks(tmp_path):
+    frames = [RecordedFrame("rgb", capture_ns=1000 * i, host_ns=i, image=_image(i)) for i in range(5)]
+    writer = _record(tmp_path, frames, fmt="raw", frames_per_chunk=2, batch_size=3)
+
+    reader = RecordingReader(tmp_path / "rgb")
+    assert writer.stats()["frames"] == {"rgb": 5}
+    assert len(reader) == 5
+    assert list(reader.index["chunk"]) == [0, 0, 1, 1, 2]
+    for i in range(5):
+        np.testing.assert_array_equal(reader.read(i), _image(i))
+    # The last chunk only holds the frame it got
+    assert (tmp_path / "rgb" / "chunk_000002.raw").stat().st_size == _image(0).nbytes
+
+
+def test_seek_finds_the_first_frame_at_or_after_a_timestamp(tmp_path):
+    frames = [RecordedFrame("rgb", capture_ns=1000 * i, host_ns=i, image=_image(i)) for i in range(1, 5)]
+    _record(tmp_path, frames, fmt="raw")
+
+    reader = RecordingReader(tmp_path / "rgb")
+    assert reader.seek(0) == 0
+    assert reader.seek(2000) == 1
+    assert reader.seek(2001) == 2
+    assert reader.seek(4000) == 3
+    assert reader.seek(4001) == len(reader)
+    np.testing.assert_array_equal(reader.read(reader.seek(2500)), _image(3))
+
+
+def test_mismatched_raw_frames_are_skipped(tmp_path):
+    frames = [
+        RecordedFrame("rgb", capture_ns=1, host_ns=1, image=_image(1)),
+        RecordedFrame("rgb", capture_ns=2, host_ns=2, image=np.zeros((2, 2, 3), dtype=np.uint8)),
+        RecordedFrame("rgb", capture_ns=3, host_ns=3, image=_image(3)),
+    ]
+    _record(tmp_path, frames, fmt="raw")
+
+    reader = RecordingReader(tmp_path / "rgb")
+    assert list(reader.index["capture_ns"]) == [1, 3]
+
+
+def test_jpeg_frames_are_written_as_given(tmp_path):
+    frames = [RecordedFrame("rgb", capture_ns=i, host_ns=i, jpeg=bytes([i]) * (i + 1)) for i in range(3)]
+    _record(tmp_path, frames, fmt="jpeg")
+
+    reader = RecordingReader(tmp_path / "rgb")
+    assert [reader.read(i) for i in range(3)] == [b"\x00", b"\x01\x01", b"\x02\x02\x02"]
+
+
+def test_submit_drops_frames_when_the_queue_is_full(tmp_path):
+    writer = RecordingWriter(tmp_path, fmt="raw", queue_size=2)
+    results = [writer.submit(RecordedFrame("rgb", capture_ns=i, host_ns=i, image=_image(i))) for i in range(4)]
+    assert results == [True, True, False, False]
+    assert (writer.submitted, writer.dropped) == (2, 2)
@@ -0,0 +1,64 @@
+import pytest
+
+from aria_desktop.core import replay
+from aria_desktop.core.replay import ReplayPacer
+
+MS = 1_000_000
+
+
+class _Clock:
+    """perf_counter and the stop event of the pacer, waiting advances the time."""
+
+    def __init__(self):
+        self.now = 10.0
+        self.waits = []
+
+    def perf_counter(self):
+        return self.now
+
+    def wait(self, delay):
+        self.waits.append(round(delay, 6))
+        self.now += delay
+        return False
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(replay.time, "perf_counter", clock.perf_counter)
+    return clock
+
+
+def test_deadlines_are_absolute(clock):
+    pacer = ReplayPacer(speed=1.0)
+    for index in range(4):
+        pacer.wait(index * 100 * MS, clock)
+        clock.now += 0.03 # delivering takes time, it must not add up as drift
+    assert clock.waits == [0.07, 0.07, 0.07]
+    assert pacer.late == 0
+
+
+def test_speed_scales_the_schedule(clock):
+    pacer = ReplayPacer(speed=2.0)
+    pacer.wait(0, clock)
+    pacer.wait(100 * MS, clock)
+    assert clock.waits == [0.05]
+
+
+def test_late_items_are_counted_and_far_behind_reanchors(clock):
+    pacer = ReplayPacer(speed=1.0, max_lag=0.5)
+    pacer.wait(0, clock)
+    clock.now += 0.2
+    pacer.wait(100 * MS, clock) # 0.1s late, delivered right away
+    clock.now += 1.0
+    pacer.wait(200 * MS, clock) # far behind, the schedule restarts from here
+    pacer.wait(300 * MS, clock)
+    assert pacer.late == 2
+    assert clock.waits == [0.1]
+
+
+def test_speed_zero_never_waits(clock):
+    pacer = ReplayPacer(speed=0)
+    for index in range(3):
+        pacer.wait(index * 100 * MS, clock)
+    assert clock.waits == []
@@ -0,0 +1,72 @@
+import numpy as np
+
+from aria_desktop.workers.sensor_aggregator import SampleRing
+
+
+def test_drain_returns_what_was_written_since_the_last_drain():
+    ring = SampleRing(np.int64, 8)
+    ring.write(np.arange(3))
+    ring.write(np.arange(3, 4))
+    records, overruns = ring.drain()
+    assert records.tolist() == [0, 1, 2, 3]
+    assert overruns == 0
+
+    records, overruns = ring.drain()
+    assert records.tolist() == []
+    assert overruns == 0
+
+
+def test_drain_across_the_end_of_the_ring():
+    ring = SampleRing(np.int64, 8)
+    ring.write(np.arange(6))
+    ring.drain()
+    ring.write(np.arange(6, 11))
+    records, _ = ring.drain()
+    assert records.tolist() == [6, 7, 8, 9, 10]
+
+
+def test_a_full_ring_drains_completely():
+    ring = SampleRing(np.int64, 4)
+    ring.write(np.arange(2))
+    ring.drain()
+    ring.write(np.arange(2, 6))
+    records, overruns = ring.drain()
+    assert records.tolist() == [2, 3, 4, 5]
+    assert overruns == 0
+
+
+def test_overruns_drop_the_oldest_records_and_are_reported_once():
+    ring = SampleRing(np.int64, 4)
+    ring.write(np.arange(3))
+    ring.write(np.arange(3, 10)) # more than the capacity in one write
+    records, overruns = ring.drain()
+    assert records.tolist() == [6, 7, 8, 9]
+    assert overruns == 6
+    assert ring.drain()[1] == 0
+
+
+def test_append_of_structured_records():
+    ring = SampleRing(np.dtype([("t", "<i8"), ("x", "<f4")]), 4)
+    ring.append((1, 0.5))
+    ring.append((2, 1.5))
+    records, _ = ring.drain()
+    assert records["t"].tolist() == [1, 2]
+    assert records["x"].tolist() == [0.5, 1.5]
+
+
+def test_rows_of_a_shape():
+    ring = SampleRing(np.int16, 4, shape=(2,))
+    ring.write(np.array([[1, 2], [3, 4]], dtype=np.int16))
+    records, _ = ring.drain()
+    assert records.tolist() == [[1, 2], [3, 4]]
+
+
+def test_drain_multiple_leaves_the_remainder_for_the_next_drain():
+    ring = SampleRing(np.int64, 16)
+    ring.write(np.arange(7))
+    records, _ = ring.drain(multiple=3)
+    assert records.tolist() == [0, 1, 2, 3, 4, 5]
+    ring.write(np.arange(7, 9))
+    records, _ = ring.drain(multiple=3)
+    assert records.tolist() == [6, 7, 8]
+    assert ring.drain(multiple=3)[0].tolist() == []
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aria.sdk")
+
+from aria_desktop.bus import AsyncEventBus
+from aria_desktop.server.server import WebSocketServer
+from aria_desktop.utils.config import config
+
+
+class _Client:
+    name = "test"
+
+    def __init__(self):
+        self.receive_fps = 12.0
+        self.tier = "full"
+        self.sent = []
+
+    async def send_control(self, message):
+        self.sent.append(json.loads(message))
+
+
+def _handle(message):
+    server = WebSocketServer.__new__(WebSocketServer)
+    server.tiers = {"full": None, "half": None}
+    client = _Client()
+    asyncio.run(server.handle_json_message(message, client))
+    return client
+
+
+@pytest.mark.parametrize("message", [
+    '{"type": "CLIENT_STATS", "payload": {"fps": "x"}}',
+    '{"type": "CLIENT_STATS", "payload": {"fps": [1]}}',
+    '{"type": "CLIENT_STATS", "payload": {"fps": "nan"}}',
+    '{"type": "CLIENT_STATS", "payload": {"fps": 1e999}}',
+    '{"type": "CLIENT_STATS", "payload": [1, 2]}',
+    '{"type": "SET_TIER", "payload": {"tier": [1]}}',
+    '{"type": "SET_TIER", "payload": {"tier": "huge"}}',
+])
+def test_malformed_payloads_are_answered_with_an_error(message):
+    client = _handle(message)
+    assert [reply["type"] for reply in client.sent] == ["ERROR_MSG"]
+    assert (client.receive_fps, client.tier) == (12.0, "full")
+
+
+def test_valid_messages_update_the_client():
+    assert _handle('{"type": "CLIENT_STATS", "payload": {"fps": "24.5"}}').receive_fps == 24.5
+    assert _handle('{"type": "CLIENT_STATS", "payload": {}}').receive_fps is None
+    client = _handle('{"type": "SET_TIER", "payload": {"tier": "half"}}')
+    assert (client.tier, client.sent) == ("half", [])
+
+
+def test_an_unknown_default_tier_fails_at_startup(monkeypatch):
+    monkeypatch.setitem(config['websocket'], 'default_tier', 'huge')
+    with pytest.raises(ValueError, match="huge"):
+        WebSocketServer(AsyncEventBus())
+
+
+def test_the_controller_gets_the_size_of_the_watched_tier():
+    server = WebSocketServer.__new__(WebSocketServer)
+    server.clients = {}
+    for index, tier in enumerate(["half", "half", "full"]):
+        client = _Client()
+        client.tier = tier
+        server.clients[index] = client
+    assert server.client_frame_bytes({"full": b"x" * 100, "half": b"x" * 30, "thumb": b"x"}) == 30
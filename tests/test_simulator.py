@@ -0,0 +1,51 @@
+import random
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from aria_desktop.core.simulator import SimulatedCamera, SimulatedStreamingClient, SimulatorConfig, _Emitter
+
+
+def _emitter(seed):
+    sim = SimulatorConfig(jitter_ms=0, burst_probability=0.3, burst_length=5)
+    return _Emitter("cam", 30, lambda tick, capture_ns: None, sim, threading.Event(), rng=random.Random(seed))
+
+
+def test_bursts_deliver_every_tick_late_and_in_order():
+    emitter = _emitter(1234)
+    delivered, sizes = [], []
+    for count in range(1, 201):
+        ticks = emitter._tick(count, capture_ns=count * 1000)
+        delivered += ticks
+        sizes.append(len(ticks))
+    delivered += emitter.held
+
+    assert len(delivered) == 200 # one emit per tick, bursts only delay them
+    assert [tick for tick, _ in delivered] == list(range(1, 201))
+    assert all(capture_ns == tick * 1000 for tick, capture_ns in delivered)
+    assert max(sizes) == 5 and 0 in sizes
+
+
+def test_no_bursts_deliver_each_tick_on_time():
+    emitter = _emitter(1234)
+    emitter.sim.burst_probability = 0.0
+    assert [emitter._tick(count, 0) for count in range(1, 4)] == [[(1, 0)], [(2, 0)], [(3, 0)]]
+
+
+def test_only_the_subscribed_streams_are_emitted():
+    aria = pytest.importorskip("aria.sdk")
+    sim = SimulatorConfig(cameras=[SimulatedCamera("rgb", 30, 64, 64), SimulatedCamera("slam1", 15, 64, 48),
+                                   SimulatedCamera("et", 30, 32, 32)])
+    client = SimulatedStreamingClient(sim)
+    client.set_streaming_client_observer(mock.Mock())
+    client.subscription_config = SimpleNamespace(
+        subscriber_data_type=aria.StreamingDataType.Rgb | aria.StreamingDataType.Imu
+    )
+    client.subscribe()
+    try:
+        names = [emitter.name for emitter in client._emitters]
+    finally:
+        client.unsubscribe()
+    assert names == ["rgb", "imu0", "imu1"]
@@ -0,0 +1,22 @@
+import pytest
+
+from aria_desktop.workers.video_tiers import DEFAULT_TIERS, VideoTier, parse_tiers
+
+
+def test_tiers_are_sorted_largest_first():
+    tiers = parse_tiers(" thumb:0.25:50, full:1.0:75 ,, half : 0.5 : 60")
+    assert tiers == [
+        VideoTier("full", 1.0, 75),
+        VideoTier("half", 0.5, 60),
+        VideoTier("thumb", 0.25, 50),
+    ]
+
+
+def test_default_tiers_parse():
+    assert [tier.name for tier in parse_tiers(DEFAULT_TIERS)] == ["full", "half", "thumb"]
+
+
+@pytest.mark.parametrize("spec", ["", " , ", "full:1.0", "full:big:75"])
+def test_malformed_tiers_are_rejected(spec):
+    with pytest.raises(ValueError):
+        parse_tiers(spec)
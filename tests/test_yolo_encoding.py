@@ -0,0 +1,53 @@
+import asyncio
+
+import numpy as np
+
+from aria_desktop.bus import AsyncEventBus, Event
+from aria_desktop.workers.frame_cache import FrameCache
+from aria_desktop.workers.local_yolo import InferenceClient
+from aria_desktop.workers.recorder import RecordedFrame, RecordingReader, RecordingSink, RecordingWriter
+
+
+def _frame(seq):
+    image = np.random.default_rng(seq).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    return Event("rgb_frame", {"image": image}, seq=seq)
+
+
+def test_detector_reuses_the_recorder_encoding(tmp_path):
+    bus = AsyncEventBus()
+    cache = FrameCache(bus)
+    event = _frame(7)
+    writer = RecordingWriter(tmp_path, fmt="jpeg", jpeg_quality=95, cache=cache)
+    writer.start()
+    writer.submit(RecordedFrame("rgb_frame", capture_ns=1, host_ns=1, image=event.payload["image"], seq=event.seq))
+    writer.close()
+
+    client = InferenceClient(bus, cache)
+    client.jpeg_quality = 95
+    jpeg = asyncio.run(client._encode(event))
+
+    assert jpeg == RecordingReader(tmp_path / "rgb_frame").read(0)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_boxes_are_scaled_back_only_for_resized_frames():
+    raw = [{"class_name": "cup", "confidence": 0.9, "bbox": [0, 0, 320, 180]}]
+    event = _frame(1)
+
+    resized = InferenceClient(AsyncEventBus())
+    resized.image_size = 640
+    full_size = InferenceClient(AsyncEventBus(), FrameCache(AsyncEventBus()))
+
+    assert resized._detections(event, raw).detections[0].bbox == [0, 0, 640, 360]
+    assert full_size._detections(event, raw).detections[0].bbox == [0, 0, 320, 180]
+
+
+def test_the_recorder_is_only_shared_at_the_detector_quality(tmp_path):
+    bus = AsyncEventBus()
+    sink = RecordingSink(bus, RecordingWriter(tmp_path, fmt="jpeg", jpeg_quality=90, cache=FrameCache(bus)))
+    assert sink.shares_jpeg("rgb_frame", 90)
+    assert not sink.shares_jpeg("rgb_frame", 95) # every lookup would miss and send full-size frames
+    assert not sink.shares_jpeg("slam1_frame", 90)
+
+    raw = RecordingSink(bus, RecordingWriter(tmp_path, fmt="raw", jpeg_quality=90, cache=FrameCache(bus)))
+    assert not raw.shares_jpeg("rgb_frame", 90)